@@ -0,0 +1,100 @@
+"""Monte Carlo balance check for jump encounters.
+
+Simulates a large number of jumps to each danger level with the same
+``EncounterEngine`` that ``/jump`` draws from, for every combination of
+navigation upgrades, faction jump bonus and engine optimization a player can
+own, and reports the expected credits per jump and per unit of fuel burned.
+Every combination is scored against the same encounter and dice draws, so the
+differences between rows come from the bonuses rather than from noise.
+
+Losses are not clamped at the player's balance, so the figures are what a
+player with enough credits to absorb every penalty would see.
+
+Run from the repository root with ``python -m benchmarks.encounter_balance``.
+"""
+import argparse
+import itertools
+from typing import List, Tuple
+
+import numpy as np
+
+from models.encounters import encounter_engine, MAX_SUCCESS_RATE
+from models.routes import FUEL_PRICE
+from models.world import JUMP_RANGE, jump_fuel
+
+
+# Danger levels a planet can have.
+DANGER_LEVELS = (1, 2, 3, 4, 5)
+
+# Advanced Navigation adds 0.05 per level, up to four levels.
+SHIP_BONUSES = (0.0, 0.05, 0.10, 0.15, 0.20)
+
+# Faction jump bonuses, from the seeded factions.
+FACTION_BONUSES = (0.0, 0.05, 0.10, 0.15)
+
+# Engine Optimization takes 0.1 off per level, up to five levels.
+FUEL_EFFICIENCIES = (1.0, 0.8, 0.5)
+
+
+def parse_floats(text: str) -> Tuple[float, ...]:
+    return tuple(float(value) for value in text.split(","))
+
+
+def simulate(danger_level: int, jumps: int, rng: np.random.Generator,
+             bonuses: List[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """Mean credits per jump and success rate for each total jump bonus."""
+    encounters = encounter_engine.sample_many(danger_level, jumps, rng)
+    rolls = rng.random(jumps)
+
+    rewards = encounter_engine.rewards[encounters]
+    penalties = encounter_engine.penalties[encounters]
+    gained = rng.integers(rewards[:, 0], rewards[:, 1] + 1)
+    lost = rng.integers(penalties[:, 0], penalties[:, 1] + 1)
+    base_rates = encounter_engine.success_rates[encounters]
+
+    # One row per bonus, scored against the same draws
+    rates = np.minimum(base_rates[None, :] + np.asarray(bonuses)[:, None], MAX_SUCCESS_RATE)
+    success = rolls[None, :] < rates
+    credits = np.where(success, gained[None, :], -lost[None, :])
+    return credits.mean(axis=1), success.mean(axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jumps", type=int, default=1_000_000, help="jumps simulated per danger level")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ship-bonuses", type=parse_floats, default=SHIP_BONUSES)
+    parser.add_argument("--faction-bonuses", type=parse_floats, default=FACTION_BONUSES)
+    parser.add_argument("--fuel-efficiencies", type=parse_floats, default=FUEL_EFFICIENCIES)
+    parser.add_argument("--distance", type=float, default=JUMP_RANGE / 2, help="map units flown per jump")
+    parser.add_argument("--net", action="store_true", help=f"subtract fuel bought at {FUEL_PRICE} cr per unit")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    combos = list(itertools.product(args.ship_bonuses, args.faction_bonuses))
+    bonuses = sorted({ship + faction for ship, faction in combos})
+
+    base_fuel = jump_fuel(args.distance)
+    print(f"{args.jumps:,} jumps of {args.distance:g} units per danger level, seed {args.seed}"
+          + (f", net of fuel at {FUEL_PRICE} cr" if args.net else ""))
+    for danger_level in DANGER_LEVELS:
+        credits, success = simulate(danger_level, args.jumps, rng, bonuses)
+        by_bonus = {bonus: (credits[i], success[i]) for i, bonus in enumerate(bonuses)}
+
+        print(f"\nDanger {danger_level} (base fuel {base_fuel})")
+        header = "  ship  faction  success   cr/jump"
+        fuel_columns = [(efficiency, int(base_fuel * efficiency)) for efficiency in args.fuel_efficiencies]
+        header += "".join(f"  cr/fuel@{efficiency:.1f}" for efficiency, _ in fuel_columns)
+        print(header)
+
+        for ship, faction in combos:
+            mean, rate = by_bonus[ship + faction]
+            row = f"  {ship:4.2f}  {faction:7.2f}  {rate:7.1%}  {mean:8.1f}"
+            for _, fuel in fuel_columns:
+                net = mean - fuel * FUEL_PRICE if args.net else mean
+                row += f"  {net / max(fuel, 1):10.1f}"
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
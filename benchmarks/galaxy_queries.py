@@ -0,0 +1,95 @@
+"""Time jump-range and route queries on a generated galaxy.
+
+Lays out ``--count`` planets with ``GalaxyGenerator``, installs them in the
+world catalog without a database, and times the catalog's grid lookup of the
+planets within jump range against a scan of every planet. It then plans
+routes between random pairs of planets three ways. Cold means the table is
+not built yet, so each origin's tree comes from a worker. Build is how long
+the whole table takes in the background. Warm means the same routes planned
+again, each one a lookup. The longest the event loop went without running
+during the cold routes is printed too.
+
+Run from the repository root with ``python -m benchmarks.galaxy_queries``.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from models.galaxy import GalaxyGenerator
+from models.navigation import RoutePlanner
+from models.world import world, Planet, JUMP_RANGE
+
+
+def scan_in_range(planet: str):
+    return [
+        (other, world.distance(planet, other.name)) for other in world.planets.values()
+        if other.name != planet and world.distance(planet, other.name) <= JUMP_RANGE
+    ]
+
+
+def timed(function, arguments) -> float:
+    start = time.perf_counter()
+    for argument in arguments:
+        function(*argument)
+    return (time.perf_counter() - start) / len(arguments) * 1e6
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=5000, help="planets to generate")
+    parser.add_argument("--queries", type=int, default=1000, help="range queries and routes timed")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    planets = GalaxyGenerator(args.seed).planets(args.count)
+    world.replace([Planet(row) for row in planets], [], [], [])
+    names = list(world.planets)
+    rng = random.Random(args.seed)
+
+    origins = [(rng.choice(names),) for _ in range(args.queries)]
+    neighbours = sum(len(world.in_range(name)) for name, in origins) / len(origins)
+    print(f"{len(names):,} planets, {neighbours:.1f} within jump range on average")
+    print(f"  grid in_range     {timed(world.in_range, origins):10.1f} us/query")
+    print(f"  full scan         {timed(scan_in_range, origins[:100]):10.1f} us/query")
+
+    planner = RoutePlanner()
+    # Builds the graph and starts on the default table, as the bot does at startup.
+    await planner.reload()
+    pairs = [(rng.choice(names), rng.choice(names)) for _ in range(args.queries)]
+    # Not the default table, so nothing is built before the cold routes.
+    efficiency, tolerance = 0.8, 4
+
+    async def plan_all(label: str):
+        start = time.perf_counter()
+        found = 0
+        for origin, destination in pairs:
+            found += await planner.plan(origin, destination, efficiency, tolerance, 0, 0) is not None
+        elapsed = (time.perf_counter() - start) / len(pairs) * 1e3
+        print(f"  route plan ({label})  {elapsed:10.2f} ms/route, {found}/{len(pairs)} reachable")
+
+    stalls = []
+
+    async def watch_loop():
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stalls.append(time.perf_counter() - start - 0.001)
+
+    print(f"  routes planned with {planner.workers} worker processes on {os.cpu_count()} cores")
+    watcher = asyncio.create_task(watch_loop())
+    await plan_all("cold")
+    watcher.cancel()
+    print(f"  loop stalled at most {max(stalls) * 1e3:.2f} ms while planning cold")
+
+    start = time.perf_counter()
+    await planner.prepare(efficiency, tolerance)
+    print(f"  table build       {time.perf_counter() - start:10.2f} s for the rest of the table")
+
+    await plan_all("warm")
+    await planner.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
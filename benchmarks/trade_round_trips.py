@@ -0,0 +1,268 @@
+"""Count the database round trips made by a single ``/trade buy``.
+
+The real ``Trading.trade_buy`` callback is driven against an in-memory pool that
+records every statement sent instead of talking to Postgres. BEGIN, COMMIT and
+ROLLBACK count as a round trip each. It runs once through the current
+DatabaseManager and GameSession, and once through a copy of the old manager that
+checked out a connection and sent ``SET app.current_user_id`` for every
+user-scoped statement.
+
+Both runs drive today's command, with its stored trade functions and single
+player load, so the comparison isolates the user scope alone. It is not the
+baseline ``/trade buy``, which loaded the player, ship, inventory and prices
+with separate statements and made several more round trips on either manager.
+
+Run from the repository root with ``python -m benchmarks.trade_round_trips``.
+"""
+import asyncio
+import json
+from typing import Dict, List, Optional, Any
+
+from models import database
+from models.database import DatabaseManager
+from models.market import market_engine
+from models.names import name_index
+from models.player import player_cache
+from models.world import world
+from models.queries import registry
+from cogs.trading import Trading
+
+
+USER_ID = 4242
+
+PLAYER_ROW = {
+    'user_id': USER_ID, 'username': 'Benchmark Pilot', 'credits': 50000, 'fuel': 100,
+    'current_planet': 'Terra Prime', 'faction_id': None, 'total_trades': 3,
+    'successful_jumps': 0, 'total_jumps': 0, 'net_worth': 50000,
+}
+SHIP_ROW = {
+    'user_id': USER_ID, 'name': 'Starfarer', 'cargo_capacity': 50, 'fuel_efficiency': 1.0,
+    'jump_success_bonus': 0.0, 'shield_strength': 0, 'engine_speed': 1,
+    'navigation_system': 0, 'paint_job': 'Standard', 'total_upgrade_cost': 0,
+}
+INVENTORY_ROW = {'user_id': USER_ID, 'commodity': 'Ore', 'quantity': 5, 'average_buy_price': 100.0}
+TRADE_BUY_ROW = {
+    'status': 'ok', 'commodity': 'Ore', 'price_per_unit': 120, 'total_value': 600,
+    'credits': 49400, 'total_trades': 4, 'quantity': 10, 'average_buy_price': 110.0,
+    'cargo_used': 10, 'cargo_capacity': 50,
+}
+LOCKED_ACHIEVEMENTS = [
+    {'id': 7, 'name': 'Veteran Trader', 'description': 'Complete 100 trades', 'requirement_type': 'trades',
+     'requirement_value': 100, 'badge_emoji': '📈', 'reward_credits': 5000},
+    {'id': 8, 'name': 'Millionaire', 'description': 'Reach 1,000,000 net worth', 'requirement_type': 'net_worth',
+     'requirement_value': 1000000, 'badge_emoji': '💰', 'reward_credits': 50000},
+]
+PLANET_ROW = {
+    'name': 'Terra Prime', 'danger_level': 1, 'description': 'The safe capital world with stable markets',
+    'market_modifier': 1.0, 'special_bonus': 'Safe Haven', 'x': 0.0, 'y': 0.0,
+}
+COMMODITY_ROW = {'name': 'Ore', 'base_price': 100, 'volatility': 0.15, 'description': 'Essential minerals'}
+MARKET_ROW = {
+    'planet': 'Terra Prime', 'commodity': 'Ore', 'current_price': 120, 'supply_level': 50, 'demand_level': 50,
+    'base_price': 100, 'volatility': 0.15, 'description': 'Essential minerals', 'market_modifier': 1.0,
+    'danger_level': 1,
+}
+
+
+def _rows_for(query: str) -> List[Dict[str, Any]]:
+    """Canned rows for the statements ``/trade buy`` issues."""
+    if "to_jsonb(p) AS player" in query:
+        return [{
+            'player': json.dumps(PLAYER_ROW),
+            'ship': json.dumps(SHIP_ROW),
+            'inventory': json.dumps([INVENTORY_ROW]),
+            'achievements': json.dumps([]),
+        }]
+    if "FROM trade_buy(" in query:
+        return [dict(TRADE_BUY_ROW)]
+    if "FROM players" in query:
+        return [dict(PLAYER_ROW)]
+    if "FROM ships" in query:
+        return [dict(SHIP_ROW)]
+    if "FROM market_prices" in query:
+        return [dict(MARKET_ROW)]
+    if "FROM player_inventory" in query:
+        return [dict(INVENTORY_ROW)]
+    if "FROM achievements" in query:
+        return [dict(row) for row in LOCKED_ACHIEVEMENTS]
+    if "FROM planets" in query:
+        return [dict(PLANET_ROW)]
+    if "FROM commodities" in query:
+        return [dict(COMMODITY_ROW)]
+    return []
+
+
+class RecordingStatement:
+    """Stands in for an asyncpg PreparedStatement; only executions count as round trips."""
+
+    def __init__(self, pool: "RecordingPool", query: str):
+        self.pool = pool
+        self.query = query
+
+    async def fetch(self, *args) -> List[Dict[str, Any]]:
+        self.pool.statements.append(self.query)
+        return _rows_for(self.query)
+
+    async def executemany(self, args_list) -> None:
+        # asyncpg pipelines every argument tuple into a single exchange.
+        self.pool.statements.append(self.query)
+
+    def get_statusmsg(self) -> str:
+        return "OK"
+
+
+class RecordingTransaction:
+    """Stands in for an asyncpg Transaction; BEGIN, COMMIT and ROLLBACK are one round trip each."""
+
+    def __init__(self, pool: "RecordingPool"):
+        self.pool = pool
+
+    async def start(self):
+        self.pool.statements.append("BEGIN")
+
+    async def commit(self):
+        self.pool.statements.append("COMMIT")
+
+    async def rollback(self):
+        self.pool.statements.append("ROLLBACK")
+
+
+class RecordingConnection:
+    def __init__(self, pool: "RecordingPool"):
+        self.pool = pool
+        # Registry statements are prepared when a pool connection is created, not per command.
+        self.prepared_statements = {query.name: RecordingStatement(pool, query.sql) for query in registry}
+
+    def transaction(self) -> RecordingTransaction:
+        return RecordingTransaction(self.pool)
+
+    async def prepare(self, query: str) -> RecordingStatement:
+        return RecordingStatement(self.pool, query)
+
+    async def execute(self, query: str, *args) -> str:
+        self.pool.statements.append(query)
+        return "OK"
+
+    async def fetch(self, query: str, *args) -> List[Dict[str, Any]]:
+        self.pool.statements.append(query)
+        return _rows_for(query)
+
+
+class _Acquire:
+    """Mimics asyncpg's acquire context, which can be awaited or used with ``async with``."""
+
+    def __init__(self, pool: "RecordingPool"):
+        self.pool = pool
+
+    async def _checkout(self) -> RecordingConnection:
+        self.pool.checkouts += 1
+        return RecordingConnection(self.pool)
+
+    def __await__(self):
+        return self._checkout().__await__()
+
+    async def __aenter__(self) -> RecordingConnection:
+        return await self._checkout()
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+class RecordingPool:
+    def __init__(self):
+        self.statements: List[str] = []
+        self.checkouts = 0
+
+    def acquire(self) -> _Acquire:
+        return _Acquire(self)
+
+    async def release(self, conn: RecordingConnection):
+        pass
+
+
+class _NoScope:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+class LegacyDatabaseManager(DatabaseManager):
+    """The DatabaseManager before user scopes, which SET the identity on every call
+    and sent raw SQL instead of prepared statements."""
+
+    def user_scope(self, user_id: Optional[int]) -> _NoScope:
+        return _NoScope()
+
+    async def execute_query(self, query: str, *args, user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        async with self.pool.acquire() as conn:
+            if user_id:
+                await conn.execute("SET app.current_user_id = $1", user_id)
+            rows = await conn.fetch(query, *args)
+            return [dict(row) for row in rows]
+
+    async def execute_command(self, command: str, *args, user_id: Optional[int] = None) -> str:
+        async with self.pool.acquire() as conn:
+            if user_id:
+                await conn.execute("SET app.current_user_id = $1", user_id)
+            return await conn.execute(command, *args)
+
+    async def execute_named_query(self, name: str, *args, user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        return await self.execute_query(registry[name].sql, *args, user_id=user_id)
+
+    async def execute_named_command(self, name: str, *args, user_id: Optional[int] = None) -> str:
+        return await self.execute_command(registry[name].sql, *args, user_id=user_id)
+
+    async def execute_named_many(self, name: str, args_list: List[tuple], user_id: Optional[int] = None):
+        for args in args_list:
+            await self.execute_command(registry[name].sql, *args, user_id=user_id)
+
+
+class _Author:
+    id = USER_ID
+    display_name = 'Benchmark Pilot'
+
+
+class _Interaction:
+    author = _Author()
+
+    async def send(self, *args, **kwargs):
+        pass
+
+
+async def warm_up():
+    """Load what the bot loads at startup, so only the command itself is measured."""
+    manager = DatabaseManager()
+    manager.pool = RecordingPool()
+    database.db_manager = manager
+    await world.load()
+    await name_index.load()
+    await market_engine.load()
+
+
+async def measure(manager: DatabaseManager) -> RecordingPool:
+    """Run one ``/trade buy`` through ``manager`` and return the pool that recorded it."""
+    pool = RecordingPool()
+    manager.pool = pool
+    database.db_manager = manager
+    # Measure a cold command, with the player not yet cached.
+    player_cache.discard(USER_ID)
+
+    cog = Trading(None)
+    await cog.trade_buy.callback(cog, _Interaction(), commodity="Ore", amount=5)
+    return pool
+
+
+async def main():
+    await warm_up()
+    before = await measure(LegacyDatabaseManager())
+    after = await measure(DatabaseManager())
+
+    print("Round trips per /trade buy (current command path on both managers)")
+    print(f"  per-call SET, autocommit:    {len(before.statements):>3} round trips, {before.checkouts:>3} connection checkouts")
+    print(f"  user scope, one transaction: {len(after.statements):>3} round trips, {after.checkouts:>3} connection checkouts")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
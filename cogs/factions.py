@@ -1,16 +1,25 @@
 import disnake
 from disnake.ext import commands
-from typing import Optional
+from typing import Optional, Union
 
-from models.database import get_db
-from models.player import Player
-from cogs.helper import send_message
+from models.database import get_db, DatabaseManager
+from models.session import GameSession
+from models.names import name_index
+from models.world import world
+from cogs.helper import send_message, send_reply, autocomplete_faction
 from util.botembed import create_bot_author_embed
+from util.embedcache import embed_cache
+
+
+# Seconds faction war standings are reused for when many players ask at once.
+FACTION_WARS_TTL = 10
 
 
 class Factions(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # Bumped whenever a join or leave commits, so cached faction listings are redrawn.
+        self.roster_version = 0
 
     @commands.slash_command(name="faction", description="Faction management and information")
     async def faction_group(self, inter):
@@ -19,11 +28,18 @@ class Factions(commands.Cog):
     @faction_group.sub_command(name="list", description="View all available factions")
     async def faction_list(self, inter: disnake.AppCmdInter):
         """Display all available factions with their bonuses and member counts."""
+        # Admin edits to factions reach the bot through the world catalog, so its version counts too.
+        await world.ensure_loaded()
+        embed = await embed_cache.get(
+            "faction_list", None, (self.roster_version, world.version), self._render_faction_list
+        )
+        await send_message(embed=embed, inter=inter)
+
+    async def _render_faction_list(self) -> disnake.Embed:
+        """Build the faction list embed."""
         db = await get_db()
         
-        factions = await db.execute_query(
-            "SELECT * FROM factions ORDER BY id"
-        )
+        factions = await db.execute_shared_query("factions.list")
         
         embed = await create_bot_author_embed(
             title="🏛️ Galactic Factions",
@@ -52,58 +68,50 @@ class Factions(commands.Cog):
             )
         
         embed.set_footer(text="Use /faction join <name> to join a faction!")
-        
-        await send_message(embed=embed, inter=inter)
+        return embed
 
     @faction_group.sub_command(name="join", description="Join a faction")
     async def faction_join(
         self,
         inter: disnake.AppCmdInter,
-        faction_name: str = commands.Param(description="Name of faction to join")
+        faction_name: str = commands.Param(description="Name of faction to join", autocomplete=autocomplete_faction)
     ):
         """Join a faction to gain bonuses and participate in faction wars."""
-        player = await Player.get_or_create(inter.author.id, inter.author.display_name)
         db = await get_db()
+        async with GameSession(inter.author.id, inter.author.display_name) as session:
+            reply = await self._join(session, db, faction_name)
+        
+        if isinstance(reply, disnake.Embed):
+            self.roster_version += 1
+        await send_reply(inter, reply)
+
+    async def _join(self, session: GameSession, db: DatabaseManager, faction_name: str) -> Union[disnake.Embed, str]:
+        """Join a faction; returns the reply embed or a refusal message."""
+        player = await session.player()
         
         # Check if already in a faction
         if player.faction_id:
-            current_faction = await db.execute_query(
-                "SELECT name FROM factions WHERE id = $1",
-                player.faction_id
-            )
-            faction_name_current = current_faction[0]['name'] if current_faction else "Unknown"
+            current_faction = world.factions.get(player.faction_id)
+            faction_name_current = current_faction.name if current_faction else "Unknown"
             
-            await send_message(
-                msg=f"❌ You're already a member of **{faction_name_current}**! "
-                    f"Use `/faction leave` first if you want to switch.",
-                inter=inter,
-                ephemeral=True
+            return (
+                f"❌ You're already a member of **{faction_name_current}**! "
+                f"Use `/faction leave` first if you want to switch."
             )
-            return
         
         # Find faction
-        faction_data = await db.execute_query(
-            "SELECT * FROM factions WHERE LOWER(name) = LOWER($1)",
-            faction_name
-        )
+        faction = world.factions.get(await name_index.resolve('faction', faction_name))
         
-        if not faction_data:
-            await send_message(
-                msg="❌ Faction not found! Use `/faction list` to see available factions.",
-                inter=inter,
-                ephemeral=True
-            )
-            return
-        
-        faction = faction_data[0]
+        if not faction:
+            return "❌ Faction not found! Use `/faction list` to see available factions."
         
         # Join faction
         player.faction_id = faction['id']
         await player.save()
         
         # Update faction member count
-        await db.execute_command(
-            "UPDATE factions SET member_count = member_count + 1 WHERE id = $1",
+        await db.execute_named_command(
+            "factions.add_member",
             faction['id']
         )
         
@@ -140,33 +148,33 @@ class Factions(commands.Cog):
             inline=False
         )
         
-        await send_message(embed=embed, inter=inter)
+        return embed
 
     @faction_group.sub_command(name="leave", description="Leave your current faction")
     async def faction_leave(self, inter: disnake.AppCmdInter):
         """Leave your current faction."""
-        player = await Player.get_or_create(inter.author.id, inter.author.display_name)
         db = await get_db()
+        async with GameSession(inter.author.id, inter.author.display_name) as session:
+            reply = await self._leave(session, db)
+        
+        if isinstance(reply, disnake.Embed):
+            self.roster_version += 1
+        await send_reply(inter, reply)
+
+    async def _leave(self, session: GameSession, db: DatabaseManager) -> Union[disnake.Embed, str]:
+        """Leave the player's faction; returns the reply embed or a refusal message."""
+        player = await session.player()
         
         if not player.faction_id:
-            await send_message(
-                msg="❌ You're not a member of any faction!",
-                inter=inter,
-                ephemeral=True
-            )
-            return
+            return "❌ You're not a member of any faction!"
         
         # Get current faction name
-        faction_data = await db.execute_query(
-            "SELECT name FROM factions WHERE id = $1",
-            player.faction_id
-        )
-        
-        faction_name = faction_data[0]['name'] if faction_data else "Unknown"
+        faction = world.factions.get(player.faction_id)
+        faction_name = faction.name if faction else "Unknown"
         
         # Update faction member count
-        await db.execute_command(
-            "UPDATE factions SET member_count = member_count - 1 WHERE id = $1",
+        await db.execute_named_command(
+            "factions.remove_member",
             player.faction_id
         )
         
@@ -181,42 +189,45 @@ class Factions(commands.Cog):
             color=0xff9900
         )
         
-        await send_message(embed=embed, inter=inter)
+        return embed
 
     @faction_group.sub_command(name="info", description="View detailed faction information")
     async def faction_info(
         self,
         inter: disnake.AppCmdInter,
-        faction_name: Optional[str] = commands.Param(default=None, description="Faction to view (default: your faction)")
+        faction_name: Optional[str] = commands.Param(
+            default=None, description="Faction to view (default: your faction)", autocomplete=autocomplete_faction
+        )
     ):
         """Display detailed information about a faction."""
-        player = await Player.get_or_create(inter.author.id, inter.author.display_name)
         db = await get_db()
+        async with GameSession(inter.author.id, inter.author.display_name) as session:
+            reply = await self._info(session, db, faction_name)
+        
+        await send_reply(inter, reply)
+
+    async def _info(self, session: GameSession,
+                    db: DatabaseManager, faction_name: Optional[str]) -> Union[disnake.Embed, str]:
+        """Build the faction info view; returns the reply embed or a refusal message."""
+        player = await session.player()
         
         # Determine which faction to show
         if faction_name:
-            faction_data = await db.execute_query(
-                "SELECT * FROM factions WHERE LOWER(name) = LOWER($1)",
-                faction_name
-            )
-            if not faction_data:
-                await send_message(
-                    msg="❌ Faction not found! Use `/faction list` to see available factions.",
-                    inter=inter,
-                    ephemeral=True
+            faction_id = await name_index.resolve('faction', faction_name)
+            faction_data = []
+            if faction_id is not None:
+                faction_data = await db.execute_named_query(
+                    "factions.get",
+                    faction_id
                 )
-                return
+            if not faction_data:
+                return "❌ Faction not found! Use `/faction list` to see available factions."
         else:
             if not player.faction_id:
-                await send_message(
-                    msg="❌ You're not in a faction! Specify a faction name or join one first.",
-                    inter=inter,
-                    ephemeral=True
-                )
-                return
+                return "❌ You're not in a faction! Specify a faction name or join one first."
             
-            faction_data = await db.execute_query(
-                "SELECT * FROM factions WHERE id = $1",
+            faction_data = await db.execute_named_query(
+                "factions.get",
                 player.faction_id
             )
         
@@ -261,15 +272,8 @@ class Factions(commands.Cog):
             )
         
         # Get top contributors
-        top_contributors = await db.execute_query(
-            """SELECT p.username, 
-                      COALESCE(SUM(th.total_value), 0) as contribution
-               FROM players p
-               LEFT JOIN trade_history th ON p.user_id = th.user_id
-               WHERE p.faction_id = $1
-               GROUP BY p.user_id, p.username
-               ORDER BY contribution DESC
-               LIMIT 5""",
+        top_contributors = await db.execute_named_query(
+            "factions.top_contributors",
             faction['id']
         )
         
@@ -288,7 +292,7 @@ class Factions(commands.Cog):
         if not is_member:
             embed.set_footer(text=f"Use /faction join {faction['name']} to join this faction!")
         
-        await send_message(embed=embed, inter=inter)
+        return embed
 
     @faction_group.sub_command(name="wars", description="View current faction war status")
     async def faction_wars(self, inter: disnake.AppCmdInter):
@@ -296,12 +300,7 @@ class Factions(commands.Cog):
         db = await get_db()
         
         # Get current week's faction war
-        current_war = await db.execute_query(
-            """SELECT * FROM faction_wars 
-               WHERE is_active = true 
-               ORDER BY week_start DESC 
-               LIMIT 1"""
-        )
+        current_war = await db.execute_shared_query("faction_wars.current", ttl=FACTION_WARS_TTL)
         
         embed = await create_bot_author_embed(
             title="⚔️ Faction Wars",
@@ -313,18 +312,10 @@ class Factions(commands.Cog):
             war = current_war[0]
             
             # Get faction standings for current war
-            faction_standings = await db.execute_query(
-                """SELECT f.name, f.member_count,
-                          COALESCE(SUM(th.total_value), 0) as war_contribution,
-                          COUNT(DISTINCT th.user_id) as active_members
-                   FROM factions f
-                   LEFT JOIN players p ON f.id = p.faction_id
-                   LEFT JOIN trade_history th ON p.user_id = th.user_id 
-                       AND th.timestamp >= $1 
-                       AND th.timestamp <= $2
-                   GROUP BY f.id, f.name, f.member_count
-                   ORDER BY war_contribution DESC""",
-                war['week_start'], war['week_end']
+            faction_standings = await db.execute_shared_query(
+                "faction_wars.standings",
+                war['week_start'], war['week_end'],
+                ttl=FACTION_WARS_TTL
             )
             
             embed.add_field(
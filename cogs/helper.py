@@ -2,6 +2,13 @@ from typing import Optional, Union, List
 import disnake
 from disnake.ext import commands
 from util import logger
+from models.names import name_index
+from models.arrivals import arrival_scheduler
+
+
+# Discord's limits on an embed's description and on each field's value.
+EMBED_DESCRIPTION_LIMIT = 4096
+EMBED_FIELD_LIMIT = 1024
 
 
 async def send_message(
@@ -76,4 +83,71 @@ async def send_message(
             )
         )
 
-    return final_msgs
\ No newline at end of file
+    return final_msgs
+
+
+async def send_reply(inter: disnake.AppCmdInter, reply: Union[disnake.Embed, str]):
+    """Send a command's reply: an embed, or a refusal message only its author sees.
+
+    Commands build the reply inside their GameSession block and send it after
+    the block, so Discord is never awaited while the player's lock and
+    transaction are held.
+    """
+    if isinstance(reply, str):
+        await send_message(msg=reply, inter=inter, ephemeral=True)
+    else:
+        await send_message(embed=reply, inter=inter)
+
+
+async def refuse_in_flight(inter: disnake.AppCmdInter) -> bool:
+    """Tell the player their ship is still in flight, if it is. Returns whether it was."""
+    arrive_at = arrival_scheduler.arrival(inter.author.id)
+    if arrive_at is None:
+        return False
+    await send_message(msg=in_flight_message(inter.author.id, arrive_at), inter=inter, ephemeral=True)
+    return True
+
+
+def in_flight_message(user_id: int, arrive_at: Optional[float] = None) -> str:
+    """Refusal for a command made while the player's ship is in flight."""
+    if arrive_at is None:
+        arrive_at = arrival_scheduler.arrival(user_id)
+    lands = f" and lands <t:{int(arrive_at)}:R>" if arrive_at is not None else ""
+    return f"🚀 Your ship is in flight{lands}. Wait until you arrive!"
+
+
+def fit_lines(lines: List[str], limit: int = EMBED_FIELD_LIMIT) -> str:
+    """Join as many leading lines as fit in ``limit`` characters, noting how many were left out."""
+    text = ""
+    for shown, line in enumerate(lines):
+        more = f"…and {len(lines) - shown} more"
+        # Keep room to say what was cut if the rest does not fit.
+        if len(text) + len(line) + 1 + (len(more) if shown < len(lines) - 1 else 0) > limit:
+            return text + more
+        text += line + "\n"
+    return text
+
+
+async def autocomplete_planet(inter: disnake.AppCmdInter, string: str) -> List[str]:
+    """Suggest planet names while an option is typed."""
+    return await name_index.complete('planet', string)
+
+
+async def autocomplete_commodity(inter: disnake.AppCmdInter, string: str) -> List[str]:
+    """Suggest commodity names while an option is typed."""
+    return await name_index.complete('commodity', string)
+
+
+async def autocomplete_faction(inter: disnake.AppCmdInter, string: str) -> List[str]:
+    """Suggest faction names while an option is typed."""
+    return await name_index.complete('faction', string)
+
+
+async def autocomplete_upgrade(inter: disnake.AppCmdInter, string: str) -> List[str]:
+    """Suggest ship upgrade names while an option is typed."""
+    return await name_index.complete('upgrade', string)
+
+
+async def autocomplete_paint_job(inter: disnake.AppCmdInter, string: str) -> List[str]:
+    """Suggest paint job names while an option is typed."""
+    return await name_index.complete('paint_job', string)
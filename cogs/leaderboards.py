@@ -6,6 +6,10 @@ from cogs.helper import send_message
 from util.botembed import create_bot_author_embed
 
 
+# Seconds a leaderboard result is reused for when many players ask at once.
+LEADERBOARD_TTL = 10
+
+
 class Leaderboards(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -35,14 +39,7 @@ class Leaderboards(commands.Cog):
 
     async def _show_net_worth_leaderboard(self, inter, db):
         """Show net worth leaderboard."""
-        players = await db.execute_query(
-            """SELECT username, net_worth, current_planet, 
-                      CASE WHEN faction_id IS NOT NULL THEN f.name ELSE 'Independent' END as faction_name
-               FROM players p
-               LEFT JOIN factions f ON p.faction_id = f.id
-               ORDER BY net_worth DESC
-               LIMIT 15"""
-        )
+        players = await db.execute_shared_query("leaderboard.net_worth", ttl=LEADERBOARD_TTL)
         
         embed = await create_bot_author_embed(
             title="💎 Galactic Wealth Rankings",
@@ -66,15 +63,7 @@ class Leaderboards(commands.Cog):
 
     async def _show_trades_leaderboard(self, inter, db):
         """Show total trades leaderboard."""
-        players = await db.execute_query(
-            """SELECT username, total_trades, net_worth,
-                      CASE WHEN faction_id IS NOT NULL THEN f.name ELSE 'Independent' END as faction_name
-               FROM players p
-               LEFT JOIN factions f ON p.faction_id = f.id
-               WHERE total_trades > 0
-               ORDER BY total_trades DESC
-               LIMIT 15"""
-        )
+        players = await db.execute_shared_query("leaderboard.trades", ttl=LEADERBOARD_TTL)
         
         embed = await create_bot_author_embed(
             title="📈 Most Active Traders",
@@ -98,15 +87,7 @@ class Leaderboards(commands.Cog):
 
     async def _show_jumps_leaderboard(self, inter, db):
         """Show total jumps leaderboard."""
-        players = await db.execute_query(
-            """SELECT username, total_jumps, successful_jumps, net_worth,
-                      CASE WHEN faction_id IS NOT NULL THEN f.name ELSE 'Independent' END as faction_name
-               FROM players p
-               LEFT JOIN factions f ON p.faction_id = f.id
-               WHERE total_jumps > 0
-               ORDER BY total_jumps DESC
-               LIMIT 15"""
-        )
+        players = await db.execute_shared_query("leaderboard.jumps", ttl=LEADERBOARD_TTL)
         
         embed = await create_bot_author_embed(
             title="🚀 Galactic Explorers",
@@ -131,16 +112,7 @@ class Leaderboards(commands.Cog):
 
     async def _show_success_rate_leaderboard(self, inter, db):
         """Show jump success rate leaderboard."""
-        players = await db.execute_query(
-            """SELECT username, total_jumps, successful_jumps, net_worth,
-                      CASE WHEN faction_id IS NOT NULL THEN f.name ELSE 'Independent' END as faction_name,
-                      (successful_jumps::float / GREATEST(total_jumps, 1)) * 100 as success_rate
-               FROM players p
-               LEFT JOIN factions f ON p.faction_id = f.id
-               WHERE total_jumps >= 10
-               ORDER BY success_rate DESC, total_jumps DESC
-               LIMIT 15"""
-        )
+        players = await db.execute_shared_query("leaderboard.success_rate", ttl=LEADERBOARD_TTL)
         
         embed = await create_bot_author_embed(
             title="🎯 Master Navigators",
@@ -165,14 +137,7 @@ class Leaderboards(commands.Cog):
     async def _show_faction_contribution_leaderboard(self, inter, db):
         """Show faction contribution leaderboard."""
         # Get faction standings
-        factions = await db.execute_query(
-            """SELECT f.name, f.member_count, f.total_contribution,
-                      COALESCE(AVG(p.net_worth), 0) as avg_member_wealth
-               FROM factions f
-               LEFT JOIN players p ON f.id = p.faction_id
-               GROUP BY f.id, f.name, f.member_count, f.total_contribution
-               ORDER BY f.total_contribution DESC"""
-        )
+        factions = await db.execute_shared_query("leaderboard.factions", ttl=LEADERBOARD_TTL)
         
         embed = await create_bot_author_embed(
             title="🏛️ Faction Power Rankings",
@@ -195,16 +160,7 @@ class Leaderboards(commands.Cog):
         )
         
         # Get top individual contributors
-        top_contributors = await db.execute_query(
-            """SELECT p.username, f.name as faction_name,
-                      COALESCE(SUM(th.total_value), 0) as total_contribution
-               FROM players p
-               JOIN factions f ON p.faction_id = f.id
-               LEFT JOIN trade_history th ON p.user_id = th.user_id
-               GROUP BY p.user_id, p.username, f.name
-               ORDER BY total_contribution DESC
-               LIMIT 10"""
-        )
+        top_contributors = await db.execute_shared_query("leaderboard.contributors", ttl=LEADERBOARD_TTL)
         
         if top_contributors:
             contributor_text = ""
@@ -1,9 +1,10 @@
 import disnake
 from disnake.ext import commands
+from typing import Union
 
-from models.database import get_db
-from models.player import Player
-from cogs.helper import send_message
+from models.session import GameSession
+from models.names import name_index
+from cogs.helper import send_message, send_reply, autocomplete_upgrade, autocomplete_paint_job
 from util.botembed import create_bot_author_embed
 
 
@@ -83,82 +84,86 @@ class Shop(commands.Cog):
                 'cost': 2200
             }
         }
+        
+        name_index.register('upgrade', {upgrade['name']: uid for uid, upgrade in self.upgrades.items()})
+        name_index.register('paint_job', {paint['name']: pid for pid, paint in self.paint_jobs.items()})
 
     @commands.slash_command(name="shop", description="Browse available ship upgrades and customizations")
     async def shop(self, inter: disnake.AppCmdInter):
         """Display the ship upgrade shop."""
-        player = await Player.get_or_create(inter.author.id, inter.author.display_name)
-        ship = await player.get_ship()
-        
-        embed = await create_bot_author_embed(
-            title="🛒 Galactic Ship Emporium",
-            description=f"**Your Credits:** {player.credits:,}\n"
-                       f"**Current Ship:** {ship['name']}",
-            color=0x00ccff
-        )
-        
-        # Performance Upgrades
-        upgrade_text = ""
-        for upgrade_id, upgrade in self.upgrades.items():
-            # Calculate current level based on ship stats
-            current_level = self._get_current_upgrade_level(ship, upgrade)
-            max_level = upgrade['max_level']
+        async with GameSession(inter.author.id, inter.author.display_name) as session:
+            player = await session.player()
+            ship = await player.get_ship()
             
-            if current_level >= max_level:
-                status = "✅ MAXED"
-                cost_text = "---"
-            else:
-                status = f"Level {current_level}/{max_level}"
-                # Scale cost based on current level
-                scaled_cost = upgrade['cost'] * (1 + current_level * 0.5)
-                cost_text = f"{scaled_cost:,.0f} cr"
+            embed = await create_bot_author_embed(
+                title="🛒 Galactic Ship Emporium",
+                description=f"**Your Credits:** {player.credits:,}\n"
+                           f"**Current Ship:** {ship['name']}",
+                color=0x00ccff
+            )
             
-            affordable = "💰" if player.credits >= upgrade['cost'] * (1 + current_level * 0.5) else "❌"
+            # Performance Upgrades
+            upgrade_text = ""
+            for upgrade_id, upgrade in self.upgrades.items():
+                # Calculate current level based on ship stats
+                current_level = self._get_current_upgrade_level(ship, upgrade)
+                max_level = upgrade['max_level']
+                
+                if current_level >= max_level:
+                    status = "✅ MAXED"
+                    cost_text = "---"
+                else:
+                    status = f"Level {current_level}/{max_level}"
+                    # Scale cost based on current level
+                    scaled_cost = upgrade['cost'] * (1 + current_level * 0.5)
+                    cost_text = f"{scaled_cost:,.0f} cr"
+                
+                affordable = "💰" if player.credits >= upgrade['cost'] * (1 + current_level * 0.5) else "❌"
+                
+                upgrade_text += f"{affordable} **{upgrade['name']}** - {cost_text}\n"
+                upgrade_text += f"   {upgrade['description']} ({status})\n\n"
             
-            upgrade_text += f"{affordable} **{upgrade['name']}** - {cost_text}\n"
-            upgrade_text += f"   {upgrade['description']} ({status})\n\n"
-        
-        embed.add_field(
-            name="⚙️ Performance Upgrades",
-            value=upgrade_text,
-            inline=False
-        )
-        
-        # Paint Jobs
-        paint_text = ""
-        for paint_id, paint in self.paint_jobs.items():
-            if ship['paint_job'] == paint['name']:
-                status = "✅ EQUIPPED"
-                cost_text = "---"
-                affordable = "✅"
-            else:
-                status = "Available"
-                cost_text = f"{paint['cost']:,} cr"
-                affordable = "💰" if player.credits >= paint['cost'] else "❌"
+            embed.add_field(
+                name="⚙️ Performance Upgrades",
+                value=upgrade_text,
+                inline=False
+            )
             
-            paint_text += f"{affordable} **{paint['name']}** - {cost_text}\n"
-            paint_text += f"   {paint['description']} ({status})\n\n"
-        
-        embed.add_field(
-            name="🎨 Paint Jobs",
-            value=paint_text,
-            inline=False
-        )
-        
-        # Fuel
-        fuel_cost_per_unit = 10
-        max_fuel_purchase = min(100, (player.credits // fuel_cost_per_unit))
-        
-        embed.add_field(
-            name="⛽ Fuel Station",
-            value=f"**Fuel Price:** {fuel_cost_per_unit} cr per unit\n"
-                  f"**Current Fuel:** {player.fuel} units\n"
-                  f"**Max Purchase:** {max_fuel_purchase} units\n"
-                  f"Use `/buy fuel <amount>` to refuel",
-            inline=False
-        )
-        
-        embed.set_footer(text="Use /buy upgrade <name> or /buy paint <name> to purchase!")
+            # Paint Jobs
+            paint_text = ""
+            for paint_id, paint in self.paint_jobs.items():
+                if ship['paint_job'] == paint['name']:
+                    status = "✅ EQUIPPED"
+                    cost_text = "---"
+                    affordable = "✅"
+                else:
+                    status = "Available"
+                    cost_text = f"{paint['cost']:,} cr"
+                    affordable = "💰" if player.credits >= paint['cost'] else "❌"
+                
+                paint_text += f"{affordable} **{paint['name']}** - {cost_text}\n"
+                paint_text += f"   {paint['description']} ({status})\n\n"
+            
+            embed.add_field(
+                name="🎨 Paint Jobs",
+                value=paint_text,
+                inline=False
+            )
+            
+            # Fuel
+            fuel_cost_per_unit = 10
+            max_fuel_purchase = min(100, (player.credits // fuel_cost_per_unit))
+            
+            embed.add_field(
+                name="⛽ Fuel Station",
+                value=f"**Fuel Price:** {fuel_cost_per_unit} cr per unit\n"
+                      f"**Current Fuel:** {player.fuel} units\n"
+                      f"**Max Purchase:** {max_fuel_purchase} units\n"
+                      f"Use `/buy fuel <amount>` to refuel",
+                inline=False
+            )
+            
+            embed.set_footer(text="Use /buy upgrade <name> or /buy paint <name> to purchase!")
         
         await send_message(embed=embed, inter=inter)
 
@@ -192,19 +197,11 @@ class Shop(commands.Cog):
     async def buy_upgrade(
         self,
         inter: disnake.AppCmdInter,
-        upgrade_name: str = commands.Param(description="Name of upgrade to purchase")
+        upgrade_name: str = commands.Param(description="Name of upgrade to purchase", autocomplete=autocomplete_upgrade)
     ):
         """Purchase a ship upgrade."""
-        player = await Player.get_or_create(inter.author.id, inter.author.display_name)
-        ship = await player.get_ship()
-        db = await get_db()
-        
         # Find upgrade
-        upgrade_id = None
-        for uid, upgrade in self.upgrades.items():
-            if upgrade_name.lower() in upgrade['name'].lower():
-                upgrade_id = uid
-                break
+        upgrade_id = await name_index.resolve('upgrade', upgrade_name)
         
         if not upgrade_id:
             await send_message(
@@ -214,29 +211,29 @@ class Shop(commands.Cog):
             )
             return
         
+        async with GameSession(inter.author.id, inter.author.display_name) as session:
+            reply = await self._buy_upgrade(session, upgrade_id)
+        
+        await send_reply(inter, reply)
+
+    async def _buy_upgrade(self, session: GameSession, upgrade_id: int) -> Union[disnake.Embed, str]:
+        """Install an upgrade; returns the reply embed or a refusal message."""
+        player = await session.player()
+        ship = await player.get_ship()
+        
         upgrade = self.upgrades[upgrade_id]
         current_level = self._get_current_upgrade_level(ship, upgrade)
         
         # Check if already maxed
         if current_level >= upgrade['max_level']:
-            await send_message(
-                msg=f"❌ **{upgrade['name']}** is already at maximum level!",
-                inter=inter,
-                ephemeral=True
-            )
-            return
+            return f"❌ **{upgrade['name']}** is already at maximum level!"
         
         # Calculate cost (scales with level)
         scaled_cost = int(upgrade['cost'] * (1 + current_level * 0.5))
         
         # Check if player can afford it
         if player.credits < scaled_cost:
-            await send_message(
-                msg=f"❌ Insufficient credits! You need {scaled_cost:,} but only have {player.credits:,}.",
-                inter=inter,
-                ephemeral=True
-            )
-            return
+            return f"❌ Insufficient credits! You need {scaled_cost:,} but only have {player.credits:,}."
         
         # Apply upgrade
         player.credits -= scaled_cost
@@ -246,11 +243,10 @@ class Shop(commands.Cog):
         effect = upgrade['effect']
         new_value = ship[effect] + upgrade['value']
         
-        await db.execute_command(
-            f"UPDATE ships SET {effect} = $2, total_upgrade_cost = total_upgrade_cost + $3 WHERE user_id = $1",
-            player.user_id, new_value, scaled_cost,
-            user_id=player.user_id
-        )
+        await session.update_ship(**{
+            effect: new_value,
+            'total_upgrade_cost': ship['total_upgrade_cost'] + scaled_cost
+        })
         
         embed = await create_bot_author_embed(
             title="✅ Upgrade Installed!",
@@ -263,25 +259,17 @@ class Shop(commands.Cog):
         embed.add_field(name="Remaining Credits", value=f"{player.credits:,} cr", inline=True)
         embed.add_field(name="Effect", value=upgrade['description'], inline=False)
         
-        await send_message(embed=embed, inter=inter)
+        return embed
 
     @buy_group.sub_command(name="paint", description="Buy a paint job for your ship")
     async def buy_paint(
         self,
         inter: disnake.AppCmdInter,
-        paint_name: str = commands.Param(description="Name of paint job to purchase")
+        paint_name: str = commands.Param(description="Name of paint job to purchase", autocomplete=autocomplete_paint_job)
     ):
         """Purchase a paint job for ship customization."""
-        player = await Player.get_or_create(inter.author.id, inter.author.display_name)
-        ship = await player.get_ship()
-        db = await get_db()
-        
         # Find paint job
-        paint_id = None
-        for pid, paint in self.paint_jobs.items():
-            if paint_name.lower() in paint['name'].lower():
-                paint_id = pid
-                break
+        paint_id = await name_index.resolve('paint_job', paint_name)
         
         if not paint_id:
             await send_message(
@@ -291,34 +279,33 @@ class Shop(commands.Cog):
             )
             return
         
+        async with GameSession(inter.author.id, inter.author.display_name) as session:
+            reply = await self._buy_paint(session, paint_id)
+        
+        await send_reply(inter, reply)
+
+    async def _buy_paint(self, session: GameSession, paint_id: int) -> Union[disnake.Embed, str]:
+        """Apply a paint job; returns the reply embed or a refusal message."""
+        player = await session.player()
+        ship = await player.get_ship()
+        
         paint = self.paint_jobs[paint_id]
         
         # Check if already equipped
         if ship['paint_job'] == paint['name']:
-            await send_message(
-                msg=f"❌ **{paint['name']}** is already equipped on your ship!",
-                inter=inter,
-                ephemeral=True
-            )
-            return
+            return f"❌ **{paint['name']}** is already equipped on your ship!"
         
         # Check if player can afford it
         if player.credits < paint['cost']:
-            await send_message(
-                msg=f"❌ Insufficient credits! You need {paint['cost']:,} but only have {player.credits:,}.",
-                inter=inter,
-                ephemeral=True
-            )
-            return
+            return f"❌ Insufficient credits! You need {paint['cost']:,} but only have {player.credits:,}."
         
         # Apply paint job
         player.credits -= paint['cost']
         await player.save()
         
-        await db.execute_command(
-            "UPDATE ships SET paint_job = $2, total_upgrade_cost = total_upgrade_cost + $3 WHERE user_id = $1",
-            player.user_id, paint['name'], paint['cost'],
-            user_id=player.user_id
+        await session.update_ship(
+            paint_job=paint['name'],
+            total_upgrade_cost=ship['total_upgrade_cost'] + paint['cost']
         )
         
         embed = await create_bot_author_embed(
@@ -331,7 +318,7 @@ class Shop(commands.Cog):
         embed.add_field(name="Remaining Credits", value=f"{player.credits:,} cr", inline=True)
         embed.add_field(name="Description", value=paint['description'], inline=False)
         
-        await send_message(embed=embed, inter=inter)
+        return embed
 
     @buy_group.sub_command(name="fuel", description="Purchase fuel for your ship")
     async def buy_fuel(
@@ -348,7 +335,14 @@ class Shop(commands.Cog):
             )
             return
         
-        player = await Player.get_or_create(inter.author.id, inter.author.display_name)
+        async with GameSession(inter.author.id, inter.author.display_name) as session:
+            reply = await self._buy_fuel(session, amount)
+        
+        await send_reply(inter, reply)
+
+    async def _buy_fuel(self, session: GameSession, amount: int) -> Union[disnake.Embed, str]:
+        """Buy fuel; returns the reply embed or a refusal message."""
+        player = await session.player()
         
         fuel_cost_per_unit = 10
         total_cost = amount * fuel_cost_per_unit
@@ -356,23 +350,13 @@ class Shop(commands.Cog):
         # Check if player can afford it
         if player.credits < total_cost:
             max_affordable = player.credits // fuel_cost_per_unit
-            await send_message(
-                msg=f"❌ Insufficient credits! You can afford {max_affordable} units for {max_affordable * fuel_cost_per_unit:,} credits.",
-                inter=inter,
-                ephemeral=True
-            )
-            return
+            return f"❌ Insufficient credits! You can afford {max_affordable} units for {max_affordable * fuel_cost_per_unit:,} credits."
         
         # Check fuel capacity (max 1000 units)
         max_fuel = 1000
         if player.fuel + amount > max_fuel:
             available_capacity = max_fuel - player.fuel
-            await send_message(
-                msg=f"❌ Fuel tank capacity exceeded! You can only add {available_capacity} more units.",
-                inter=inter,
-                ephemeral=True
-            )
-            return
+            return f"❌ Fuel tank capacity exceeded! You can only add {available_capacity} more units."
         
         # Purchase fuel
         player.credits -= total_cost
@@ -389,7 +373,7 @@ class Shop(commands.Cog):
         embed.add_field(name="New Fuel Level", value=f"{player.fuel}/1000 units", inline=True)
         embed.add_field(name="Remaining Credits", value=f"{player.credits:,} cr", inline=True)
         
-        await send_message(embed=embed, inter=inter)
+        return embed
 
 
 def setup(bot):
@@ -1,12 +1,54 @@
 import disnake
 from disnake.ext import commands
-from typing import Optional
+from typing import Optional, Union, Dict, List, Tuple, Any
 import random
 
-from models.database import get_db
-from models.player import Player
-from cogs.helper import send_message
+from models.session import GameSession
+from models.networth import net_worth_engine
+from models.market import market_engine, MarketSnapshot
+from models.routes import route_optimizer
+from models.navigation import route_planner
+from models.pricehistory import price_history, RESOLUTION_SECONDS
+from models.names import name_index
+from models.world import world
+from cogs.helper import (
+    send_message, send_reply, refuse_in_flight, in_flight_message, fit_lines, autocomplete_planet, autocomplete_commodity, EMBED_DESCRIPTION_LIMIT
+)
 from util.botembed import create_bot_author_embed
+from util.embedcache import embed_cache
+
+# Bars used to sketch a price chart, lowest first.
+SPARK_BARS = "▁▂▃▄▅▆▇█"
+
+# Most legs a single /trade batch may settle.
+MAX_BATCH_LEGS = 10
+
+# Most planets /market scan lists, one field each; well inside an embed's limits.
+MAX_SCAN_PLANETS = 12
+
+
+def parse_trade_legs(orders: str) -> List[Tuple[str, str, int]]:
+    """Parse ``"sell ore 20, buy quantum crystals 5"`` into (action, commodity, amount) legs."""
+    legs = []
+    for order in orders.replace(";", ",").split(","):
+        words = order.split()
+        if not words:
+            continue
+        if len(words) < 3 or words[0].lower() not in ("buy", "sell"):
+            raise ValueError(f"`{order.strip()}` is not of the form `buy|sell <commodity> <amount>`.")
+        try:
+            amount = int(words[-1])
+        except ValueError:
+            raise ValueError(f"`{words[-1]}` is not a whole number of units.")
+        if amount <= 0:
+            raise ValueError("Amounts must be greater than 0!")
+        # Commodity names may be several words long.
+        legs.append((words[0].lower(), " ".join(words[1:-1]), amount))
+    if not legs:
+        raise ValueError("Give at least one order, e.g. `sell ore 20, buy spice 5`.")
+    if len(legs) > MAX_BATCH_LEGS:
+        raise ValueError(f"A batch can hold at most {MAX_BATCH_LEGS} orders.")
+    return legs
 
 
 class Trading(commands.Cog):
@@ -17,36 +59,36 @@ class Trading(commands.Cog):
     async def market_group(self, inter):
         pass
 
-    @market_group.sub_command(name="scan", description="View current market prices across all planets")
+    @market_group.sub_command(name="scan", description="View market prices here and on the nearest planets")
     async def market_scan(self, inter: disnake.AppCmdInter):
-        """Display market prices for all commodities across planets."""
-        db = await get_db()
-        
-        # Get all market data
-        market_data = await db.execute_query(
-            """SELECT mp.planet, mp.commodity, mp.current_price, mp.supply_level, mp.demand_level,
-                      c.base_price, p.danger_level
-               FROM market_prices mp
-               JOIN commodities c ON mp.commodity = c.name
-               JOIN planets p ON mp.planet = p.name
-               ORDER BY mp.planet, mp.commodity"""
+        """Display market prices at the player's planet and the nearest planets within jump range."""
+        async with GameSession(inter.author.id, inter.author.display_name) as session:
+            player = await session.player()
+            planet = player.current_planet
+        
+        snapshot = await market_engine.current()
+        await world.ensure_loaded()
+        embed = await embed_cache.get(
+            "market_scan", planet, (snapshot.version, world.version),
+            lambda: self._render_market_scan(planet, snapshot)
         )
+        await send_message(embed=embed, inter=inter)
+
+    async def _render_market_scan(self, planet: str, snapshot: MarketSnapshot) -> disnake.Embed:
+        """Build the market scan embed around a planet for a snapshot."""
+        nearby = [planet] if planet in world.planets else []
+        if nearby:
+            nearby += [destination.name for destination, _ in world.in_range(planet)]
+        markets = [name for name in nearby if snapshot.planet(name)]
         
         embed = await create_bot_author_embed(
             title="🌌 Galactic Market Scanner",
-            description="Real-time commodity prices across all planets",
+            description=f"Real-time commodity prices at {planet} and the nearest planets within jump range",
             color=0x00ff88
         )
         
-        # Group by planet
-        planets = {}
-        for row in market_data:
-            planet = row['planet']
-            if planet not in planets:
-                planets[planet] = []
-            planets[planet].append(row)
-        
-        for planet, commodities in planets.items():
+        for name in markets[:MAX_SCAN_PLANETS]:
+            commodities = snapshot.planet(name)
             danger_emoji = "🟢" if commodities[0]['danger_level'] <= 2 else "🟡" if commodities[0]['danger_level'] <= 3 else "🔴"
             
             market_text = ""
@@ -67,48 +109,53 @@ class Trading(commands.Cog):
                 market_text += f"{trend} **{commodity['commodity']}**: {price:,} cr (S:{supply} D:{demand})\n"
             
             embed.add_field(
-                name=f"{danger_emoji} {planet}",
+                name=f"{danger_emoji} {name}",
                 value=market_text,
                 inline=True
             )
         
-        embed.set_footer(text="💡 Tip: Higher danger planets often have better prices!")
-        await send_message(embed=embed, inter=inter)
+        hidden = len(markets) - MAX_SCAN_PLANETS
+        if hidden > 0:
+            embed.set_footer(text=f"💡 {hidden} more markets in range. Use /market planet to see any planet's prices.")
+        else:
+            embed.set_footer(text="💡 Tip: Higher danger planets often have better prices!")
+        return embed
 
     @market_group.sub_command(name="planet", description="View detailed market info for a specific planet")
     async def market_planet(
         self, 
         inter: disnake.AppCmdInter,
-        planet: str = commands.Param(description="Planet name to check")
+        planet: str = commands.Param(description="Planet name to check", autocomplete=autocomplete_planet)
     ):
         """Display detailed market information for a specific planet."""
-        db = await get_db()
-        
-        # Validate planet exists
-        planet_data = await db.execute_query(
-            "SELECT * FROM planets WHERE LOWER(name) = LOWER($1)",
-            planet
-        )
+        planet = await name_index.canonical('planet', planet)
+        embed = None
+        if planet:
+            snapshot = await market_engine.current()
+            embed = await embed_cache.get(
+                "market_planet", planet, (snapshot.version, world.version),
+                lambda: self._render_market_planet(planet, snapshot)
+            )
         
-        if not planet_data:
+        if embed is None:
             await send_message(
-                msg="❌ Planet not found! Use `/market scan` to see all available planets.",
+                msg="❌ Planet not found! Use `/market scan` to see the planets near you.",
                 inter=inter,
                 ephemeral=True
             )
             return
         
-        planet_info = planet_data[0]
+        await send_message(embed=embed, inter=inter)
+
+    async def _render_market_planet(self, planet: str, snapshot: MarketSnapshot) -> Optional[disnake.Embed]:
+        """Build the market embed for a planet, or None if there is no such planet."""
+        planet_info = world.planets.get(planet)
+        
+        if not planet_info:
+            return None
         
         # Get market data for this planet
-        market_data = await db.execute_query(
-            """SELECT mp.*, c.description, c.base_price
-               FROM market_prices mp
-               JOIN commodities c ON mp.commodity = c.name
-               WHERE mp.planet = $1
-               ORDER BY mp.commodity""",
-            planet_info['name']
-        )
+        market_data = snapshot.planet(planet_info['name'])
         
         danger_emoji = "🟢" if planet_info['danger_level'] <= 2 else "🟡" if planet_info['danger_level'] <= 3 else "🔴"
         
@@ -117,7 +164,7 @@ class Trading(commands.Cog):
             description=f"*{planet_info['description']}*\n\n"
                        f"**Danger Level:** {planet_info['danger_level']}/5\n"
                        f"**Market Modifier:** {planet_info['market_modifier']:.1f}x\n"
-                       f"**Jump Fuel Cost:** {planet_info['fuel_cost']} units",
+                       f"**Coordinates:** ({planet_info['x']:.0f}, {planet_info['y']:.0f})",
             color=0x00ff88
         )
         
@@ -156,8 +203,91 @@ class Trading(commands.Cog):
                 inline=False
             )
         
+        return embed
+
+    @market_group.sub_command(name="history", description="View a commodity's price history on a planet")
+    async def market_history(
+        self,
+        inter: disnake.AppCmdInter,
+        planet: str = commands.Param(description="Planet name", autocomplete=autocomplete_planet),
+        commodity: str = commands.Param(description="Commodity name", autocomplete=autocomplete_commodity),
+        resolution: str = commands.Param(default="6h", description="Candle size", choices=["6h", "1d"])
+    ):
+        """Display open/high/low/close price history for one market."""
+        planet = await name_index.canonical('planet', planet)
+        commodity = await name_index.canonical('commodity', commodity)
+        market = None
+        if planet and commodity:
+            snapshot = await market_engine.current()
+            market = snapshot.get(planet, commodity)
+        
+        if market is None:
+            await send_message(
+                msg="❌ Market not found! Use `/market scan` to see what each planet trades.",
+                inter=inter,
+                ephemeral=True
+            )
+            return
+        
+        embed = await embed_cache.get(
+            "market_history", (market['planet'], market['commodity'], resolution),
+            (snapshot.version, price_history.version),
+            lambda: self._render_market_history(market, resolution)
+        )
         await send_message(embed=embed, inter=inter)
 
+    async def _render_market_history(self, market: Dict[str, Any], resolution: str) -> disnake.Embed:
+        """Build the price history embed for one market from its rollup buckets."""
+        buckets = await price_history.buckets(market['planet'], market['commodity'], resolution)
+        
+        embed = await create_bot_author_embed(
+            title=f"📊 {market['commodity']} on {market['planet']}",
+            description=f"**Current Price:** {market['current_price']:,} cr | **Base Price:** {market['base_price']:,} cr",
+            color=0x00ff88
+        )
+        
+        if not buckets:
+            embed.add_field(
+                name="No History Yet",
+                value="Prices are recorded every market tick. Check back later!",
+                inline=False
+            )
+            return embed
+        
+        # Sketch the closes, scaled between the period's low and high
+        low = min(bucket['low'] for bucket in buckets)
+        high = max(bucket['high'] for bucket in buckets)
+        span = max(high - low, 1)
+        chart = "".join(
+            SPARK_BARS[(bucket['close'] - low) * (len(SPARK_BARS) - 1) // span] for bucket in buckets
+        )
+        
+        first, last = buckets[0], buckets[-1]
+        change = (last['close'] - first['open']) / first['open'] if first['open'] else 0.0
+        trend = "📈" if change > 0 else "📉" if change < 0 else "➡️"
+        period = "six-hour candles" if resolution == "6h" else "daily candles"
+        
+        embed.add_field(
+            name=f"{trend} Last {len(buckets)} {period}",
+            value=f"`{chart}`\n"
+                  f"**Open:** {first['open']:,} cr | **Close:** {last['close']:,} cr ({change:+.1%})\n"
+                  f"**High:** {high:,} cr | **Low:** {low:,} cr",
+            inline=False
+        )
+        
+        recent_text = ""
+        for bucket in buckets[-5:][::-1]:
+            label = bucket['bucket_start'].strftime("%d %b %H:%M" if resolution == "6h" else "%d %b")
+            recent_text += (f"**{label}** O {bucket['open']:,} H {bucket['high']:,} "
+                            f"L {bucket['low']:,} C {bucket['close']:,}\n")
+        embed.add_field(name="🕒 Latest Candles", value=recent_text, inline=False)
+        
+        ticks = int(RESOLUTION_SECONDS[resolution] // market_engine.interval)
+        embed.set_footer(
+            text=f"💡 Markets tick every {market_engine.interval / 60:.0f} minutes, so each candle spans {ticks} ticks."
+        )
+        return embed
+
     @commands.slash_command(name="trade", description="Trading operations")
     async def trade_group(self, inter):
         pass
@@ -166,7 +296,7 @@ class Trading(commands.Cog):
     async def trade_buy(
         self,
         inter: disnake.AppCmdInter,
-        commodity: str = commands.Param(description="Commodity to buy"),
+        commodity: str = commands.Param(description="Commodity to buy", autocomplete=autocomplete_commodity),
         amount: int = commands.Param(description="Amount to buy")
     ):
         """Buy commodities at the current planet."""
@@ -178,111 +308,59 @@ class Trading(commands.Cog):
             )
             return
         
-        player = await Player.get_or_create(inter.author.id, inter.author.display_name)
-        db = await get_db()
-        
-        # Get market price
-        price_data = await db.execute_query(
-            "SELECT current_price FROM market_prices WHERE planet = $1 AND LOWER(commodity) = LOWER($2)",
-            player.current_planet, commodity
-        )
-        
-        if not price_data:
-            await send_message(
-                msg="❌ Commodity not found! Available: Ore, Spice, Tech, Luxuries",
-                inter=inter,
-                ephemeral=True
-            )
+        commodity = await name_index.canonical('commodity', commodity)
+        if commodity is None:
+            await self._commodity_not_found(inter)
             return
         
-        price_per_unit = price_data[0]['current_price']
-        total_cost = price_per_unit * amount
-        
-        # Check if player has enough credits
-        if player.credits < total_cost:
-            await send_message(
-                msg=f"❌ Insufficient credits! You need {total_cost:,} but only have {player.credits:,}.",
-                inter=inter,
-                ephemeral=True
-            )
+        if await refuse_in_flight(inter):
             return
         
-        # Check cargo capacity
-        ship = await player.get_ship()
-        current_cargo = await player.get_total_cargo()
+        async with GameSession(inter.author.id, inter.author.display_name) as session:
+            reply = await self._buy(session, commodity, amount)
         
-        if current_cargo + amount > ship['cargo_capacity']:
-            available_space = ship['cargo_capacity'] - current_cargo
-            await send_message(
-                msg=f"❌ Insufficient cargo space! You can only carry {available_space} more units.",
-                inter=inter,
-                ephemeral=True
-            )
-            return
+        await send_reply(inter, reply)
+
+    async def _buy(self, session: GameSession, commodity: str, amount: int) -> Union[disnake.Embed, str]:
+        """Buy cargo; returns the reply embed or a refusal message."""
+        player = await session.player()
         
-        # Execute trade
-        commodity_name = commodity.title()
+        # Validate, debit, load cargo and log in one statement
+        trade = await session.buy(commodity, amount)
         
-        # Update player credits
-        player.credits -= total_cost
-        player.total_trades += 1
-        await player.save()
+        if trade['status'] == 'in_transit':
+            return in_flight_message(session.user_id)
         
-        # Update inventory
-        current_inventory = await db.execute_query(
-            "SELECT * FROM player_inventory WHERE user_id = $1 AND commodity = $2",
-            player.user_id, commodity_name,
-            user_id=player.user_id
-        )
+        if trade['status'] == 'unknown_commodity':
+            return f"❌ {commodity} is not traded at {player.current_planet}!"
         
-        if current_inventory:
-            # Update existing inventory
-            old_qty = current_inventory[0]['quantity']
-            old_avg_price = current_inventory[0]['average_buy_price']
-            new_qty = old_qty + amount
-            new_avg_price = ((old_qty * old_avg_price) + (amount * price_per_unit)) / new_qty
-            
-            await db.execute_command(
-                "UPDATE player_inventory SET quantity = $3, average_buy_price = $4 WHERE user_id = $1 AND commodity = $2",
-                player.user_id, commodity_name, new_qty, new_avg_price,
-                user_id=player.user_id
-            )
-        else:
-            # Create new inventory entry
-            await db.execute_command(
-                "INSERT INTO player_inventory (user_id, commodity, quantity, average_buy_price) VALUES ($1, $2, $3, $4)",
-                player.user_id, commodity_name, amount, price_per_unit,
-                user_id=player.user_id
-            )
+        if trade['status'] == 'insufficient_credits':
+            return f"❌ Insufficient credits! You need {trade['total_value']:,} but only have {trade['credits']:,}."
         
-        # Log trade
-        await db.execute_command(
-            """INSERT INTO trade_history (user_id, planet, commodity, action, quantity, price_per_unit, total_value)
-               VALUES ($1, $2, $3, 'buy', $4, $5, $6)""",
-            player.user_id, player.current_planet, commodity_name, amount, price_per_unit, total_cost,
-            user_id=player.user_id
-        )
+        if trade['status'] == 'insufficient_cargo':
+            available_space = trade['cargo_capacity'] - trade['cargo_used']
+            return f"❌ Insufficient cargo space! You can only carry {available_space} more units."
         
         # Check achievements
         await player.check_achievements()
         
         embed = await create_bot_author_embed(
             title="✅ Trade Successful!",
-            description=f"Purchased {amount:,} units of **{commodity_name}** for {total_cost:,} credits",
+            description=f"Purchased {amount:,} units of **{trade['commodity']}** for {trade['total_value']:,} credits",
             color=0x00ff00
         )
         
-        embed.add_field(name="Price per Unit", value=f"{price_per_unit:,} cr", inline=True)
-        embed.add_field(name="Remaining Credits", value=f"{player.credits:,} cr", inline=True)
-        embed.add_field(name="Cargo Space Used", value=f"{current_cargo + amount}/{ship['cargo_capacity']}", inline=True)
+        embed.add_field(name="Price per Unit", value=f"{trade['price_per_unit']:,} cr", inline=True)
+        embed.add_field(name="Remaining Credits", value=f"{trade['credits']:,} cr", inline=True)
+        embed.add_field(name="Cargo Space Used", value=f"{trade['cargo_used']}/{trade['cargo_capacity']}", inline=True)
         
-        await send_message(embed=embed, inter=inter)
+        return embed
 
     @trade_group.sub_command(name="sell", description="Sell commodities at current planet")
     async def trade_sell(
         self,
         inter: disnake.AppCmdInter,
-        commodity: str = commands.Param(description="Commodity to sell"),
+        commodity: str = commands.Param(description="Commodity to sell", autocomplete=autocomplete_commodity),
         amount: int = commands.Param(description="Amount to sell")
     ):
         """Sell commodities at the current planet."""
@@ -294,156 +372,325 @@ class Trading(commands.Cog):
             )
             return
         
-        player = await Player.get_or_create(inter.author.id, inter.author.display_name)
-        db = await get_db()
+        commodity = await name_index.canonical('commodity', commodity)
+        if commodity is None:
+            await self._commodity_not_found(inter)
+            return
         
-        commodity_name = commodity.title()
+        if await refuse_in_flight(inter):
+            return
         
-        # Check inventory
-        inventory = await db.execute_query(
-            "SELECT * FROM player_inventory WHERE user_id = $1 AND commodity = $2",
-            player.user_id, commodity_name,
-            user_id=player.user_id
-        )
+        async with GameSession(inter.author.id, inter.author.display_name) as session:
+            reply = await self._sell(session, commodity, amount)
         
-        if not inventory or inventory[0]['quantity'] < amount:
-            current_amount = inventory[0]['quantity'] if inventory else 0
-            await send_message(
-                msg=f"❌ Insufficient {commodity_name}! You have {current_amount} units.",
-                inter=inter,
-                ephemeral=True
-            )
-            return
+        await send_reply(inter, reply)
+
+    async def _sell(self, session: GameSession, commodity: str, amount: int) -> Union[disnake.Embed, str]:
+        """Sell cargo; returns the reply embed or a refusal message."""
+        player = await session.player()
         
-        # Get current market price
-        price_data = await db.execute_query(
-            "SELECT current_price FROM market_prices WHERE planet = $1 AND commodity = $2",
-            player.current_planet, commodity_name
-        )
+        # Validate, credit, unload cargo and log in one statement
+        trade = await session.sell(commodity, amount)
         
-        if not price_data:
-            await send_message(
-                msg="❌ Cannot sell this commodity at current location!",
-                inter=inter,
-                ephemeral=True
-            )
-            return
+        if trade['status'] == 'in_transit':
+            return in_flight_message(session.user_id)
         
-        current_price = price_data[0]['current_price']
-        total_revenue = current_price * amount
-        
-        # Calculate profit/loss
-        avg_buy_price = inventory[0]['average_buy_price']
-        profit_loss = (current_price - avg_buy_price) * amount
-        
-        # Execute sale
-        player.credits += total_revenue
-        player.total_trades += 1
-        await player.save()
-        
-        # Update inventory
-        new_quantity = inventory[0]['quantity'] - amount
-        if new_quantity > 0:
-            await db.execute_command(
-                "UPDATE player_inventory SET quantity = $3 WHERE user_id = $1 AND commodity = $2",
-                player.user_id, commodity_name, new_quantity,
-                user_id=player.user_id
-            )
-        else:
-            await db.execute_command(
-                "DELETE FROM player_inventory WHERE user_id = $1 AND commodity = $2",
-                player.user_id, commodity_name,
-                user_id=player.user_id
-            )
+        if trade['status'] == 'insufficient_quantity':
+            return f"❌ Insufficient {commodity}! You have {trade['quantity']} units."
         
-        # Log trade
-        await db.execute_command(
-            """INSERT INTO trade_history (user_id, planet, commodity, action, quantity, price_per_unit, total_value, profit_loss)
-               VALUES ($1, $2, $3, 'sell', $4, $5, $6, $7)""",
-            player.user_id, player.current_planet, commodity_name, amount, current_price, total_revenue, profit_loss,
-            user_id=player.user_id
-        )
+        if trade['status'] == 'not_traded_here':
+            return "❌ Cannot sell this commodity at current location!"
         
         # Check achievements
         await player.check_achievements()
         
         # Create result embed
+        profit_loss = trade['profit_loss']
         profit_color = 0x00ff00 if profit_loss >= 0 else 0xff0000
         profit_text = f"+{profit_loss:,}" if profit_loss >= 0 else f"{profit_loss:,}"
         
         embed = await create_bot_author_embed(
             title="💰 Sale Completed!",
-            description=f"Sold {amount:,} units of **{commodity_name}** for {total_revenue:,} credits",
+            description=f"Sold {amount:,} units of **{trade['commodity']}** for {trade['total_value']:,} credits",
             color=profit_color
         )
         
-        embed.add_field(name="Price per Unit", value=f"{current_price:,} cr", inline=True)
+        embed.add_field(name="Price per Unit", value=f"{trade['price_per_unit']:,} cr", inline=True)
         embed.add_field(name="Profit/Loss", value=f"{profit_text} cr", inline=True)
-        embed.add_field(name="New Balance", value=f"{player.credits:,} cr", inline=True)
+        embed.add_field(name="New Balance", value=f"{trade['credits']:,} cr", inline=True)
         
-        await send_message(embed=embed, inter=inter)
+        return embed
+
+    @trade_group.sub_command(name="batch", description="Buy and sell several commodities in one go")
+    async def trade_batch(
+        self,
+        inter: disnake.AppCmdInter,
+        orders: str = commands.Param(description="Orders in sequence, e.g. sell ore 20, buy spice 5")
+    ):
+        """Settle several buys and sells at the current planet together."""
+        try:
+            legs = parse_trade_legs(orders)
+        except ValueError as e:
+            await send_message(
+                msg=f"❌ {e}",
+                inter=inter,
+                ephemeral=True
+            )
+            return
+        
+        resolved = []
+        for action, commodity, amount in legs:
+            name = await name_index.canonical('commodity', commodity)
+            if name is None:
+                await self._commodity_not_found(inter)
+                return
+            resolved.append((action, name, amount))
+        legs = resolved
+        
+        if await refuse_in_flight(inter):
+            return
+        
+        async with GameSession(inter.author.id, inter.author.display_name) as session:
+            reply = await self._batch(session, legs)
+        
+        await send_reply(inter, reply)
+
+    async def _batch(self, session: GameSession, legs: List[Tuple[str, str, int]]) -> Union[disnake.Embed, str]:
+        """Settle a batch of orders; returns the reply embed or a refusal message."""
+        player = await session.player()
+        
+        # Validate every leg against one loaded state; nothing is settled unless all pass
+        batch = await session.trade_batch(legs)
+        
+        if batch['status'] == 'in_transit':
+            return in_flight_message(session.user_id, batch['arrive_at'].timestamp())
+        
+        if batch['status'] != 'ok':
+            position = f"Order {batch['leg'] + 1} (`{batch['action']} {batch['commodity']} {batch['amount']}`)"
+            reasons = {
+                'unknown_commodity': "not traded at this planet!",
+                'insufficient_credits': f"insufficient credits! You would need {batch.get('total_value', 0):,} "
+                                        f"but would only have {batch.get('credits', 0):,}.",
+                'insufficient_cargo': f"insufficient cargo space! Only "
+                                      f"{batch.get('cargo_capacity', 0) - batch.get('cargo_used', 0)} units would be free.",
+                'insufficient_quantity': f"you would only have {batch.get('quantity', 0)} units.",
+                'not_traded_here': "cannot sell this commodity at current location!"
+            }
+            return f"❌ {position}: {reasons[batch['status']]} No orders were settled."
+        
+        # Check achievements once for the whole batch
+        await player.check_achievements()
+        
+        spent = sum(leg['total_value'] for leg in batch['legs'] if leg['action'] == 'buy')
+        earned = sum(leg['total_value'] for leg in batch['legs'] if leg['action'] == 'sell')
+        profit_loss = sum(leg['profit_loss'] for leg in batch['legs'])
+        
+        embed = await create_bot_author_embed(
+            title="✅ Batch Settled!",
+            description=f"Settled {len(batch['legs'])} orders at **{player.current_planet}**",
+            color=0x00ff00 if profit_loss >= 0 else 0xff0000
+        )
+        
+        summary = ""
+        for leg in batch['legs']:
+            emoji = "🛒" if leg['action'] == 'buy' else "💰"
+            summary += (f"{emoji} {leg['action'].title()} {leg['amount']:,} **{leg['commodity']}** "
+                        f"@ {leg['price_per_unit']:,} = {leg['total_value']:,} cr\n")
+        embed.add_field(name="Orders", value=summary, inline=False)
+        
+        embed.add_field(name="Spent / Earned", value=f"{spent:,} / {earned:,} cr", inline=True)
+        embed.add_field(name="Profit/Loss", value=f"{profit_loss:+,} cr", inline=True)
+        embed.add_field(name="New Balance", value=f"{batch['credits']:,} cr", inline=True)
+        embed.add_field(name="Cargo Space Used", value=f"{batch['cargo_used']}/{batch['cargo_capacity']}", inline=True)
+        
+        return embed
+
+    async def _commodity_not_found(self, inter: disnake.AppCmdInter):
+        """Tell the player a commodity name did not match anything."""
+        available = ", ".join(await name_index.complete('commodity', ""))
+        await send_message(
+            msg=f"❌ Commodity not found! Available: {available}",
+            inter=inter,
+            ephemeral=True
+        )
 
     @trade_group.sub_command(name="inventory", description="View your cargo inventory")
     async def trade_inventory(self, inter: disnake.AppCmdInter):
         """Display player's current cargo inventory."""
-        player = await Player.get_or_create(inter.author.id, inter.author.display_name)
-        inventory = await player.get_inventory()
-        ship = await player.get_ship()
+        async with GameSession(inter.author.id, inter.author.display_name) as session:
+            player = await session.player()
+            inventory = await player.get_inventory()
+            ship = await player.get_ship()
+            
+            embed = await create_bot_author_embed(
+                title="📦 Cargo Manifest",
+                description=f"**Ship:** {ship['name']}\n**Location:** {player.current_planet}",
+                color=0x0099ff
+            )
+            
+            total_cargo = 0
+            total_value = 0
+            
+            # Current market prices for everything in the hold, in one lookup
+            prices = await net_worth_engine.prices(player.current_planet, inventory)
+            
+            if inventory:
+                for commodity, data in inventory.items():
+                    if data['quantity'] > 0:
+                        total_cargo += data['quantity']
+                        
+                        # Get current market value
+                        current_price = prices.get(commodity, 0)
+                        market_value = data['quantity'] * current_price
+                        total_value += market_value
+                        
+                        # Calculate potential profit/loss
+                        potential_profit = (current_price - data['average_buy_price']) * data['quantity']
+                        profit_indicator = "📈" if potential_profit > 0 else "📉" if potential_profit < 0 else "➡️"
+                        
+                        embed.add_field(
+                            name=f"{profit_indicator} {commodity}",
+                            value=f"**Quantity:** {data['quantity']:,}\n"
+                                  f"**Avg. Buy Price:** {data['average_buy_price']:.0f} cr\n"
+                                  f"**Current Value:** {market_value:,} cr\n"
+                                  f"**Potential P/L:** {potential_profit:+,.0f} cr",
+                            inline=True
+                        )
+            
+            if total_cargo == 0:
+                embed.add_field(
+                    name="Empty Hold",
+                    value="Your cargo bay is empty. Visit a market to start trading!",
+                    inline=False
+                )
+            
+            embed.add_field(
+                name="📊 Summary",
+                value=f"**Cargo Used:** {total_cargo}/{ship['cargo_capacity']}\n"
+                      f"**Current Value:** {total_value:,} cr\n"
+                      f"**Available Space:** {ship['cargo_capacity'] - total_cargo}",
+                inline=False
+            )
+        
+        await send_message(embed=embed, inter=inter)
+
+    @commands.slash_command(name="route", description="Trade route planning")
+    async def route_group(self, inter):
+        pass
+
+    @route_group.sub_command(name="best", description="Find the most profitable trades from your current planet")
+    async def route_best(
+        self,
+        inter: disnake.AppCmdInter,
+        budget: Optional[int] = commands.Param(default=None, description="Credits to spend (default: all your credits)")
+    ):
+        """Show the best single-jump trade routes for the player's position, ship and budget."""
+        async with GameSession(inter.author.id, inter.author.display_name) as session:
+            player = await session.player()
+            ship = await player.get_ship()
+            free_cargo = ship['cargo_capacity'] - await player.get_total_cargo()
+            
+            if budget is None or budget > player.credits:
+                budget = player.credits
+            
+            routes = await route_optimizer.best(
+                player.current_planet, budget, free_cargo, ship['fuel_efficiency']
+            )
+        
+        if not routes:
+            await send_message(
+                msg="❌ No profitable routes from here right now. Free up cargo space or check back after the next market tick!",
+                inter=inter,
+                ephemeral=True
+            )
+            return
         
         embed = await create_bot_author_embed(
-            title="📦 Cargo Manifest",
-            description=f"**Ship:** {ship['name']}\n**Location:** {player.current_planet}",
-            color=0x0099ff
+            title=f"🧭 Best Routes from {player.current_planet}",
+            description=f"**Budget:** {budget:,} cr | **Free Cargo:** {free_cargo} units",
+            color=0x00ff88
         )
         
-        total_cargo = 0
-        total_value = 0
-        
-        if inventory:
-            db = await get_db()
-            
-            for commodity, data in inventory.items():
-                if data['quantity'] > 0:
-                    total_cargo += data['quantity']
-                    
-                    # Get current market value
-                    price_data = await db.execute_query(
-                        "SELECT current_price FROM market_prices WHERE planet = $1 AND commodity = $2",
-                        player.current_planet, commodity
-                    )
-                    
-                    current_price = price_data[0]['current_price'] if price_data else 0
-                    market_value = data['quantity'] * current_price
-                    total_value += market_value
-                    
-                    # Calculate potential profit/loss
-                    potential_profit = (current_price - data['average_buy_price']) * data['quantity']
-                    profit_indicator = "📈" if potential_profit > 0 else "📉" if potential_profit < 0 else "➡️"
-                    
-                    embed.add_field(
-                        name=f"{profit_indicator} {commodity}",
-                        value=f"**Quantity:** {data['quantity']:,}\n"
-                              f"**Avg. Buy Price:** {data['average_buy_price']:.0f} cr\n"
-                              f"**Current Value:** {market_value:,} cr\n"
-                              f"**Potential P/L:** {potential_profit:+,.0f} cr",
-                        inline=True
-                    )
-        
-        if total_cargo == 0:
+        for i, route in enumerate(routes, 1):
+            danger_emoji = "🟢" if route['danger_level'] <= 2 else "🟡" if route['danger_level'] <= 3 else "🔴"
+            fuel_status = "✅" if player.fuel >= route['fuel'] else "⛽"
             embed.add_field(
-                name="Empty Hold",
-                value="Your cargo bay is empty. Visit a market to start trading!",
+                name=f"{i}. {route['commodity']} → {danger_emoji} {route['destination']}",
+                value=f"Buy {route['units']:,} @ {route['buy_price']:,} cr, sell @ {route['sell_price']:,} cr\n"
+                      f"{fuel_status} **Fuel:** {route['fuel']} units\n"
+                      f"**Est. Profit:** {route['profit']:+,} cr (after fuel)",
                 inline=False
             )
         
-        embed.add_field(
-            name="📊 Summary",
-            value=f"**Cargo Used:** {total_cargo}/{ship['cargo_capacity']}\n"
-                  f"**Current Value:** {total_value:,} cr\n"
-                  f"**Available Space:** {ship['cargo_capacity'] - total_cargo}",
-            inline=False
+        embed.set_footer(text="💡 Estimates use current prices and are weighed against each destination's danger.")
+        await send_message(embed=embed, inter=inter)
+
+    @route_group.sub_command(name="plan", description="Plan the cheapest multi-jump trip to a planet")
+    async def route_plan(
+        self,
+        inter: disnake.AppCmdInter,
+        destination: str = commands.Param(description="Planet to reach", autocomplete=autocomplete_planet),
+        max_danger: int = commands.Param(default=5, description="Most dangerous planet to stop at on the way", choices=[1, 2, 3, 4, 5])
+    ):
+        """Show the cheapest chain of jumps to a planet, avoiding dangerous stops."""
+        destination = await name_index.canonical('planet', destination)
+        if destination is None:
+            await send_message(
+                msg="❌ Planet not found! Use `/location` to see available destinations.",
+                inter=inter,
+                ephemeral=True
+            )
+            return
+        
+        async with GameSession(inter.author.id, inter.author.display_name) as session:
+            player = await session.player()
+            ship = await player.get_ship()
+        
+        if destination == player.current_planet:
+            await send_message(
+                msg="❌ You're already at this planet!",
+                inter=inter,
+                ephemeral=True
+            )
+            return
+        
+        plan = await route_planner.plan(
+            player.current_planet, destination, ship['fuel_efficiency'], max_danger,
+            player.fuel, player.credits
+        )
+        
+        if plan is None:
+            await send_message(
+                msg=f"❌ No route to {destination} that only stops at danger {max_danger} or below. Try a higher `max_danger`.",
+                inter=inter,
+                ephemeral=True
+            )
+            return
+        
+        route_text = f"📍 **{player.current_planet}**\n"
+        hop_lines = []
+        for i, hop in enumerate(plan['hops'], 1):
+            danger_emoji = "🟢" if hop['danger_level'] <= 2 else "🟡" if hop['danger_level'] <= 3 else "🔴"
+            hop_lines.append(f"{i}. {danger_emoji} **{hop['planet']}** - {hop['fuel']} fuel (Danger: {hop['danger_level']}/5)")
+        route_text += fit_lines(hop_lines, EMBED_DESCRIPTION_LIMIT - len(route_text))
+        
+        embed = await create_bot_author_embed(
+            title=f"🗺️ Route to {destination}",
+            description=route_text,
+            color=0x00ff88
         )
         
+        embed.add_field(name="Jumps", value=str(len(plan['hops'])), inline=True)
+        embed.add_field(name="Total Fuel", value=f"{plan['fuel']} units (have {player.fuel})", inline=True)
+        if plan['fuel_to_buy']:
+            status = "✅ Affordable" if plan['affordable'] else "❌ Not enough credits"
+            embed.add_field(
+                name="Fuel to Buy",
+                value=f"{plan['fuel_to_buy']} units for {plan['fuel_credits']:,} cr\n{status}",
+                inline=True
+            )
+        
+        embed.set_footer(text="💡 Use /jump for each stop in turn. Cheapest in fuel first, then safest.")
         await send_message(embed=embed, inter=inter)
 
 
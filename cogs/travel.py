@@ -1,87 +1,39 @@
+import asyncio
 import disnake
 from disnake.ext import commands
 import random
-from typing import Dict, Any
+from typing import Optional, Union, Dict, List, Tuple, Any
 
-from models.database import get_db
 from models.player import Player
-from cogs.helper import send_message
+from models.session import GameSession
+from models.names import name_index
+from models.world import world, JUMP_RANGE, jump_fuel
+from models.encounters import encounter_engine, jump_seed
+from models.arrivals import arrival_scheduler, travel_time
+from cogs.helper import send_message, send_reply, refuse_in_flight, fit_lines, autocomplete_planet
+from util import logger
 from util.botembed import create_bot_author_embed
+from util.embedcache import embed_cache
 
 
 class Travel(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         
-        # Encounter types and their outcomes
-        self.encounters = {
-            'pirate_ambush': {
-                'name': 'Pirate Ambush',
-                'emoji': '🏴‍☠️',
-                'description': 'Space pirates demand tribute!',
-                'success_rate': 0.6,
-                'success_reward': (500, 1500),
-                'failure_penalty': (200, 800)
-            },
-            'cosmic_storm': {
-                'name': 'Cosmic Storm',
-                'emoji': '⛈️',
-                'description': 'Dangerous energy storms block your path!',
-                'success_rate': 0.7,
-                'success_reward': (200, 600),
-                'failure_penalty': (100, 400)
-            },
-            'hidden_cache': {
-                'name': 'Hidden Cache',
-                'emoji': '💎',
-                'description': 'You discover an abandoned cargo cache!',
-                'success_rate': 0.8,
-                'success_reward': (800, 2000),
-                'failure_penalty': (0, 0)
-            },
-            'merchant_convoy': {
-                'name': 'Merchant Convoy',
-                'emoji': '🚛',
-                'description': 'Friendly traders offer a deal!',
-                'success_rate': 0.9,
-                'success_reward': (300, 800),
-                'failure_penalty': (0, 100)
-            },
-            'derelict_salvage': {
-                'name': 'Derelict Ship',
-                'emoji': '🛸',
-                'description': 'An abandoned ship drifts in space...',
-                'success_rate': 0.65,
-                'success_reward': (600, 1200),
-                'failure_penalty': (150, 500)
-            },
-            'peaceful_dock': {
-                'name': 'Safe Passage',
-                'emoji': '✅',
-                'description': 'Uneventful journey through safe space.',
-                'success_rate': 1.0,
-                'success_reward': (50, 200),
-                'failure_penalty': (0, 0)
-            }
-        }
+        # Jumps made since the start whose interaction is waiting to be told how they went, by user id.
+        # Ships landing without one (e.g. after a restart) are announced by direct message.
+        self._awaiting: Dict[int, disnake.AppCmdInter] = {}
+        arrival_scheduler.add_listener(self._on_arrivals)
 
     @commands.slash_command(name="jump", description="Travel to another planet")
     async def jump(
         self,
         inter: disnake.AppCmdInter,
-        planet: str = commands.Param(description="Destination planet")
+        planet: str = commands.Param(description="Destination planet", autocomplete=autocomplete_planet)
     ):
-        """Jump to another planet with random encounters."""
-        player = await Player.get_or_create(inter.author.id, inter.author.display_name)
-        db = await get_db()
-        
-        # Validate destination
-        planet_data = await db.execute_query(
-            "SELECT * FROM planets WHERE LOWER(name) = LOWER($1)",
-            planet
-        )
-        
-        if not planet_data:
+        """Depart for another planet; the encounter is revealed on arrival."""
+        planet = await name_index.canonical('planet', planet)
+        if planet is None:
             await send_message(
                 msg="❌ Planet not found! Use `/location` to see available destinations.",
                 inter=inter,
@@ -89,144 +41,163 @@ class Travel(commands.Cog):
             )
             return
         
-        destination = planet_data[0]
+        if await refuse_in_flight(inter):
+            return
+        
+        async with GameSession(inter.author.id, inter.author.display_name) as session:
+            reply = await self._depart(inter, session, planet)
+        
+        await send_reply(inter, reply)
+
+    async def _depart(self, inter: disnake.AppCmdInter, session: GameSession, planet: str) -> Union[disnake.Embed, str]:
+        """Send the player's ship on its way; returns the reply embed or a refusal message."""
+        player = await session.player()
+        
+        destination = world.planets[planet]
         
         if destination['name'] == player.current_planet:
-            await send_message(
-                msg="❌ You're already at this planet!",
-                inter=inter,
-                ephemeral=True
-            )
-            return
+            return "❌ You're already at this planet!"
+        
+        distance = world.distance(player.current_planet, destination['name'])
+        if distance > JUMP_RANGE:
+            return f"❌ {destination['name']} is out of jump range! Use `/route plan` to find a way there."
         
         # Check fuel requirements
         ship = await player.get_ship()
-        fuel_cost = int(destination['fuel_cost'] * ship['fuel_efficiency'])
+        fuel_cost = int(jump_fuel(distance) * ship['fuel_efficiency'])
         
         if player.fuel < fuel_cost:
-            await send_message(
-                msg=f"❌ Insufficient fuel! Need {fuel_cost} units, have {player.fuel}.",
-                inter=inter,
-                ephemeral=True
-            )
-            return
+            return f"❌ Insufficient fuel! Need {fuel_cost} units, have {player.fuel}."
         
-        # Consume fuel
-        player.fuel -= fuel_cost
-        player.total_jumps += 1
+        # Every draw comes from the jump's own seeded stream, so its history row can be replayed.
+        # A refused departure leaves the counter alone, so retrying draws the same outcome.
+        jump_number = player.total_jumps + 1
+        rng_seed = jump_seed(self.bot.keys.game_seed, player.user_id, jump_number)
         
-        # Calculate encounter probability based on danger level
+        # Calculate success chance with ship and faction bonuses
         danger_level = destination['danger_level']
-        encounter_chance = min(0.2 + (danger_level * 0.15), 0.9)
-        
-        # Determine encounter type
-        if random.random() < encounter_chance:
-            # Weight encounters by danger level
-            if danger_level <= 2:
-                encounter_weights = [0.1, 0.2, 0.2, 0.3, 0.1, 0.1]  # Safer encounters
-            elif danger_level <= 3:
-                encounter_weights = [0.2, 0.2, 0.2, 0.2, 0.15, 0.05]  # Balanced
-            else:
-                encounter_weights = [0.3, 0.25, 0.15, 0.1, 0.15, 0.05]  # Dangerous encounters
-            
-            encounter_type = random.choices(
-                list(self.encounters.keys()),
-                weights=encounter_weights
-            )[0]
-        else:
-            encounter_type = 'peaceful_dock'
-        
-        encounter = self.encounters[encounter_type]
+        jump_bonus = ship['jump_success_bonus']
+        faction = world.factions.get(player.faction_id)
+        if faction:
+            jump_bonus += faction.jump_bonus
         
-        # Calculate success chance with ship bonuses
-        base_success_rate = encounter['success_rate']
-        ship_bonus = ship['jump_success_bonus']
+        outcome = encounter_engine.resolve(danger_level, jump_bonus, random.Random(rng_seed))
+        encounter_type = outcome['encounter_type']
+        success = outcome['success']
+        credits_gained = outcome['credits_gained']
         
-        # Faction bonus
-        faction_bonus = 0.0
-        if player.faction_id:
-            faction_data = await db.execute_query(
-                "SELECT jump_bonus FROM factions WHERE id = $1",
-                player.faction_id
-            )
-            if faction_data:
-                faction_bonus = faction_data[0]['jump_bonus']
-        
-        final_success_rate = min(base_success_rate + ship_bonus + faction_bonus, 0.95)
-        success = random.random() < final_success_rate
-        
-        # Calculate rewards/penalties
         if success:
-            reward_range = encounter['success_reward']
-            credits_gained = random.randint(reward_range[0], reward_range[1])
-            player.credits += credits_gained
-            player.successful_jumps += 1
             result_text = f"Success! Gained {credits_gained:,} credits."
-            result_color = 0x00ff00
         else:
-            penalty_range = encounter['failure_penalty']
-            credits_lost = random.randint(penalty_range[0], penalty_range[1])
-            player.credits = max(0, player.credits - credits_lost)
-            result_text = f"Failed! Lost {credits_lost:,} credits."
-            result_color = 0xff0000
-            credits_gained = -credits_lost
-        
-        # Update player location
-        old_planet = player.current_planet
-        player.current_planet = destination['name']
-        await player.save()
-        
-        # Log jump
-        await db.execute_command(
-            """INSERT INTO jump_history (user_id, from_planet, to_planet, encounter_type, 
-                                       encounter_result, credits_gained, fuel_cost, success)
-               VALUES ($1, $2, $3, $4, $5, $6, $7, $8)""",
-            player.user_id, old_planet, destination['name'], encounter_type,
-            result_text, credits_gained, fuel_cost, success,
-            user_id=player.user_id
+            result_text = f"Failed! Lost {-credits_gained:,} credits."
+        
+        # Fuel is spent now; the outcome lands with the ship
+        travel_seconds = travel_time(player.current_planet, destination['name'], ship['engine_speed'])
+        result = await session.depart(
+            destination['name'], fuel_cost, credits_gained, success, encounter_type, result_text, travel_seconds,
+            jump_number, danger_level, jump_bonus, rng_seed
+        )
+        
+        if result['status'] == 'insufficient_fuel':
+            return f"❌ Insufficient fuel! Need {fuel_cost} units, have {result['fuel']}."
+        if result['status'] == 'in_transit':
+            return f"🚀 Your ship is already in flight and lands <t:{int(result['arrive_at'].timestamp())}:R>."
+        if result['status'] != 'ok':
+            return "❌ Your ship moved before the jump could be made. Try again!"
+        
+        self._awaiting[inter.author.id] = inter
+        
+        embed = await create_bot_author_embed(
+            title=f"🚀 Departed for {destination['name']}",
+            description=f"*{destination['description']}*\n\n"
+                       f"**Arriving:** <t:{int(result['arrive_at'].timestamp())}:R>",
+            color=0x0099ff
         )
         
-        # Check achievements
-        await player.check_achievements()
+        embed.add_field(name="Fuel Used", value=f"{fuel_cost} units", inline=True)
+        embed.add_field(name="Remaining Fuel", value=f"{player.fuel} units", inline=True)
+        embed.add_field(name="Danger Level", value=f"{danger_level}/5", inline=True)
+        
+        return embed
+
+    async def _on_arrivals(self, arrivals: List[Dict[str, Any]]):
+        """Hand every landed jump over to be announced."""
+        landed = [(arrival, self._awaiting.pop(arrival['user_id'], None)) for arrival in arrivals]
+        if landed:
+            # Announced in the background so the scheduler can keep landing ships.
+            asyncio.create_task(self._announce_arrivals(landed))
+
+    async def _announce_arrivals(self, landed: List[Tuple[Dict[str, Any], Optional[disnake.AppCmdInter]]]):
+        """Check achievements and reveal the encounter for each landed jump."""
+        for arrival, inter in landed:
+            try:
+                if inter is not None:
+                    user = inter.author
+                else:
+                    user = self.bot.get_user(arrival['user_id']) or await self.bot.fetch_user(arrival['user_id'])
+                async with GameSession(user.id, user.display_name) as session:
+                    player = await session.player()
+                    await player.check_achievements()
+                    embed = await self._render_arrival(arrival, player)
+                
+                if inter is not None:
+                    try:
+                        await inter.followup.send(embed=embed)
+                        continue
+                    except disnake.HTTPException:
+                        # The interaction has expired; tell the player directly instead.
+                        pass
+                await user.send(embed=embed)
+            except Exception as e:
+                logger.error(f"Failed to announce arrival for {arrival['user_id']}: {e}")
+
+    async def _render_arrival(self, arrival: Dict[str, Any], player: Player) -> disnake.Embed:
+        """Build the embed revealing how a jump went."""
+        encounter = encounter_engine.encounters[arrival['encounter_type']]
+        success_rate = encounter_engine.success_rate(encounter['success_rate'], arrival['jump_bonus'], 0.0)
+        destination = world.planets.get(arrival['to_planet'])
         
-        # Create result embed
         embed = await create_bot_author_embed(
-            title=f"🚀 Jump to {destination['name']}",
+            title=f"🚀 Jump to {arrival['to_planet']}",
             description=f"**Encounter:** {encounter['emoji']} {encounter['name']}\n"
                        f"{encounter['description']}\n\n"
-                       f"**Result:** {result_text}",
-            color=result_color
+                       f"**Result:** {arrival['encounter_result']}",
+            color=0x00ff00 if arrival['success'] else 0xff0000
         )
         
-        embed.add_field(name="Fuel Used", value=f"{fuel_cost} units", inline=True)
+        embed.add_field(name="Fuel Used", value=f"{arrival['fuel_cost']} units", inline=True)
         embed.add_field(name="Remaining Fuel", value=f"{player.fuel} units", inline=True)
-        embed.add_field(name="Success Rate", value=f"{final_success_rate:.1%}", inline=True)
+        embed.add_field(name="Success Rate", value=f"{success_rate:.1%}", inline=True)
         embed.add_field(name="Credits", value=f"{player.credits:,} cr", inline=True)
         embed.add_field(name="Jump Success Rate", value=f"{player.successful_jumps}/{player.total_jumps} ({player.successful_jumps/max(player.total_jumps,1):.1%})", inline=True)
         
         # Add special planet info
-        if destination['special_bonus']:
+        if destination and destination['special_bonus']:
             embed.add_field(
                 name="🌟 Planet Bonus",
                 value=destination['special_bonus'],
                 inline=False
             )
-        
-        await send_message(embed=embed, inter=inter)
+        return embed
 
     @commands.slash_command(name="location", description="View current location and travel options")
     async def location(self, inter: disnake.AppCmdInter):
         """Display current location and available destinations."""
-        player = await Player.get_or_create(inter.author.id, inter.author.display_name)
-        db = await get_db()
-        
-        # Get current planet info
-        current_planet_data = await db.execute_query(
-            "SELECT * FROM planets WHERE name = $1",
-            player.current_planet
-        )
+        async with GameSession(inter.author.id, inter.author.display_name) as session:
+            player = await session.player()
+            ship = await player.get_ship()
+            
+            # Everything the view shows about the player; planets and factions come from the world catalog.
+            arrive_at = arrival_scheduler.arrival(player.user_id)
+            view_args = (
+                player.current_planet, player.fuel, player.faction_id,
+                ship['name'], ship['fuel_efficiency'], ship['jump_success_bonus'], ship['engine_speed'], arrive_at
+            )
+            embed = await embed_cache.get(
+                "location", view_args, world.version, lambda: self._render_location(player, ship, arrive_at)
+            )
         
-        if not current_planet_data:
+        if embed is None:
             await send_message(
                 msg="❌ Error: Current location not found!",
                 inter=inter,
@@ -234,15 +205,21 @@ class Travel(commands.Cog):
             )
             return
         
-        current_planet = current_planet_data[0]
+        await send_message(embed=embed, inter=inter)
+
+    async def _render_location(self, player: Player, ship: Dict[str, Any],
+                               arrive_at: Optional[float]) -> Optional[disnake.Embed]:
+        """Build the location embed, or None if the player's planet does not exist."""
+        await world.ensure_loaded()
         
-        # Get all other planets
-        other_planets = await db.execute_query(
-            "SELECT * FROM planets WHERE name != $1 ORDER BY danger_level, name",
-            player.current_planet
-        )
+        # Get current planet info
+        current_planet = world.planets.get(player.current_planet)
         
-        ship = await player.get_ship()
+        if not current_planet:
+            return None
+        
+        # Get the planets within one jump
+        other_planets = world.in_range(player.current_planet)
         
         embed = await create_bot_author_embed(
             title=f"📍 Current Location: {player.current_planet}",
@@ -252,10 +229,14 @@ class Travel(commands.Cog):
             color=0x0099ff
         )
         
-        # Add destinations
-        destinations_text = ""
-        for planet in other_planets:
-            fuel_cost = int(planet['fuel_cost'] * ship['fuel_efficiency'])
+        if arrive_at is not None:
+            embed.description += f"\n**In Flight:** lands <t:{int(arrive_at)}:R>"
+        
+        # Add destinations, nearest first, as many as the field holds
+        destination_lines = []
+        for planet, distance in other_planets:
+            fuel_cost = int(jump_fuel(distance) * ship['fuel_efficiency'])
+            minutes = travel_time(player.current_planet, planet['name'], ship['engine_speed']) / 60
             danger_emoji = "🟢" if planet['danger_level'] <= 2 else "🟡" if planet['danger_level'] <= 3 else "🔴"
             
             # Check if player can afford the jump
@@ -264,11 +245,13 @@ class Travel(commands.Cog):
             else:
                 status = "❌"
             
-            destinations_text += f"{status} {danger_emoji} **{planet['name']}** - {fuel_cost} fuel (Danger: {planet['danger_level']}/5)\n"
+            destination_lines.append(
+                f"{status} {danger_emoji} **{planet['name']}** - {fuel_cost} fuel, {minutes:.1f} min (Danger: {planet['danger_level']}/5)"
+            )
         
         embed.add_field(
             name="🚀 Available Destinations",
-            value=destinations_text,
+            value=fit_lines(destination_lines) or "No planets within jump range.",
             inline=False
         )
         
@@ -281,23 +264,17 @@ class Travel(commands.Cog):
         )
         
         # Add faction bonus if applicable
-        if player.faction_id:
-            faction_data = await db.execute_query(
-                "SELECT name, jump_bonus FROM factions WHERE id = $1",
-                player.faction_id
+        faction = world.factions.get(player.faction_id)
+        if faction:
+            embed.add_field(
+                name="🏛️ Faction Bonus",
+                value=f"**{faction.name}**\n"
+                      f"Jump Success: +{faction.jump_bonus:.1%}",
+                inline=True
             )
-            if faction_data:
-                faction = faction_data[0]
-                embed.add_field(
-                    name="🏛️ Faction Bonus",
-                    value=f"**{faction['name']}**\n"
-                          f"Jump Success: +{faction['jump_bonus']:.1%}",
-                    inline=True
-                )
-        
-        embed.set_footer(text="💡 Use /jump <planet> to travel. Higher danger = better rewards!")
         
-        await send_message(embed=embed, inter=inter)
+        embed.set_footer(text="💡 Use /jump <planet> to travel, or /route plan to go farther. Higher danger = better rewards!")
+        return embed
 
 
 def setup(bot):
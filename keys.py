@@ -46,6 +46,9 @@ class Keys:
         self.support_server_id: int = 0
         self.bot_owner_only_servers: List[int] = []
 
+        # Game (required and secret; jump outcomes can be predicted from it)
+        self.game_seed: int = 0
+
         self.refresh_env()
 
     def get_keys(self, *args) -> dict:
@@ -83,6 +86,9 @@ class Keys:
                 "bot_owner_only_servers": make_list(
                     getenv("BOT_OWNER_ONLY_SERVERS"), make_integer=True
                 ),
+                
+                # Game
+                "game_seed": make_int(getenv("GAME_SEED")),
             }
         )
 
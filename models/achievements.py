@@ -0,0 +1,70 @@
+from bisect import bisect_right
+from typing import Optional, Dict, List
+
+from models.world import world, Achievement
+
+
+# How each requirement type reads its counter off a Player.
+PLAYER_COUNTERS = {
+    'trades': lambda player: player.total_trades,
+    'jumps': lambda player: player.total_jumps,
+    'credits': lambda player: player.credits,
+    'net_worth': lambda player: player.net_worth,
+    'faction_joined': lambda player: 1 if player.faction_id is not None else 0,
+}
+
+
+class AchievementIndex:
+    """The world catalog's achievements, indexed by requirement type.
+
+    Each requirement type keeps its achievements sorted by threshold, so
+    finding everything a counter has reached is a single bisect. The index is
+    rebuilt whenever the world catalog reloads.
+    """
+
+    def __init__(self):
+        self._achievements: Dict[int, Achievement] = {}
+        self._thresholds: Dict[str, List[int]] = {}
+        self._by_type: Dict[str, List[Achievement]] = {}
+        self._world_version = 0
+
+    async def load(self):
+        """Rebuild the index from the world catalog."""
+        await world.ensure_loaded()
+        rows = list(world.achievements.values())
+
+        by_type: Dict[str, List[Achievement]] = {}
+        for row in sorted(rows, key=lambda row: row.requirement_value):
+            by_type.setdefault(row.requirement_type, []).append(row)
+
+        self._by_type = by_type
+        self._thresholds = {
+            requirement_type: [row.requirement_value for row in achievements]
+            for requirement_type, achievements in by_type.items()
+        }
+        self._achievements = dict(world.achievements)
+        self._world_version = world.version
+
+    async def ensure_loaded(self):
+        """Build the index on first use and after the world catalog reloads."""
+        if self._world_version != world.version or not self._world_version:
+            await self.load()
+
+    def get(self, achievement_id: int) -> Optional[Achievement]:
+        """Get an achievement by id."""
+        return self._achievements.get(achievement_id)
+
+    def of_type(self, requirement_type: str) -> List[Achievement]:
+        """Every achievement of a requirement type, lowest threshold first."""
+        return self._by_type.get(requirement_type, [])
+
+    def reached(self, requirement_type: str, value: int) -> List[Achievement]:
+        """Every achievement of a requirement type whose threshold ``value`` meets."""
+        thresholds = self._thresholds.get(requirement_type)
+        if not thresholds:
+            return []
+        return self._by_type[requirement_type][:bisect_right(thresholds, value)]
+
+
+# Global achievement index
+achievement_index = AchievementIndex()
@@ -0,0 +1,197 @@
+import asyncio
+import heapq
+import time
+from datetime import datetime, timezone
+from typing import Optional, Dict, List, Tuple, Callable, Awaitable, Any
+
+from models.database import get_db
+from models.locks import user_locks
+from models.player import player_cache
+from models.world import world
+from util import logger
+
+
+# Seconds of travel per unit of map distance at engine speed 1.
+SECONDS_PER_UNIT = 3.0
+
+# Shortest trip, however close the planets and fast the engine.
+MIN_TRAVEL_SECONDS = 10.0
+
+# Players columns an arrival changes, as returned by arrivals.resolve.
+ARRIVAL_COLUMNS = ('credits', 'current_planet', 'total_jumps', 'successful_jumps', 'net_worth')
+
+
+def travel_time(origin: str, destination: str, engine_speed: int) -> float:
+    """Seconds a ship with this engine speed takes to fly between two planets."""
+    seconds = world.distance(origin, destination) * SECONDS_PER_UNIT / max(engine_speed, 1)
+    return max(seconds, MIN_TRAVEL_SECONDS)
+
+
+class ArrivalScheduler:
+    """Lands ships in flight once their travel time is up.
+
+    Every ship in flight has a ``pending_arrivals`` row and an entry in a heap
+    ordered by arrival time. A single background task sleeps until the
+    soonest arrival and lands everything due in batches of up to
+    ``batch_size``, one statement per batch, so ships in flight cost a heap
+    entry each rather than a task or timer. After a restart, ``load`` and the
+    task read the table a window at a time: ships landing in the next
+    ``load_window`` seconds (and any overdue), with one range scan on
+    ``arrive_at``, topped up before the window runs out. ``arrival`` is a fast
+    path that only knows ships in the loaded window; the SQL functions refuse
+    trades and jumps for every ship in flight.
+
+    A ship whose player is in the middle of a command lands ``retry_delay``
+    seconds later instead, so a command never sees its player change under it.
+    Listeners added with ``add_listener`` are called with every batch of
+    landed rows. Landing writes several players' rows at once, so it goes
+    through the ``land_arrivals`` security definer function, which only the
+    bot's database role may call.
+    """
+
+    def __init__(self, batch_size: int = 500, retry_delay: float = 1.0, load_window: float = 300.0):
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.load_window = load_window
+
+        # (arrive_at, user_id); entries whose time no longer matches _arrivals are stale.
+        self._heap: List[Tuple[float, int]] = []
+        self._arrivals: Dict[int, float] = {}
+        # Every pending_arrivals row landing before this Unix timestamp is tracked.
+        self._loaded_until = 0.0
+        self._listeners: List[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    def __len__(self) -> int:
+        return len(self._arrivals)
+
+    def arrival(self, user_id: int) -> Optional[float]:
+        """When the player's ship lands as a Unix timestamp, or None if it is not known to be in flight."""
+        return self._arrivals.get(user_id)
+
+    def add_listener(self, listener: Callable[[List[Dict[str, Any]]], Awaitable[None]]):
+        """Call ``listener`` with the rows of every batch of ships that land."""
+        self._listeners.append(listener)
+
+    def schedule(self, user_id: int, arrive_at: float):
+        """Track a ship that has departed and lands at ``arrive_at``."""
+        self._arrivals[user_id] = arrive_at
+        heapq.heappush(self._heap, (arrive_at, user_id))
+        if self._wake is not None and self._heap[0] == (arrive_at, user_id):
+            self._wake.set()
+
+    async def load(self):
+        """Rebuild the heap from the ships landing within ``load_window`` seconds, overdue ones included."""
+        self._heap, self._arrivals, self._loaded_until = [], {}, 0.0
+        await self._load_until(time.time() + self.load_window)
+        logger.info(f"Loaded {len(self._arrivals)} ships in flight")
+
+    async def _load_until(self, until: float):
+        """Track the ships landing between the end of the loaded window and ``until``."""
+        db = await get_db()
+        rows = await db.execute_named_query(
+            "arrivals.pending",
+            datetime.fromtimestamp(self._loaded_until, timezone.utc), datetime.fromtimestamp(until, timezone.utc)
+        )
+        for row in rows:
+            # Ships that departed since the start are tracked already.
+            if row['user_id'] not in self._arrivals:
+                self.schedule(row['user_id'], row['arrive_at'].timestamp())
+        self._loaded_until = until
+
+    def start(self):
+        """Start landing ships in the background on the running event loop."""
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            now = time.time()
+            # Top the window up halfway through, so it never runs out before the next read.
+            top_up_at = self._loaded_until - self.load_window / 2
+            if now >= top_up_at:
+                try:
+                    await self._load_until(now + self.load_window)
+                except Exception as e:
+                    logger.error(f"Failed to load ships in flight: {e}")
+                    await asyncio.sleep(self.retry_delay)
+                continue
+
+            if not self._heap or self._heap[0][0] > now:
+                self._wake.clear()
+                wake_at = min(self._heap[0][0], top_up_at) if self._heap else top_up_at
+                try:
+                    await asyncio.wait_for(self._wake.wait(), wake_at - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            due = self._pop_due(now)
+            if due:
+                # Shielded so that close() cancelling the loop never abandons a batch mid-write.
+                await asyncio.shield(self._land(due))
+
+    def _pop_due(self, now: float) -> List[int]:
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+            arrive_at, user_id = heapq.heappop(self._heap)
+            if self._arrivals.get(user_id) == arrive_at:
+                due.append(user_id)
+        return due
+
+    def _retry(self, user_id: int):
+        self.schedule(user_id, time.time() + self.retry_delay)
+
+    async def _land(self, user_ids: List[int]):
+        """Land a batch of ships whose players are not busy; retry the rest shortly."""
+        locked = []
+        for user_id in user_ids:
+            if await user_locks.try_acquire(user_id):
+                locked.append(user_id)
+            else:
+                self._retry(user_id)
+        if not locked:
+            return
+
+        try:
+            db = await get_db()
+            rows = await db.execute_named_query("arrivals.resolve", locked)
+            for row in rows:
+                player = player_cache.get(row['user_id'])
+                if player is not None:
+                    player.apply_write(**{column: row[column] for column in ARRIVAL_COLUMNS})
+        except Exception as e:
+            logger.error(f"Failed to land {len(locked)} ships: {e}")
+            for user_id in locked:
+                self._retry(user_id)
+            return
+        finally:
+            for user_id in locked:
+                user_locks.release(user_id)
+
+        # Ships missing from the result no longer had a row (e.g. the player was deleted).
+        for user_id in locked:
+            self._arrivals.pop(user_id, None)
+
+        for listener in self._listeners:
+            try:
+                await listener(rows)
+            except Exception as e:
+                logger.error(f"Arrival listener failed: {e}")
+
+    async def close(self):
+        """Stop landing ships; the rest land after the next start."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+# Global arrival scheduler
+arrival_scheduler = ArrivalScheduler()
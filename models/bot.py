@@ -8,12 +8,25 @@ from disnake import ApplicationCommandInteraction as AppCmdInter
 from cogs import cogs_list
 from datetime import datetime
 from util import logger
+from models.arrivals import arrival_scheduler
 from models.database import db_manager
+from models.history import history
+from models.market import market_engine
+from models.pricehistory import price_history
+from models.world import world
+from models.names import name_index
+from models.navigation import route_planner
 import disnake
 
 
 class Bot(AutoShardedBot):
     def __init__(self, default_bot_prefix, keys, dev_mode=False, **settings):
+        if keys.game_seed is None or keys.game_seed < 0:
+            # Without a secret seed every jump outcome could be worked out in advance.
+            raise RuntimeError(
+                "GAME_SEED is not set. Set it to a secret non-negative integer (see .env.example) before starting the bot."
+            )
+        
         super(Bot, self).__init__(self.prefix_check, **settings)
         self.default_prefix = default_bot_prefix
         self.keys = keys
@@ -25,6 +38,9 @@ class Bot(AutoShardedBot):
         self.dev_mode = dev_mode
         self.logger = logger
         self.http_session = aiohttp.ClientSession()
+        
+        # on_ready fires again after every gateway reconnect; services start on the first only.
+        self.services_started = False
 
     async def prefix_check(
         self, bot: AutoShardedBot, msg: disnake.Message
@@ -33,8 +49,9 @@ class Bot(AutoShardedBot):
         return [self.default_prefix]
 
     async def on_ready(self):
-        # Initialize database connection
-        await db_manager.initialize()
+        if not self.services_started:
+            self.services_started = True
+            await self.start_services()
         
         msg = (
             f"{self.keys.bot_name} is now ready at {datetime.now()}.\n"
@@ -44,8 +61,30 @@ class Bot(AutoShardedBot):
         print(msg)
         logger.info(msg)
 
+    async def start_services(self):
+        """Connect to the database and start the game's background services."""
+        await db_manager.initialize()
+        await world.load()
+        await world.listen()
+        await name_index.load()
+        await arrival_scheduler.load()
+        history.start()
+        market_engine.seed = self.keys.game_seed
+        market_engine.start()
+        world.add_listener(market_engine.reload)
+        route_planner.start()
+        world.add_listener(route_planner.reload)
+        price_history.start()
+        arrival_scheduler.start()
+
     async def close(self):
         """Clean shutdown of bot and database connections."""
+        await arrival_scheduler.close()
+        await world.close()
+        await price_history.close()
+        await market_engine.close()
+        await route_planner.close()
+        await history.close()
         await db_manager.close()
         await self.http_session.close()
         await super().close()
@@ -1,15 +1,107 @@
 import asyncpg
 import asyncio
-from typing import Optional, Dict, List, Any
+import contextvars
+import time
+from asyncpg.prepared_stmt import PreparedStatement
+from asyncpg.transaction import Transaction
+from typing import Optional, Dict, List, Any, Callable, Awaitable, Tuple
 from keys import get_keys
+from models.queries import registry
 from util import logger
 
 
+# The scope (if any) that the currently running command has opened.
+_active_scope = contextvars.ContextVar("db_active_scope", default=None)
+
+
+class GameConnection(asyncpg.Connection):
+    """Pool connection that carries the statements the query registry prepared on it."""
+
+    prepared_statements: Dict[str, PreparedStatement]
+
+
+class UserScope:
+    """A single pooled connection and transaction bound to one player's RLS identity.
+
+    The identity is set with ``set_config(..., true)`` as the transaction's
+    first statement, so it is discarded on COMMIT/ROLLBACK instead of staying
+    on the connection for its next borrower. The transaction is asyncpg's own,
+    so code running in the scope can still nest ``conn.transaction()``. Every
+    DatabaseManager call made for the same user while the scope is open reuses
+    its connection, so a whole command pays for one checkout and one commit.
+    """
+
+    def __init__(self, manager: "DatabaseManager", user_id: Optional[int]):
+        self.manager = manager
+        self.user_id = user_id
+        self._conn = None
+        self._transaction: Optional[Transaction] = None
+        self._outer: Optional["UserScope"] = None
+        self._token = None
+
+    async def __aenter__(self) -> "UserScope":
+        outer = _active_scope.get()
+        if outer is not None and outer.user_id == self.user_id:
+            # Already inside a scope for this user, so join it.
+            self._outer = outer
+            return outer
+        self._token = _active_scope.set(self)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._outer is not None:
+            return
+        _active_scope.reset(self._token)
+        if self._conn is None:
+            return
+
+        conn, transaction = self._conn, self._transaction
+        self._conn, self._transaction = None, None
+        try:
+            if exc_type:
+                await transaction.rollback()
+            else:
+                await transaction.commit()
+        finally:
+            await self.manager.pool.release(conn)
+
+    @property
+    def is_open(self) -> bool:
+        """Whether the scope has checked out its connection and begun its transaction."""
+        return self._conn is not None
+
+    async def connection(self) -> asyncpg.Connection:
+        """Get the scope's connection, opening its transaction on first use."""
+        if self._conn is None:
+            conn = await self.manager.pool.acquire()
+            transaction = conn.transaction()
+            started = False
+            try:
+                await transaction.start()
+                started = True
+                if self.user_id:
+                    await conn.execute("SELECT set_config('app.current_user_id', $1, true)", str(self.user_id))
+            except BaseException:
+                try:
+                    if started:
+                        await transaction.rollback()
+                finally:
+                    await self.manager.pool.release(conn)
+                raise
+            self._conn, self._transaction = conn, transaction
+        return self._conn
+
+
 class DatabaseManager:
     def __init__(self):
         self.pool: Optional[asyncpg.Pool] = None
         self.keys = get_keys()
-    
+        
+        # Singleflight state for execute_shared_query
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self._shared_results: Dict[tuple, Tuple[float, List[Dict[str, Any]]]] = {}
+        self.shared_stats = {'calls': 0, 'coalesced': 0, 'reused': 0}
+
     async def initialize(self):
         """Initialize the database connection pool."""
         try:
@@ -21,47 +113,160 @@ class DatabaseManager:
                 database=self.keys.db_name,
                 min_size=5,
                 max_size=20,
-                command_timeout=60
+                command_timeout=60,
+                connection_class=GameConnection,
+                init=registry.prepare_connection
             )
             logger.info("Database connection pool initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize database pool: {e}")
             raise
-    
+
     async def close(self):
         """Close the database connection pool."""
         if self.pool:
             await self.pool.close()
             logger.info("Database connection pool closed")
-    
+        registry.log_stats()
+        logger.info(
+            f"Shared queries: {self.shared_stats['calls']} calls, {self.shared_stats['coalesced']} coalesced, "
+            f"{self.shared_stats['reused']} served from recent results"
+        )
+
+    def user_scope(self, user_id: Optional[int]) -> UserScope:
+        """Run every query for ``user_id`` inside the block on one connection and transaction."""
+        return UserScope(self, user_id)
+
+    async def _run(self, user_id: Optional[int], operation: Callable[[asyncpg.Connection], Awaitable[Any]]):
+        """Run ``operation`` in the active scope, a one-off scope, or on a bare connection."""
+        scope = _active_scope.get()
+        if scope is not None and (not user_id or user_id == scope.user_id):
+            return await operation(await scope.connection())
+
+        if user_id:
+            async with UserScope(self, user_id) as scope:
+                return await operation(await scope.connection())
+
+        async with self.pool.acquire() as conn:
+            return await operation(conn)
+
     async def execute_query(self, query: str, *args, user_id: Optional[int] = None) -> List[Dict[str, Any]]:
         """Execute a SELECT query and return results."""
-        async with self.pool.acquire() as conn:
-            if user_id:
-                await conn.execute("SET app.current_user_id = $1", user_id)
-            
-            rows = await conn.fetch(query, *args)
-            return [dict(row) for row in rows]
-    
+        rows = await self._run(user_id, lambda conn: conn.fetch(query, *args))
+        return [dict(row) for row in rows]
+
     async def execute_command(self, command: str, *args, user_id: Optional[int] = None) -> str:
         """Execute an INSERT/UPDATE/DELETE command."""
-        async with self.pool.acquire() as conn:
-            if user_id:
-                await conn.execute("SET app.current_user_id = $1", user_id)
-            
-            result = await conn.execute(command, *args)
-            return result
+        return await self._run(user_id, lambda conn: conn.execute(command, *args))
+
+    async def execute_named_query(self, name: str, *args, user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Execute a query from the registry by name and return results."""
+        rows = await self._run(user_id, lambda conn: registry.fetch(conn, name, args))
+        return [dict(row) for row in rows]
+
+    async def execute_shared_query(self, name: str, *args, ttl: float = 0.0) -> List[Dict[str, Any]]:
+        """Execute a public named query once for every concurrent caller with the same arguments.
+        
+        Callers that arrive while the query is running wait for its result instead
+        of taking another connection, and with ``ttl`` the result is reused for that
+        many seconds. The query runs outside any user scope, so only use this for
+        reads that do not depend on who is asking. The returned rows are shared and
+        must not be modified.
+        """
+        key = (name, args)
+        self.shared_stats['calls'] += 1
+        
+        if ttl:
+            recent = self._shared_results.get(key)
+            if recent is not None and time.monotonic() - recent[0] < ttl:
+                self.shared_stats['reused'] += 1
+                return recent[1]
+        
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.shared_stats['coalesced'] += 1
+        else:
+            # The query runs in a task of its own, so it belongs to no single caller.
+            inflight = asyncio.ensure_future(self._run_shared(key, name, args, ttl))
+            # Every caller may have given up on a failure; don't let that be reported as unretrieved.
+            inflight.add_done_callback(lambda task: task.cancelled() or task.exception())
+            self._inflight[key] = inflight
+        
+        # Shielded so one caller giving up (e.g. an interaction timing out) cancels
+        # neither the query nor anyone else waiting for it.
+        return await asyncio.shield(inflight)
+
+    async def _run_shared(self, key: tuple, name: str, args: tuple, ttl: float) -> List[Dict[str, Any]]:
+        """Run a shared query for execute_shared_query and keep its result for ``ttl`` seconds."""
+        try:
+            async with self.pool.acquire() as conn:
+                rows = await registry.fetch(conn, name, args)
+            result = [dict(row) for row in rows]
+        finally:
+            self._inflight.pop(key, None)
+        
+        if ttl:
+            now = time.monotonic()
+            if len(self._shared_results) >= 256:
+                self._shared_results = {
+                    recent_key: recent for recent_key, recent in self._shared_results.items()
+                    if now - recent[0] < ttl
+                }
+            self._shared_results[key] = (now, result)
+        return result
     
-    async def execute_transaction(self, commands: List[tuple], user_id: Optional[int] = None) -> bool:
-        """Execute multiple commands in a transaction."""
+    async def execute_named_command(self, name: str, *args, user_id: Optional[int] = None) -> str:
+        """Execute a command from the registry by name."""
+        return await self._run(user_id, lambda conn: registry.execute(conn, name, args))
+
+    async def execute_named_many(self, name: str, args_list: List[tuple], user_id: Optional[int] = None):
+        """Execute a command from the registry once per argument tuple in one pipelined exchange."""
+        await self._run(user_id, lambda conn: registry.executemany(conn, name, args_list))
+
+    async def copy_records(self, table: str, records: List[tuple], columns: tuple):
+        """Bulk-load rows into a table with COPY on a connection of its own."""
+        async with self.pool.acquire() as conn:
+            await conn.copy_records_to_table(table, records=records, columns=list(columns))
+
+    async def copy_tables(self, tables: List[Tuple[str, List[tuple], tuple]]):
+        """COPY into several tables in order, in one transaction, so none are loaded unless all are."""
         async with self.pool.acquire() as conn:
             async with conn.transaction():
-                if user_id:
-                    await conn.execute("SET app.current_user_id = $1", user_id)
-                
-                for command, args in commands:
-                    await conn.execute(command, *args)
-                return True
+                for table, records, columns in tables:
+                    await conn.copy_records_to_table(table, records=records, columns=list(columns))
+
+    async def listen(self, channel: str, callback: Callable[..., Any]) -> asyncpg.Connection:
+        """Call ``callback`` for every NOTIFY on ``channel``.
+        
+        Listening uses a connection of its own outside the pool, so it never
+        holds a pooled connection or sits inside a transaction. The caller
+        closes it when done.
+        """
+        conn = await asyncpg.connect(
+            host=self.keys.db_host,
+            port=self.keys.db_port,
+            user=self.keys.db_user,
+            password=self.keys.db_pass,
+            database=self.keys.db_name
+        )
+        await conn.add_listener(channel, callback)
+        return conn
+
+    async def execute_transaction(self, commands: List[tuple], user_id: Optional[int] = None) -> bool:
+        """Execute multiple commands in a transaction."""
+        scope = _active_scope.get()
+        if scope is not None and (not user_id or user_id == scope.user_id):
+            # Already inside the command's transaction.
+            conn = await scope.connection()
+            for command, args in commands:
+                await conn.execute(command, *args)
+            return True
+
+        async with UserScope(self, user_id) as scope:
+            conn = await scope.connection()
+            for command, args in commands:
+                await conn.execute(command, *args)
+            return True
 
 
 # Global database manager instance
@@ -72,4 +277,4 @@ async def get_db() -> DatabaseManager:
     """Get the database manager instance."""
     if not db_manager.pool:
         await db_manager.initialize()
-    return db_manager
\ No newline at end of file
+    return db_manager
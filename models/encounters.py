@@ -0,0 +1,221 @@
+import hashlib
+import random
+from typing import Dict, List, Tuple, Sequence, Any
+
+import numpy as np
+
+
+# Everything that can happen on arrival after a jump.
+ENCOUNTERS: Dict[str, Dict[str, Any]] = {
+    'pirate_ambush': {
+        'name': 'Pirate Ambush',
+        'emoji': '🏴‍☠️',
+        'description': 'Space pirates demand tribute!',
+        'success_rate': 0.6,
+        'success_reward': (500, 1500),
+        'failure_penalty': (200, 800)
+    },
+    'cosmic_storm': {
+        'name': 'Cosmic Storm',
+        'emoji': '⛈️',
+        'description': 'Dangerous energy storms block your path!',
+        'success_rate': 0.7,
+        'success_reward': (200, 600),
+        'failure_penalty': (100, 400)
+    },
+    'hidden_cache': {
+        'name': 'Hidden Cache',
+        'emoji': '💎',
+        'description': 'You discover an abandoned cargo cache!',
+        'success_rate': 0.8,
+        'success_reward': (800, 2000),
+        'failure_penalty': (0, 0)
+    },
+    'merchant_convoy': {
+        'name': 'Merchant Convoy',
+        'emoji': '🚛',
+        'description': 'Friendly traders offer a deal!',
+        'success_rate': 0.9,
+        'success_reward': (300, 800),
+        'failure_penalty': (0, 100)
+    },
+    'derelict_salvage': {
+        'name': 'Derelict Ship',
+        'emoji': '🛸',
+        'description': 'An abandoned ship drifts in space...',
+        'success_rate': 0.65,
+        'success_reward': (600, 1200),
+        'failure_penalty': (150, 500)
+    },
+    'peaceful_dock': {
+        'name': 'Safe Passage',
+        'emoji': '✅',
+        'description': 'Uneventful journey through safe space.',
+        'success_rate': 1.0,
+        'success_reward': (50, 200),
+        'failure_penalty': (0, 0)
+    }
+}
+
+# Encounter weights by danger band: (highest danger level in the band, weights).
+ENCOUNTER_BANDS: Tuple[Tuple[int, Dict[str, float]], ...] = (
+    # Safer encounters
+    (2, {'pirate_ambush': 0.1, 'cosmic_storm': 0.2, 'hidden_cache': 0.2,
+         'merchant_convoy': 0.3, 'derelict_salvage': 0.1, 'peaceful_dock': 0.1}),
+    # Balanced
+    (3, {'pirate_ambush': 0.2, 'cosmic_storm': 0.2, 'hidden_cache': 0.2,
+         'merchant_convoy': 0.2, 'derelict_salvage': 0.15, 'peaceful_dock': 0.05}),
+    # Dangerous encounters
+    (5, {'pirate_ambush': 0.3, 'cosmic_storm': 0.25, 'hidden_cache': 0.15,
+         'merchant_convoy': 0.1, 'derelict_salvage': 0.15, 'peaceful_dock': 0.05}),
+)
+
+# Encounter a jump ends in when nothing happens.
+QUIET_ENCOUNTER = 'peaceful_dock'
+
+# No jump is ever certain to succeed, whatever the bonuses.
+MAX_SUCCESS_RATE = 0.95
+
+
+def encounter_chances(danger_levels: np.ndarray) -> np.ndarray:
+    """Chance that arriving at a planet of each of these danger levels triggers an encounter."""
+    return np.minimum(0.2 + danger_levels * 0.15, 0.9)
+
+
+def encounter_chance(danger_level: int) -> float:
+    """Chance that arriving at a planet of this danger level triggers an encounter."""
+    return float(encounter_chances(np.asarray(danger_level)))
+
+
+def jump_seed(seed: int, user_id: int, jump_number: int) -> int:
+    """Seed of one jump's random stream, from the game seed, the player and their jump counter."""
+    digest = hashlib.blake2b(f"{seed}:{user_id}:{jump_number}".encode(), digest_size=8).digest()
+    # 63 bits, so it fits a bigint column.
+    return int.from_bytes(digest, 'big') >> 1
+
+
+class AliasTable:
+    """Vose alias table for drawing from a fixed discrete distribution in O(1).
+
+    Each draw picks a column uniformly and then either keeps it or takes its
+    alias, so the cost does not depend on the number of outcomes.
+    """
+
+    def __init__(self, weights: Sequence[float]):
+        n = len(weights)
+        total = float(sum(weights))
+        scaled = [weight * n / total for weight in weights]
+        prob = [1.0] * n
+        alias = list(range(n))
+
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            prob[less] = scaled[less]
+            alias[less] = more
+            scaled[more] += scaled[less] - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+
+        # Whatever is left is 1.0 up to rounding and keeps its own column.
+        self._prob = prob
+        self._alias = alias
+        self.prob = np.array(prob)
+        self.alias = np.array(alias)
+
+    def __len__(self) -> int:
+        return len(self._prob)
+
+    def sample(self, rng: random.Random = random) -> int:
+        """Draw one outcome index."""
+        column = int(rng.random() * len(self._prob))
+        return column if rng.random() < self._prob[column] else self._alias[column]
+
+    def sample_many(self, count: int, rng: np.random.Generator) -> np.ndarray:
+        """Draw ``count`` outcome indices at once."""
+        columns = rng.integers(0, len(self._prob), count)
+        return np.where(rng.random(count) < self.prob[columns], columns, self.alias[columns])
+
+
+class EncounterEngine:
+    """Draws jump encounters from precomputed per-danger alias tables.
+
+    The chance of an encounter and its band's weights are folded into one
+    distribution per danger level, with quiet arrivals counted as
+    ``peaceful_dock``, so deciding a jump's encounter is a single O(1) draw.
+    Encounter stats are also kept as arrays for batch simulation.
+    """
+
+    def __init__(self, encounters: Dict[str, Dict[str, Any]] = ENCOUNTERS,
+                 bands: Tuple[Tuple[int, Dict[str, float]], ...] = ENCOUNTER_BANDS):
+        self.encounters = encounters
+        self.bands = bands
+        self.names: List[str] = list(encounters)
+
+        self.success_rates = np.array([encounters[name]['success_rate'] for name in self.names])
+        self.rewards = np.array([encounters[name]['success_reward'] for name in self.names])
+        self.penalties = np.array([encounters[name]['failure_penalty'] for name in self.names])
+
+        self._tables: Dict[int, AliasTable] = {}
+
+    def band(self, danger_level: int) -> Dict[str, float]:
+        """Encounter weights for a danger level."""
+        for highest, weights in self.bands:
+            if danger_level <= highest:
+                return weights
+        return self.bands[-1][1]
+
+    def distribution(self, danger_level: int) -> List[float]:
+        """Probability of each encounter in ``names`` on arriving at this danger level."""
+        chance = encounter_chance(danger_level)
+        weights = self.band(danger_level)
+        total = sum(weights.values())
+        probabilities = [chance * weights.get(name, 0.0) / total for name in self.names]
+        probabilities[self.names.index(QUIET_ENCOUNTER)] += 1.0 - chance
+        return probabilities
+
+    def table(self, danger_level: int) -> AliasTable:
+        """The alias table for a danger level, built on first use."""
+        table = self._tables.get(danger_level)
+        if table is None:
+            table = self._tables[danger_level] = AliasTable(self.distribution(danger_level))
+        return table
+
+    def sample(self, danger_level: int, rng: random.Random = random) -> str:
+        """Draw the encounter for one jump."""
+        return self.names[self.table(danger_level).sample(rng)]
+
+    def sample_many(self, danger_level: int, count: int, rng: np.random.Generator) -> np.ndarray:
+        """Draw encounters for ``count`` jumps, as indices into ``names``."""
+        return self.table(danger_level).sample_many(count, rng)
+
+    def resolve(self, danger_level: int, jump_bonus: float, rng: random.Random) -> Dict[str, Any]:
+        """Draw one jump's whole outcome from ``rng``.
+
+        The draws are always made in the same order, so a jump's seeded stream
+        replays it exactly. ``jump_bonus`` is the ship's and faction's jump
+        success bonuses added together.
+        """
+        encounter_type = self.sample(danger_level, rng)
+        encounter = self.encounters[encounter_type]
+        success_rate = min(encounter['success_rate'] + jump_bonus, MAX_SUCCESS_RATE)
+        success = rng.random() < success_rate
+        if success:
+            credits_gained = rng.randint(*encounter['success_reward'])
+        else:
+            credits_gained = -rng.randint(*encounter['failure_penalty'])
+        return {
+            'encounter_type': encounter_type,
+            'success_rate': success_rate,
+            'success': success,
+            'credits_gained': credits_gained,
+        }
+
+    @staticmethod
+    def success_rate(base_rate: float, ship_bonus: float, faction_bonus: float) -> float:
+        """Chance of coming out of an encounter ahead."""
+        return min(base_rate + ship_bonus + faction_bonus, MAX_SUCCESS_RATE)
+
+
+# Global encounter engine
+encounter_engine = EncounterEngine()
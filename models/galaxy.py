@@ -0,0 +1,108 @@
+import math
+from typing import Dict, List, Tuple, Iterable, Any
+
+import numpy as np
+
+from models.world import JUMP_RANGE
+
+
+# Planets within jump range of a generated planet, on average.
+NEIGHBOURS = 12
+
+# Market modifier by danger level, as the original planets have them.
+MARKET_MODIFIERS = {1: 1.0, 2: 1.1, 3: 1.2, 4: 1.4, 5: 1.6}
+
+# Special bonus by danger level, as the original planets have them.
+SPECIAL_BONUSES = {1: 'Safe Haven', 4: 'High Risk/Reward', 5: 'Extreme Risk/Reward'}
+
+DESCRIPTIONS = {
+    1: 'A quiet core world with steady markets',
+    2: 'A busy colony on the inner trade lanes',
+    3: 'A frontier settlement where prices swing with every shipment',
+    4: 'A lawless border system with high rewards',
+    5: 'An uncharted system at the edge of the galaxy',
+}
+
+SYLLABLES = (
+    'ar', 'bel', 'cor', 'dra', 'en', 'fal', 'gar', 'hel', 'is', 'jun', 'kel', 'lor', 'mar', 'nex', 'or',
+    'pra', 'qua', 'rin', 'sol', 'tar', 'ul', 'vex', 'wyn', 'xan', 'yor', 'zed',
+)
+SUFFIXES = ('', '', '', ' Prime', ' Station', ' Reach', ' Outpost', ' Gate', ' Landing', ' Drift')
+
+
+class GalaxyGenerator:
+    """Lays out a procedural galaxy of planets and their markets from a seed.
+
+    Planets are scattered evenly over a disc around Terra Prime, sized so each
+    has about ``neighbours`` others within jump range. Danger rises with
+    distance from the core, with some noise, so safe worlds stay near the
+    middle and the richest markets lie out at the rim. Each planet trades a
+    random subset of commodities priced the way the original seed prices
+    them. The same seed always lays out the same galaxy.
+    """
+
+    def __init__(self, seed: int = 0, neighbours: int = NEIGHBOURS):
+        self.seed = seed
+        self.neighbours = neighbours
+
+    def radius(self, count: int) -> float:
+        """Radius of the disc that gives ``count`` planets their neighbours."""
+        return JUMP_RANGE * math.sqrt(count / self.neighbours)
+
+    def _names(self, count: int, rng: np.random.Generator, taken: Iterable[str]) -> List[str]:
+        taken = set(taken)
+        names = []
+        while len(names) < count:
+            syllables = rng.choice(SYLLABLES, size=rng.integers(2, 4))
+            name = "".join(syllables).capitalize() + SUFFIXES[rng.integers(len(SUFFIXES))]
+            if name in taken:
+                continue
+            taken.add(name)
+            names.append(name)
+        return names
+
+    def planets(self, count: int, taken: Iterable[str] = ()) -> List[Dict[str, Any]]:
+        """Rows for ``count`` new planets, none named like any in ``taken``."""
+        rng = np.random.default_rng(self.seed)
+        radius = self.radius(count)
+
+        # sqrt keeps the density even across the disc.
+        distance = radius * np.sqrt(rng.random(count))
+        angle = rng.random(count) * 2 * math.pi
+        # Banded by area rather than radius, so each danger level gets a similar share of planets.
+        core = (distance / radius) ** 2
+        danger = np.clip(np.floor(5 * core + rng.normal(0, 0.5, count)), 0, 4).astype(int) + 1
+        modifier = np.array([MARKET_MODIFIERS[level] for level in danger]) * rng.uniform(0.95, 1.05, count)
+
+        rows = []
+        for i, name in enumerate(self._names(count, rng, taken)):
+            level = int(danger[i])
+            rows.append({
+                'name': name,
+                'danger_level': level,
+                'description': DESCRIPTIONS[level],
+                'market_modifier': round(float(modifier[i]), 2),
+                'special_bonus': SPECIAL_BONUSES.get(level),
+                'x': round(float(distance[i] * math.cos(angle[i])), 1),
+                'y': round(float(distance[i] * math.sin(angle[i])), 1),
+            })
+        return rows
+
+    def markets(self, planets: List[Dict[str, Any]], commodities: List[Tuple[str, int]]) -> List[Dict[str, Any]]:
+        """Market rows for generated planets; each trades at least two of ``commodities``."""
+        # Its own stream, so the same planets always get the same markets.
+        rng = np.random.default_rng((self.seed, 1))
+
+        rows = []
+        for planet in planets:
+            traded = rng.choice(len(commodities), size=rng.integers(2, len(commodities) + 1), replace=False)
+            for i in sorted(traded):
+                commodity, base_price = commodities[i]
+                rows.append({
+                    'planet': planet['name'],
+                    'commodity': commodity,
+                    'current_price': int(base_price * planet['market_modifier'] * rng.uniform(0.8, 1.2)),
+                    'supply_level': int(rng.integers(30, 70)),
+                    'demand_level': int(rng.integers(30, 70)),
+                })
+        return rows
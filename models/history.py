@@ -0,0 +1,148 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional, List, Tuple
+
+import asyncpg
+
+from models.database import get_db
+from util import logger
+
+
+# Columns written to trade_history, in the order rows are queued.
+TRADE_COLUMNS = (
+    'user_id', 'planet', 'commodity', 'action', 'quantity',
+    'price_per_unit', 'total_value', 'profit_loss', 'timestamp'
+)
+
+# Errors for which the database refused the rows themselves, e.g. a foreign key violation.
+ROW_ERRORS = (asyncpg.IntegrityConstraintViolationError, asyncpg.DataError)
+
+
+class HistoryBuffer:
+    """Write-behind buffer for the trade_history rows of /trade batch.
+
+    Single buys and sells and jumps write their history inside their own SQL
+    functions; only batch legs come through here. Rows are kept in memory and
+    written with COPY every ``flush_interval`` seconds, or sooner once
+    ``flush_rows`` rows are waiting. At most ``max_rows`` rows are held; past
+    that, ``add_many`` waits for a flush to make room, so a slow database
+    pushes back on commands instead of growing memory.
+
+    COPY is all or nothing, so a batch the database refuses is split in half
+    until the bad rows are found and the rest are written. Rows that fail
+    ``max_attempts`` flushes in a row are dropped and logged, so neither a bad
+    row nor a long outage can hold the buffer full for good.
+
+    COPY is refused for roles subject to row level security, so the bot's
+    database role has to own trade_history (as it does by default).
+    """
+
+    def __init__(self, flush_rows: int = 500, flush_interval: float = 0.5, max_rows: int = 10000,
+                 max_attempts: int = 20):
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self.max_attempts = max_attempts
+
+        # Each queued row with the number of flushes it has failed.
+        self._rows: List[Tuple[tuple, int]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._space: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+    def start(self):
+        """Start the background flush loop on the running event loop."""
+        if self._task is not None:
+            return
+        self._wake = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+
+    async def add_many(self, rows: List[tuple]):
+        """Queue trade_history rows, stamped with the current time."""
+        if not rows:
+            return
+        now = datetime.now(timezone.utc)
+        if self._task is None:
+            # No flush loop (e.g. scripts and tools), so write straight away.
+            await self._copy([row + (now,) for row in rows])
+            return
+
+        while len(self._rows) >= self.max_rows:
+            await self._space.wait()
+
+        self._rows.extend((row + (now,), 0) for row in rows)
+        if len(self._rows) >= self.max_rows:
+            self._space.clear()
+        if len(self._rows) >= self.flush_rows:
+            self._wake.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            # Shielded so that close() cancelling the loop never abandons rows mid-write.
+            await asyncio.shield(self.flush())
+
+    async def flush(self):
+        """Write every queued row. Rows that fail to write are kept for the next flush."""
+        if self._flush_lock is None:
+            return
+        async with self._flush_lock:
+            queued, self._rows = self._rows, []
+            if not queued:
+                return
+            failed = await self._write(queued)
+
+            kept = [(row, attempts + 1) for row, attempts in failed if attempts + 1 < self.max_attempts]
+            if len(kept) < len(failed):
+                logger.error(
+                    f"Dropped {len(failed) - len(kept)} trade_history rows after {self.max_attempts} failed flushes"
+                )
+            self._rows = kept + self._rows
+            if len(self._rows) < self.max_rows:
+                self._space.set()
+
+    async def _write(self, queued: List[Tuple[tuple, int]]) -> List[Tuple[tuple, int]]:
+        """Write queued rows; returns the ones that could not be written."""
+        try:
+            await self._copy([row for row, _ in queued])
+            return []
+        except ROW_ERRORS as e:
+            if len(queued) == 1:
+                logger.error(f"Database refused trade_history row {queued[0][0]}: {e}")
+                return queued
+            # Split so the good rows are written without the bad ones.
+            middle = len(queued) // 2
+            return await self._write(queued[:middle]) + await self._write(queued[middle:])
+        except Exception as e:
+            logger.error(f"Failed to flush {len(queued)} trade_history rows: {e}")
+            return queued
+
+    async def _copy(self, rows: List[tuple]):
+        db = await get_db()
+        await db.copy_records('trade_history', rows, TRADE_COLUMNS)
+
+    async def close(self):
+        """Stop the flush loop and write whatever is still queued."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.flush()
+        if self._rows:
+            logger.error(f"Dropped {len(self._rows)} trade_history rows that could not be written on shutdown")
+
+
+# Global history buffer
+history = HistoryBuffer()
@@ -0,0 +1,84 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional, Dict
+
+
+class _UserLock:
+    __slots__ = ("lock", "users", "owner", "depth")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        # Tasks holding or waiting for the lock; it is dropped when this reaches zero.
+        self.users = 0
+        self.owner: Optional[asyncio.Task] = None
+        self.depth = 0
+
+
+class UserLocks:
+    """Per-user locks that serialize one player's commands inside the bot process.
+
+    A user's lock only exists while some task holds or waits for it, so idle
+    players cost nothing. The lock is re-entrant for the task that holds it.
+    """
+
+    def __init__(self):
+        self._locks: Dict[int, _UserLock] = {}
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    async def acquire(self, user_id: int):
+        """Wait until no other command for ``user_id`` is running, then claim it."""
+        task = asyncio.current_task()
+        entry = self._locks.get(user_id)
+        if entry is None:
+            entry = self._locks[user_id] = _UserLock()
+        elif entry.owner is task:
+            entry.depth += 1
+            return
+
+        entry.users += 1
+        try:
+            await entry.lock.acquire()
+        except BaseException:
+            self._leave(user_id, entry)
+            raise
+        entry.owner = task
+        entry.depth = 1
+
+    async def try_acquire(self, user_id: int) -> bool:
+        """Claim ``user_id`` only if no other task holds or waits for it; never waits."""
+        entry = self._locks.get(user_id)
+        if entry is not None and entry.owner is not asyncio.current_task():
+            return False
+        # The lock is free, so this returns without suspending.
+        await self.acquire(user_id)
+        return True
+
+    def release(self, user_id: int):
+        """Release a claim taken with ``acquire``."""
+        entry = self._locks[user_id]
+        entry.depth -= 1
+        if entry.depth:
+            return
+        entry.owner = None
+        entry.lock.release()
+        self._leave(user_id, entry)
+
+    def _leave(self, user_id: int, entry: _UserLock):
+        entry.users -= 1
+        if entry.users == 0 and self._locks.get(user_id) is entry:
+            del self._locks[user_id]
+
+    @asynccontextmanager
+    async def hold(self, user_id: int):
+        """Hold ``user_id``'s lock for the duration of the block."""
+        await self.acquire(user_id)
+        try:
+            yield
+        finally:
+            self.release(user_id)
+
+
+# Global per-user locks
+user_locks = UserLocks()
@@ -0,0 +1,238 @@
+import asyncio
+import time
+from typing import Optional, Dict, List, Tuple, Any
+
+import numpy as np
+
+from models.database import get_db
+from util import logger
+
+
+# Keeps market tick streams apart from anything else drawn from the game seed.
+MARKET_STREAM = 1
+
+
+class MarketSnapshot:
+    """Every market's prices at one version, for reading without a query.
+
+    A snapshot never changes once built. The engine publishes a new one with a
+    higher version after every tick, so readers holding the old one keep a
+    consistent view. Rows are shared between readers and must not be modified.
+    """
+
+    def __init__(self, version: int, rows: List[Dict[str, Any]]):
+        self.version = version
+        self.rows = sorted(rows, key=lambda row: (row['planet'], row['commodity']))
+        self._markets: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._by_planet: Dict[str, List[Dict[str, Any]]] = {}
+        for row in self.rows:
+            self._markets[(row['planet'], row['commodity'])] = row
+            self._by_planet.setdefault(row['planet'], []).append(row)
+
+    def get(self, planet: str, commodity: str) -> Optional[Dict[str, Any]]:
+        """Get one market, or None if the planet does not trade the commodity."""
+        return self._markets.get((planet, commodity))
+
+    def price(self, planet: str, commodity: str) -> Optional[int]:
+        """Get the current price of a commodity on a planet."""
+        market = self._markets.get((planet, commodity))
+        return market['current_price'] if market else None
+
+    def planet(self, planet: str) -> List[Dict[str, Any]]:
+        """Every market on a planet, ordered by commodity."""
+        return self._by_planet.get(planet, [])
+
+
+class MarketEngine:
+    """Background simulation of every planet's market.
+
+    Prices, supply and demand are held as planet x commodity matrices and
+    advanced one tick at a time in a single vectorized step:
+
+    - supply and demand drift back towards 50, and their imbalance pushes the
+      fair price (``base_price * market_modifier``) up or down
+    - prices revert towards that fair price in log space
+    - every commodity gets noise scaled by its ``volatility``
+    - a few planets each tick are hit by a sector event that moves all of
+      their prices together and shifts their supply and demand
+
+    The whole matrix is written back with one ``UPDATE ... FROM unnest(...)``
+    and then published as a new MarketSnapshot, which every market read uses.
+    ``reload`` rebuilds the matrices from the database; the bot calls it
+    whenever the world catalog reloads, so new planets' markets start ticking.
+
+    With a ``seed`` (the bot uses ``GAME_SEED``), each tick draws from its own
+    stream, derived from the seed and the number of the interval the tick
+    falls in, so its noise and sector events can be reproduced later and do
+    not repeat after a restart.
+    """
+
+    def __init__(self, interval: float = 3600.0, reversion: float = 0.1, pressure: float = 0.3,
+                 noise_scale: float = 0.2, shock_chance: float = 0.1, shock_size: float = 0.15,
+                 seed: Optional[int] = None):
+        self.interval = interval
+        self.reversion = reversion
+        self.pressure = pressure
+        self.noise_scale = noise_scale
+        self.shock_chance = shock_chance
+        self.shock_size = shock_size
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+
+        self.planets: List[str] = []
+        self.commodities: List[str] = []
+        self.price: Optional[np.ndarray] = None
+        self.supply: Optional[np.ndarray] = None
+        self.demand: Optional[np.ndarray] = None
+        self.listed: Optional[np.ndarray] = None
+        self.base_price: Optional[np.ndarray] = None
+        self.volatility: Optional[np.ndarray] = None
+        self.market_modifier: Optional[np.ndarray] = None
+        self.snapshot: Optional[MarketSnapshot] = None
+        self._markets: Dict[Tuple[int, int], Dict[str, Any]] = {}
+
+        self._task: Optional[asyncio.Task] = None
+        # Keeps a reload from swapping the matrices out from under a tick.
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def load(self):
+        """Read the current market into the matrices and publish it as a snapshot."""
+        db = await get_db()
+        rows = await db.execute_named_query("market.state")
+
+        self.planets = sorted({row['planet'] for row in rows})
+        self.commodities = sorted({row['commodity'] for row in rows})
+        planet_index = {name: i for i, name in enumerate(self.planets)}
+        commodity_index = {name: i for i, name in enumerate(self.commodities)}
+        shape = (len(self.planets), len(self.commodities))
+
+        self.base_price = np.zeros(len(self.commodities))
+        self.volatility = np.zeros(len(self.commodities))
+        self.market_modifier = np.ones(len(self.planets))
+        self.listed = np.zeros(shape, dtype=bool)
+        self.supply = np.full(shape, 50.0)
+        self.demand = np.full(shape, 50.0)
+
+        price = np.zeros(shape)
+        self._markets = {}
+        for row in rows:
+            p, c = planet_index[row['planet']], commodity_index[row['commodity']]
+            self._markets[(p, c)] = row
+            self.base_price[c] = row['base_price']
+            self.volatility[c] = row['volatility']
+            self.market_modifier[p] = row['market_modifier']
+            self.listed[p, c] = True
+            price[p, c] = row['current_price']
+            self.supply[p, c] = row['supply_level']
+            self.demand[p, c] = row['demand_level']
+
+        # Cells no planet trades still need a positive price for the log-space step.
+        fair = self.base_price[None, :] * self.market_modifier[:, None]
+        self.price = np.where(self.listed, price, np.maximum(fair, 1.0))
+        self._publish()
+
+    async def reload(self):
+        """Re-read every market, e.g. after planets or markets were added or edited; needs ``start`` first."""
+        async with self._lock:
+            await self.load()
+        logger.info(f"Market reloaded with {len(self._markets)} markets")
+
+    def _publish(self):
+        """Swap in a snapshot of the current matrices."""
+        version = self.snapshot.version + 1 if self.snapshot else 1
+        rows = [
+            dict(
+                market,
+                current_price=int(self.price[p, c]),
+                supply_level=int(round(self.supply[p, c])),
+                demand_level=int(round(self.demand[p, c]))
+            )
+            for (p, c), market in self._markets.items()
+        ]
+        self.snapshot = MarketSnapshot(version, rows)
+
+    async def current(self) -> MarketSnapshot:
+        """Get the latest snapshot, loading the market on first use."""
+        if self.snapshot is None:
+            await self.load()
+        return self.snapshot
+
+    def tick_rng(self, tick_number: int) -> np.random.Generator:
+        """The random stream for one tick, from the seed and the tick's number."""
+        return np.random.default_rng([self.seed, MARKET_STREAM, tick_number])
+
+    def step(self):
+        """Advance every market by one tick."""
+        shape = self.price.shape
+
+        imbalance = (self.demand - self.supply) / 100
+        fair = self.base_price[None, :] * self.market_modifier[:, None] * (1 + self.pressure * imbalance)
+
+        hit = self.rng.random(shape[0]) < self.shock_chance
+        shocks = np.where(hit, self.rng.normal(0.0, self.shock_size, shape[0]), 0.0)[:, None]
+        noise = self.rng.standard_normal(shape) * self.volatility[None, :] * self.noise_scale
+
+        log_price = np.log(self.price)
+        log_price += self.reversion * (np.log(np.maximum(fair, 1.0)) - log_price) + noise + shocks
+        self.price = np.maximum(np.rint(np.exp(log_price)), 1.0)
+
+        # A shock that lifts prices means goods became scarce: supply falls and demand rises.
+        self.supply += self.reversion * (50 - self.supply) + self.rng.normal(0.0, 5.0, shape) - shocks * 100
+        self.demand += self.reversion * (50 - self.demand) + self.rng.normal(0.0, 5.0, shape) + shocks * 100
+        np.clip(self.supply, 0, 100, out=self.supply)
+        np.clip(self.demand, 0, 100, out=self.demand)
+
+    async def save(self):
+        """Write every listed market back in one statement."""
+        rows, columns = np.nonzero(self.listed)
+        db = await get_db()
+        await db.execute_named_command(
+            "market.apply_tick",
+            [self.planets[i] for i in rows],
+            [self.commodities[i] for i in columns],
+            self.price[rows, columns].astype(int).tolist(),
+            np.rint(self.supply[rows, columns]).astype(int).tolist(),
+            np.rint(self.demand[rows, columns]).astype(int).tolist()
+        )
+
+    async def tick(self):
+        """Advance the market one tick and persist it."""
+        async with self._lock:
+            if self.price is None:
+                await self.load()
+            if self.seed is not None:
+                self.rng = self.tick_rng(int(time.time() // self.interval))
+            self.step()
+            await self.save()
+            self._publish()
+
+    def start(self):
+        """Start ticking in the background on the running event loop."""
+        if self._task is None:
+            self._lock = asyncio.Lock()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error(f"Market tick failed: {e}")
+                # Start again from what the database holds.
+                self.price = None
+
+    async def close(self):
+        """Stop ticking."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+# Global market engine
+market_engine = MarketEngine()
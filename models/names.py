@@ -0,0 +1,141 @@
+from typing import Optional, Dict, List, Any
+
+from models.world import world
+
+
+# Discord shows at most this many autocomplete choices.
+MAX_CHOICES = 25
+
+
+def normalize(text: str) -> str:
+    """Fold case and whitespace so names compare the way players type them."""
+    return " ".join(text.replace("_", " ").split()).casefold()
+
+
+class PrefixTrie:
+    """Prefix tree from normalized text to the canonical names it starts.
+
+    Every node keeps the sorted names below it, so completing a prefix costs
+    one step per character typed.
+    """
+
+    def __init__(self):
+        self._root: Dict[str, Any] = {'': []}
+
+    def insert(self, key: str, name: str):
+        """Make ``name`` a completion of every prefix of ``key``."""
+        node = self._root
+        self._add(node, name)
+        for char in key:
+            node = node.setdefault(char, {'': []})
+            self._add(node, name)
+
+    @staticmethod
+    def _add(node: Dict[str, Any], name: str):
+        names = node['']
+        if name not in names:
+            names.append(name)
+            names.sort()
+
+    def complete(self, prefix: str) -> List[str]:
+        """Every name with a key starting with ``prefix``, sorted."""
+        node = self._root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+        return node['']
+
+
+class NameCatalog:
+    """Canonical names of one kind of game object and the key each stands for.
+
+    Names resolve case-insensitively in O(1); when nothing matches exactly, a
+    prefix of the name or of any word in it resolves if only one name fits.
+    """
+
+    def __init__(self, names: Dict[str, Any]):
+        self._values = dict(names)
+        self._exact: Dict[str, str] = {}
+        self._trie = PrefixTrie()
+        for name in names:
+            key = normalize(name)
+            self._exact[key] = name
+            words = key.split(" ")
+            for i in range(len(words)):
+                self._trie.insert(" ".join(words[i:]), name)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def canonical(self, text: str) -> Optional[str]:
+        """The canonical name ``text`` refers to, or None."""
+        key = normalize(text)
+        name = self._exact.get(key)
+        if name is not None:
+            return name
+        matches = self._trie.complete(key) if key else []
+        return matches[0] if len(matches) == 1 else None
+
+    def resolve(self, text: str) -> Optional[Any]:
+        """The key of the object ``text`` refers to, or None."""
+        name = self.canonical(text)
+        return self._values[name] if name is not None else None
+
+    def complete(self, prefix: str, limit: int = MAX_CHOICES) -> List[str]:
+        """Canonical names matching what has been typed so far, for autocomplete."""
+        return self._trie.complete(normalize(prefix))[:limit]
+
+
+class NameIndex:
+    """Name catalogs for everything players refer to by name.
+
+    Planets, commodities and factions come from the world catalog (factions
+    resolve to their id, the others to their primary key) and are rebuilt
+    whenever it reloads. Catalogs defined in code, like shop items, are added
+    with ``register``. Commands resolve names here before querying, so queries
+    always match primary keys exactly and an unknown name is rejected without
+    touching the database.
+    """
+
+    def __init__(self):
+        self._catalogs: Dict[str, NameCatalog] = {}
+        self._world_version = 0
+
+    async def load(self):
+        """Rebuild the world catalogs from the current world catalog."""
+        await world.ensure_loaded()
+        self._catalogs['planet'] = NameCatalog({name: name for name in world.planets})
+        self._catalogs['commodity'] = NameCatalog({name: name for name in world.commodities})
+        self._catalogs['faction'] = NameCatalog({faction.name: faction.id for faction in world.factions.values()})
+        self._world_version = world.version
+
+    async def ensure_loaded(self):
+        """Build the world catalogs on first use and after the world catalog reloads."""
+        if self._world_version != world.version or not self._world_version:
+            await self.load()
+
+    def register(self, kind: str, names: Dict[str, Any]):
+        """Add or replace a catalog defined in code."""
+        self._catalogs[kind] = NameCatalog(names)
+
+    async def catalog(self, kind: str) -> NameCatalog:
+        """Get the catalog of one kind of object."""
+        await self.ensure_loaded()
+        return self._catalogs[kind]
+
+    async def canonical(self, kind: str, text: str) -> Optional[str]:
+        """The canonical name ``text`` refers to, or None."""
+        return (await self.catalog(kind)).canonical(text)
+
+    async def resolve(self, kind: str, text: str) -> Optional[Any]:
+        """The key of the object ``text`` refers to, or None."""
+        return (await self.catalog(kind)).resolve(text)
+
+    async def complete(self, kind: str, prefix: str) -> List[str]:
+        """Autocomplete choices for a partly typed name."""
+        return (await self.catalog(kind)).complete(prefix)
+
+
+# Global name index
+name_index = NameIndex()
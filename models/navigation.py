@@ -0,0 +1,319 @@
+import asyncio
+import heapq
+import math
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, List, Tuple, Any
+
+import numpy as np
+
+from models.routes import FUEL_PRICE
+from models.world import world, jump_fuel
+from util import logger
+
+
+# Fuel efficiencies are planned for in steps of this size.
+EFFICIENCY_STEP = 0.1
+
+# Weight of one danger level against one unit of fuel when picking between routes.
+# Small enough that danger only breaks ties between routes using the same fuel.
+DANGER_WEIGHT = 1e-3
+
+# Table built as soon as the graph is, for a new ship planning with the default tolerance.
+DEFAULT_TABLE = (1.0, 5)
+
+
+def efficiency_bucket(fuel_efficiency: float) -> float:
+    """The planning bucket a ship's fuel efficiency falls in."""
+    return round(round(fuel_efficiency / EFFICIENCY_STEP) * EFFICIENCY_STEP, 1)
+
+
+def tree_dtype(count: int) -> type:
+    """Smallest integer type that holds every planet index and -1."""
+    return np.int16 if count < 2 ** 15 else np.int32
+
+
+def graph_links(offsets: np.ndarray, targets: np.ndarray, fuel: np.ndarray, danger: np.ndarray,
+                bucket: float, danger_tolerance: int) -> Tuple[List[List[Tuple[int, float]]], List[bool]]:
+    """Links of every planet with what each hop costs, and which planets may not be stopped at.
+
+    The links of planet i are ``targets[offsets[i]:offsets[i + 1]]``, with the
+    fuel each burns before efficiency. Only planets at or below
+    ``danger_tolerance`` may be stopped at on the way (either end may be anything).
+    """
+    # A hop costs the fuel /jump charges for it, with the danger flown into as the tie-break.
+    weights = (np.floor(fuel * bucket) + danger[targets] * DANGER_WEIGHT).tolist()
+    targets, bounds = targets.tolist(), offsets.tolist()
+    links = [list(zip(targets[bounds[i]:bounds[i + 1]], weights[bounds[i]:bounds[i + 1]])) for i in range(len(danger))]
+    return links, (danger > danger_tolerance).tolist()
+
+
+def shortest_trees(links: List[List[Tuple[int, float]]], blocked: List[bool], origins: np.ndarray) -> np.ndarray:
+    """Previous hop on the cheapest route from each of ``origins`` to every planet, -1 if unreachable."""
+    count = len(links)
+    trees = np.empty((len(origins), count), dtype=tree_dtype(count))
+    for row, origin in enumerate(origins.tolist()):
+        cost = [math.inf] * count
+        previous = [-1] * count
+        cost[origin] = 0.0
+        queue = [(0.0, origin)]
+        while queue:
+            reached, current = heapq.heappop(queue)
+            if reached > cost[current]:
+                continue
+            # Too dangerous to stop over; it can still be flown to.
+            if blocked[current] and current != origin:
+                continue
+            for following, weight in links[current]:
+                through = reached + weight
+                if through < cost[following]:
+                    cost[following] = through
+                    previous[following] = current
+                    heapq.heappush(queue, (through, following))
+        trees[row] = previous
+    return trees
+
+
+# The graph a worker process was started with, and its links for each table built so far.
+_worker_graph: Tuple[np.ndarray, ...] = ()
+_worker_links: Dict[Tuple[float, int], Tuple[List[List[Tuple[int, float]]], List[bool]]] = {}
+
+
+def _start_worker(*graph: np.ndarray):
+    global _worker_graph
+    _worker_graph = graph
+    _worker_links.clear()
+
+
+def build_trees(origins: np.ndarray, bucket: float, danger_tolerance: int) -> np.ndarray:
+    """Trees from ``origins`` over the worker's graph. Runs in a worker process."""
+    key = (bucket, danger_tolerance)
+    if key not in _worker_links:
+        _worker_links[key] = graph_links(*_worker_graph, bucket, danger_tolerance)
+    return shortest_trees(*_worker_links[key], origins)
+
+
+class RouteTable:
+    """Shortest-path trees from every planet, for one efficiency bucket and danger tolerance.
+
+    Row i is the tree from planet i, usable once ``ready[i]`` is set. The
+    rows are left uninitialised until filled, so the memory of a table that is
+    still being built is only touched as far as it has got.
+    """
+
+    def __init__(self, count: int):
+        self.previous = np.empty((count, count), dtype=tree_dtype(count))
+        self.ready = np.zeros(count, dtype=bool)
+
+    def store(self, origins: np.ndarray, trees: np.ndarray):
+        self.previous[origins] = trees
+        self.ready[origins] = True
+
+
+class RoutePlanner:
+    """Cheapest multi-hop routes between planets, from tables precomputed per ship and risk appetite.
+
+    Planets within ``JUMP_RANGE`` of each other are linked, and a hop costs the
+    fuel ``/jump`` charges for it. The links are found once per world catalog
+    version through the catalog's spatial grid, so the graph stays sparse
+    however many planets there are. Each fuel efficiency bucket and danger
+    tolerance gets a ``RouteTable`` of shortest-path trees from every planet,
+    so planning a route is a walk back along one row.
+
+    Tables are built by Dijkstra in worker processes, never on the event loop:
+    in the background a chunk of origins at a time, and for a single origin
+    when a player plans from a row that is not built yet. The workers are
+    started with the graph, and started again when the planets change, so a
+    request only sends them the origins. The ``max_tables`` most recently used
+    tables are kept (``count ** 2`` small ints each) and rebuilt along with
+    the workers.
+    """
+
+    def __init__(self, max_tables: int = 6, workers: int = 2, chunk: int = 32):
+        self.max_tables = max_tables
+        self.workers = workers
+        self.chunk = chunk
+
+        self._world_version = 0
+        self._planets: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._danger: List[int] = []
+        # (offsets, targets, fuel, danger) as graph_links takes them
+        self._graph: Tuple[np.ndarray, ...] = ()
+        self._tables: "OrderedDict[Tuple[float, int], RouteTable]" = OrderedDict()
+        self._fills: Dict[Tuple[float, int], asyncio.Task] = {}
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # One background chunk at a time, so the other workers stay free for players' routes.
+        self._fill_lock: Optional[asyncio.Lock] = None
+
+    def start(self):
+        """Build the graph and the default table in the background."""
+        asyncio.create_task(self.reload())
+
+    async def reload(self):
+        """Rebuild the graph if the planets changed, and the tables in use with it."""
+        await self._ensure_graph()
+        if not self._tables:
+            self._table(DEFAULT_TABLE)
+
+    async def close(self):
+        """Stop building tables and shut the worker processes down."""
+        self._stop_workers()
+        self._tables = OrderedDict()
+        self._world_version = 0
+        self._planets, self._graph = [], ()
+
+    def _stop_workers(self):
+        for fill in self._fills.values():
+            fill.cancel()
+        self._fills = {}
+        if self._executor is not None:
+            # Routes already sent to the old workers are still answered.
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def prepare(self, fuel_efficiency: float, danger_tolerance: int):
+        """Build the whole table for a ship's efficiency and tolerance, returning once it is done."""
+        await self._ensure_graph()
+        key = (efficiency_bucket(fuel_efficiency), danger_tolerance)
+        self._table(key)
+        fill = self._fills.get(key)
+        if fill is not None:
+            await asyncio.shield(fill)
+
+    async def _ensure_graph(self):
+        """Rebuild the planet graph on first use and after the world catalog reloads."""
+        await world.ensure_loaded()
+        if self._world_version == world.version:
+            return
+
+        planets = list(world.planets)
+        index = {name: i for i, name in enumerate(planets)}
+        links = [world.in_range(name) for name in planets]
+        offsets = np.zeros(len(planets) + 1, dtype=np.int32)
+        offsets[1:] = np.cumsum([len(reachable) for reachable in links])
+        targets = np.array([index[planet.name] for reachable in links for planet, _ in reachable], dtype=np.int32)
+        fuel = np.array([jump_fuel(distance) for reachable in links for _, distance in reachable], dtype=np.int32)
+        danger = np.array([world.planets[name].danger_level for name in planets], dtype=np.int32)
+        graph = (offsets, targets, fuel, danger)
+
+        self._world_version = world.version
+        unchanged = planets == self._planets and all(np.array_equal(new, old) for new, old in zip(graph, self._graph))
+        if unchanged and self._executor is not None:
+            # A faction or commodity edit; every route still stands.
+            return
+
+        self._planets = planets
+        self._index = index
+        self._danger = danger.tolist()
+        self._graph = graph
+
+        # The tables in use are built again for the new graph, by workers started with it.
+        in_use = list(self._tables)
+        self._stop_workers()
+        self._executor = ProcessPoolExecutor(self.workers, initializer=_start_worker, initargs=graph)
+        if self._fill_lock is None:
+            self._fill_lock = asyncio.Lock()
+        self._tables = OrderedDict()
+        for key in in_use:
+            self._table(key)
+
+    def _table(self, key: Tuple[float, int]) -> RouteTable:
+        """The table for ``key``, started in the background if there is none yet."""
+        table = self._tables.get(key)
+        if table is not None:
+            self._tables.move_to_end(key)
+            return table
+
+        table = self._tables[key] = RouteTable(len(self._planets))
+        self._fills[key] = asyncio.create_task(self._fill(key, table))
+        while len(self._tables) > self.max_tables:
+            evicted, _ = self._tables.popitem(last=False)
+            fill = self._fills.pop(evicted, None)
+            if fill is not None:
+                fill.cancel()
+        return table
+
+    async def _trees(self, origins: np.ndarray, key: Tuple[float, int]) -> np.ndarray:
+        """Build the trees from ``origins`` in a worker."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, build_trees, origins, *key)
+
+    async def _fill(self, key: Tuple[float, int], table: RouteTable):
+        """Build every row of ``table`` not built yet, a chunk of origins at a time."""
+        start = time.perf_counter()
+        try:
+            missing = np.flatnonzero(~table.ready)
+            for i in range(0, len(missing), self.chunk):
+                async with self._fill_lock:
+                    origins = missing[i:i + self.chunk]
+                    # Players may have had some built meanwhile.
+                    origins = origins[~table.ready[origins]]
+                    if len(origins):
+                        table.store(origins, await self._trees(origins, key))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to build the route table for efficiency {key[0]}, danger {key[1]}: {e}")
+        else:
+            logger.info(
+                f"Route table for efficiency {key[0]}, danger {key[1]} built for {len(self._planets)} planets "
+                f"in {time.perf_counter() - start:.1f}s"
+            )
+        finally:
+            if self._fills.get(key) is asyncio.current_task():
+                del self._fills[key]
+
+    async def plan(self, origin: str, destination: str, fuel_efficiency: float, danger_tolerance: int,
+                   fuel: int, credits: int) -> Optional[Dict[str, Any]]:
+        """The cheapest route from ``origin`` to ``destination``, or None if there is none.
+
+        Every stop on the way is at or below ``danger_tolerance``. The route uses
+        the least fuel possible, so if the player cannot afford to top up for it
+        (``affordable``) no other route would do either.
+        """
+        await self._ensure_graph()
+        planets, danger = self._planets, self._danger
+        start, end = self._index.get(origin), self._index.get(destination)
+        if start is None or end is None or start == end:
+            return None
+
+        key = (efficiency_bucket(fuel_efficiency), danger_tolerance)
+        table = self._table(key)
+        if not table.ready[start]:
+            origins = np.array([start])
+            table.store(origins, await self._trees(origins, key))
+        previous = table.previous[start]
+        if previous[end] < 0:
+            return None
+
+        path = [end]
+        while path[-1] != start:
+            path.append(int(previous[path[-1]]))
+        path.reverse()
+
+        hops = []
+        for here, there in zip(path, path[1:]):
+            hops.append({
+                'planet': planets[there],
+                # Same rounding as /jump, with the ship's own efficiency.
+                'fuel': int(jump_fuel(world.distance(planets[here], planets[there])) * fuel_efficiency),
+                'danger_level': danger[there],
+            })
+
+        total_fuel = sum(hop['fuel'] for hop in hops)
+        fuel_to_buy = max(0, total_fuel - fuel)
+        return {
+            'hops': hops,
+            'fuel': total_fuel,
+            'max_danger': max(hop['danger_level'] for hop in hops[:-1]) if len(hops) > 1 else 0,
+            'fuel_to_buy': fuel_to_buy,
+            'fuel_credits': fuel_to_buy * FUEL_PRICE,
+            'affordable': fuel_to_buy * FUEL_PRICE <= credits,
+        }
+
+
+# Global route planner
+route_planner = RoutePlanner()
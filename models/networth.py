@@ -0,0 +1,42 @@
+from typing import Dict, Iterable, Tuple
+
+from models.market import market_engine
+
+
+class NetWorthEngine:
+    """Values cargo from the market snapshot and tells players when prices moved.
+
+    Players remember which planet and ``price_version`` their cargo was valued
+    at. Trades and upgrades adjust that valuation in memory; a jump or a new
+    market snapshot makes it stale, and only then is the cargo valued again.
+    """
+
+    @property
+    def price_version(self) -> int:
+        """Version of the market snapshot valuations are currently made against."""
+        snapshot = market_engine.snapshot
+        return snapshot.version if snapshot else 0
+
+    async def prices(self, planet: str, commodities: Iterable[str]) -> Dict[str, int]:
+        """Get the current price of several commodities on a planet."""
+        snapshot = await market_engine.current()
+        prices = {}
+        for commodity in commodities:
+            price = snapshot.price(planet, commodity)
+            if price is not None:
+                prices[commodity] = price
+        return prices
+
+    async def cargo_value(self, planet: str, inventory: Dict[str, Dict[str, int]]) -> Tuple[int, int]:
+        """Value held cargo at a planet's prices. Returns the value and the price version used."""
+        snapshot = await market_engine.current()
+        value = 0
+        for commodity, data in inventory.items():
+            price = snapshot.price(planet, commodity)
+            if data['quantity'] > 0 and price is not None:
+                value += data['quantity'] * price
+        return value, snapshot.version
+
+
+# Global net worth engine
+net_worth_engine = NetWorthEngine()
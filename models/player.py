@@ -1,10 +1,33 @@
-from typing import Optional, Dict, Any
+import json
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple, Set, List
+from models.achievements import achievement_index, PLAYER_COUNTERS
 from models.database import get_db
+from models.networth import net_worth_engine
 from util import logger
 
 
+# Columns of the players row that a Player mirrors and writes back.
+PLAYER_COLUMNS = (
+    'credits', 'fuel', 'current_planet', 'faction_id', 'total_trades',
+    'successful_jumps', 'total_jumps', 'net_worth'
+)
+
+# Seconds between last_active writes for a player whose row is otherwise unchanged.
+LAST_ACTIVE_INTERVAL = 300
+
+
 class Player:
     def __init__(self, user_id: int, username: str):
+        self._dirty = set()
+        self._last_active_written = 0.0
+        self._ship: Optional[Dict[str, Any]] = None
+        self._inventory: Optional[Dict[str, Dict[str, Any]]] = None
+        self._achievements: Optional[Set[int]] = None
+        # Cargo value, and the (planet, price version) it was valued at.
+        self._cargo_value = 0
+        self._cargo_valued_at: Optional[Tuple[str, int]] = None
         self.user_id = user_id
         self.username = username
         self.credits = 1000
@@ -15,188 +38,309 @@ class Player:
         self.successful_jumps = 0
         self.total_jumps = 0
         self.net_worth = 1000
+        # Set when the player was loaded through a GameSession.
+        self.session = None
+    
+    def __setattr__(self, name: str, value: Any):
+        if name in PLAYER_COLUMNS and self.__dict__.get(name, value) != value:
+            self._dirty.add(name)
+        super().__setattr__(name, value)
     
     @classmethod
     async def get_or_create(cls, user_id: int, username: str) -> 'Player':
         """Get existing player or create new one."""
-        db = await get_db()
-        
-        # Try to get existing player
-        result = await db.execute_query(
-            "SELECT * FROM players WHERE user_id = $1",
-            user_id,
-            user_id=user_id
-        )
+        return await cls.load_full(user_id, username)
+    
+    @classmethod
+    async def load_full(cls, user_id: int, username: str) -> 'Player':
+        """Get a player together with their ship and inventory in one round trip.
         
-        if result:
-            player_data = result[0]
-            player = cls(user_id, username)
-            player.credits = player_data['credits']
-            player.fuel = player_data['fuel']
-            player.current_planet = player_data['current_planet']
-            player.faction_id = player_data['faction_id']
-            player.total_trades = player_data['total_trades']
-            player.successful_jumps = player_data['successful_jumps']
-            player.total_jumps = player_data['total_jumps']
-            player.net_worth = player_data['net_worth']
+        New players get their players and ships rows created in a single statement.
+        """
+        player = player_cache.get(user_id)
+        if player is not None:
             return player
         
-        # Create new player
-        await db.execute_command(
-            """INSERT INTO players (user_id, username) 
-               VALUES ($1, $2)""",
-            user_id, username,
-            user_id=user_id
-        )
-        
-        # Create ship for new player
-        await db.execute_command(
-            """INSERT INTO ships (user_id) VALUES ($1)""",
+        db = await get_db()
+        result = await db.execute_named_query(
+            "players.load_full",
             user_id,
             user_id=user_id
         )
         
-        logger.info(f"Created new player: {username} ({user_id})")
-        return cls(user_id, username)
+        if not result:
+            result = await db.execute_named_query(
+                "players.create",
+                user_id, username,
+                user_id=user_id
+            )
+            if result:
+                logger.info(f"Created new player: {username} ({user_id})")
+            else:
+                # Created by a concurrent command since we looked.
+                result = await db.execute_named_query(
+                    "players.load_full",
+                    user_id,
+                    user_id=user_id
+                )
+        
+        player = cls._from_aggregate(user_id, username, result[0])
+        player_cache.put(player)
+        return player
+    
+    @classmethod
+    def _from_aggregate(cls, user_id: int, username: str, row: Dict[str, Any]) -> 'Player':
+        """Build a player from a players.load_full row."""
+        player_data = json.loads(row['player'])
+        player = cls(user_id, username)
+        player.sync(**{column: player_data[column] for column in PLAYER_COLUMNS})
+        player._ship = json.loads(row['ship']) if row['ship'] else {}
+        player._inventory = {
+            item['commodity']: {
+                'quantity': item['quantity'],
+                'average_buy_price': item['average_buy_price']
+            }
+            for item in json.loads(row['inventory'])
+        }
+        player._achievements = set(json.loads(row['achievements']))
+        return player
+    
+    @property
+    def is_dirty(self) -> bool:
+        """Whether any column has changed since the player was last written."""
+        return bool(self._dirty)
+    
+    def sync(self, **columns):
+        """Set columns to values the database already holds, without marking them changed."""
+        for column, value in columns.items():
+            super().__setattr__(column, value)
+            self._dirty.discard(column)
     
     async def save(self):
         """Save player data to database."""
+        if self.session is not None:
+            # Written with the rest of the session's changes when it flushes.
+            return
+        await self.persist()
+    
+    async def persist(self):
+        """Write the changed columns, skipping the write when nothing changed.
+        
+        last_active rides along with any write, and is otherwise only touched
+        once every LAST_ACTIVE_INTERVAL seconds.
+        """
+        now = time.monotonic()
+        touch = now - self._last_active_written >= LAST_ACTIVE_INTERVAL
+        if not self._dirty and not touch:
+            return
+        
+        columns = [column for column in PLAYER_COLUMNS if column in self._dirty]
+        assignments = [f"{column} = ${position}" for position, column in enumerate(columns, start=2)]
+        assignments.append("last_active = now()")
+        
+        written, self._dirty = self._dirty, set()
         db = await get_db()
-        await db.execute_command(
-            """UPDATE players SET 
-               credits = $2, fuel = $3, current_planet = $4, 
-               faction_id = $5, total_trades = $6, successful_jumps = $7,
-               total_jumps = $8, net_worth = $9, last_active = now()
-               WHERE user_id = $1""",
-            self.user_id, self.credits, self.fuel, self.current_planet,
-            self.faction_id, self.total_trades, self.successful_jumps,
-            self.total_jumps, self.net_worth,
-            user_id=self.user_id
-        )
+        try:
+            await db.execute_command(
+                f"UPDATE players SET {', '.join(assignments)} WHERE user_id = $1",
+                self.user_id, *(getattr(self, column) for column in columns),
+                user_id=self.user_id
+            )
+        except BaseException:
+            self._dirty |= written
+            raise
+        self._last_active_written = now
     
     async def get_ship(self) -> Dict[str, Any]:
         """Get player's ship information."""
-        db = await get_db()
-        result = await db.execute_query(
-            "SELECT * FROM ships WHERE user_id = $1",
-            self.user_id,
-            user_id=self.user_id
-        )
-        return result[0] if result else {}
+        if self._ship is None:
+            db = await get_db()
+            result = await db.execute_named_query(
+                "ships.load",
+                self.user_id,
+                user_id=self.user_id
+            )
+            self._ship = result[0] if result else {}
+        return self._ship
     
     async def get_inventory(self) -> Dict[str, Dict[str, Any]]:
         """Get player's cargo inventory."""
-        db = await get_db()
-        result = await db.execute_query(
-            "SELECT * FROM player_inventory WHERE user_id = $1",
-            self.user_id,
-            user_id=self.user_id
-        )
+        if self._inventory is None:
+            db = await get_db()
+            result = await db.execute_named_query(
+                "inventory.load",
+                self.user_id,
+                user_id=self.user_id
+            )
+            
+            inventory = {}
+            for item in result:
+                inventory[item['commodity']] = {
+                    'quantity': item['quantity'],
+                    'average_buy_price': item['average_buy_price']
+                }
+            self._inventory = inventory
+        return self._inventory
+    
+    def apply_cargo(self, commodity: str, quantity: int, average_buy_price: float, price: Optional[int] = None):
+        """Update the loaded inventory for one commodity; zero removes it.
         
-        inventory = {}
-        for item in result:
-            inventory[item['commodity']] = {
-                'quantity': item['quantity'],
-                'average_buy_price': item['average_buy_price']
-            }
-        return inventory
+        When the commodity's current price is known the cargo valuation is
+        adjusted in place, otherwise it is marked stale.
+        """
+        if self._inventory is None:
+            return
+        held = self._inventory.get(commodity, {}).get('quantity', 0)
+        if price is not None and self._cargo_value_is_current():
+            self._cargo_value += (max(quantity, 0) - held) * price
+        else:
+            self._cargo_valued_at = None
+        if quantity > 0:
+            self._inventory[commodity] = {'quantity': quantity, 'average_buy_price': average_buy_price}
+        else:
+            self._inventory.pop(commodity, None)
+    
+    def apply_write(self, **columns):
+        """Set columns to values a statement just wrote, along with last_active."""
+        self.sync(**columns)
+        self._last_active_written = time.monotonic()
     
     async def get_total_cargo(self) -> int:
         """Get total cargo currently held."""
         inventory = await self.get_inventory()
         return sum(item['quantity'] for item in inventory.values())
     
+    def _cargo_value_is_current(self) -> bool:
+        return self._cargo_valued_at == (self.current_planet, net_worth_engine.price_version)
+    
+    def refresh_net_worth(self) -> bool:
+        """Recompute net worth in memory if the cargo valuation is still current.
+        
+        Returns False when the cargo has to be valued again first.
+        """
+        if self._ship is None or not self._cargo_value_is_current():
+            return False
+        self.net_worth = self.credits + self._cargo_value + self._ship.get('total_upgrade_cost', 0)
+        return True
+    
     async def calculate_net_worth(self) -> int:
         """Calculate player's total net worth including inventory."""
-        inventory = await self.get_inventory()
-        ship = await self.get_ship()
-        
-        # Get current market prices for inventory valuation
-        db = await get_db()
-        inventory_value = 0
-        
-        for commodity, data in inventory.items():
-            if data['quantity'] > 0:
-                price_result = await db.execute_query(
-                    "SELECT current_price FROM market_prices WHERE planet = $1 AND commodity = $2",
-                    self.current_planet, commodity
-                )
-                if price_result:
-                    current_price = price_result[0]['current_price']
-                    inventory_value += data['quantity'] * current_price
-        
-        ship_value = ship.get('total_upgrade_cost', 0)
-        total_worth = self.credits + inventory_value + ship_value
+        if not self.refresh_net_worth():
+            inventory = await self.get_inventory()
+            await self.get_ship()
+            
+            # Value all cargo with one price lookup
+            self._cargo_value, version = await net_worth_engine.cargo_value(self.current_planet, inventory)
+            self._cargo_valued_at = (self.current_planet, version)
+            self.refresh_net_worth()
         
-        # Update net worth in database
-        self.net_worth = total_worth
+        # Only written if the value actually changed
         await self.save()
         
-        return total_worth
+        return self.net_worth
     
-    async def add_achievement(self, achievement_id: int) -> bool:
-        """Add achievement to player if not already unlocked."""
-        db = await get_db()
-        
-        # Check if already unlocked
-        existing = await db.execute_query(
-            "SELECT 1 FROM player_achievements WHERE user_id = $1 AND achievement_id = $2",
-            self.user_id, achievement_id,
-            user_id=self.user_id
-        )
-        
-        if existing:
-            return False
+    async def get_unlocked_achievements(self) -> Set[int]:
+        """Get the ids of the achievements the player has unlocked."""
+        if self._achievements is None:
+            db = await get_db()
+            result = await db.execute_named_query(
+                "achievements.unlocked_ids",
+                self.user_id,
+                user_id=self.user_id
+            )
+            self._achievements = {row['achievement_id'] for row in result}
+        return self._achievements
+    
+    async def grant_achievements(self, achievement_ids: List[int]) -> List[int]:
+        """Unlock achievements and credit their rewards in one statement.
         
-        # Add achievement
-        await db.execute_command(
-            "INSERT INTO player_achievements (user_id, achievement_id) VALUES ($1, $2)",
-            self.user_id, achievement_id,
+        Returns the ids that were newly unlocked.
+        """
+        db = await get_db()
+        result = await db.execute_named_query(
+            "achievements.grant",
+            self.user_id, achievement_ids,
             user_id=self.user_id
         )
+        granted = list(result[0]['granted'])
+        reward = result[0]['reward_credits']
         
-        # Get achievement reward
-        achievement = await db.execute_query(
-            "SELECT reward_credits FROM achievements WHERE id = $1",
-            achievement_id
-        )
+        unlocked = await self.get_unlocked_achievements()
+        unlocked.update(achievement_ids)
         
-        if achievement and achievement[0]['reward_credits'] > 0:
-            self.credits += achievement[0]['reward_credits']
-            await self.save()
-        
-        return True
+        if reward:
+            if 'credits' in self._dirty:
+                # Still to be written, so carry the reward along with the pending value.
+                self.credits += reward
+            else:
+                self.sync(credits=self.credits + reward)
+        return granted
+    
+    async def add_achievement(self, achievement_id: int) -> bool:
+        """Add achievement to player if not already unlocked."""
+        return bool(await self.grant_achievements([achievement_id]))
     
     async def check_achievements(self):
         """Check and unlock any new achievements."""
-        db = await get_db()
+        await achievement_index.ensure_loaded()
+        unlocked = await self.get_unlocked_achievements()
         
-        # Get all achievements not yet unlocked
-        unlocked_achievements = await db.execute_query(
-            """SELECT a.* FROM achievements a 
-               WHERE a.id NOT IN (
-                   SELECT achievement_id FROM player_achievements 
-                   WHERE user_id = $1
-               )""",
-            self.user_id,
-            user_id=self.user_id
-        )
-        
-        for achievement in unlocked_achievements:
-            requirement_met = False
-            
-            if achievement['requirement_type'] == 'trades':
-                requirement_met = self.total_trades >= achievement['requirement_value']
-            elif achievement['requirement_type'] == 'jumps':
-                requirement_met = self.total_jumps >= achievement['requirement_value']
-            elif achievement['requirement_type'] == 'credits':
-                requirement_met = self.credits >= achievement['requirement_value']
-            elif achievement['requirement_type'] == 'net_worth':
+        earned = []
+        for requirement_type, counter in PLAYER_COUNTERS.items():
+            locked = [a for a in achievement_index.of_type(requirement_type) if a['id'] not in unlocked]
+            if not locked:
+                continue
+            if requirement_type == 'net_worth':
                 await self.calculate_net_worth()
-                requirement_met = self.net_worth >= achievement['requirement_value']
-            elif achievement['requirement_type'] == 'faction_joined':
-                requirement_met = self.faction_id is not None
             
-            if requirement_met:
-                await self.add_achievement(achievement['id'])
-                logger.info(f"Player {self.username} unlocked achievement: {achievement['name']}")
\ No newline at end of file
+            earned.extend(
+                achievement for achievement in achievement_index.reached(requirement_type, counter(self))
+                if achievement['id'] not in unlocked
+            )
+        
+        if not earned:
+            return
+        
+        for achievement_id in await self.grant_achievements([achievement['id'] for achievement in earned]):
+            achievement = achievement_index.get(achievement_id)
+            logger.info(f"Player {self.username} unlocked achievement: {achievement['name']}")
+
+
+class PlayerCache:
+    """Bounded LRU of loaded players.
+
+    Entries expire ``ttl`` seconds after they were loaded, so rows changed
+    outside the bot are picked up again without an explicit invalidation.
+    """
+
+    def __init__(self, max_size: int = 1000, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._players: "OrderedDict[int, Tuple[Player, float]]" = OrderedDict()
+
+    def get(self, user_id: int) -> Optional[Player]:
+        """Get a cached player, or None if they are not cached or have expired."""
+        entry = self._players.get(user_id)
+        if entry is None:
+            return None
+        player, loaded_at = entry
+        if time.monotonic() - loaded_at > self.ttl:
+            del self._players[user_id]
+            return None
+        self._players.move_to_end(user_id)
+        return player
+
+    def put(self, player: Player):
+        """Cache a freshly loaded player, evicting the least recently used past max_size."""
+        self._players[player.user_id] = (player, time.monotonic())
+        self._players.move_to_end(player.user_id)
+        while len(self._players) > self.max_size:
+            self._players.popitem(last=False)
+
+    def discard(self, user_id: int):
+        """Forget a player, e.g. after a transaction that changed them rolled back."""
+        self._players.pop(user_id, None)
+
+
+# Global player cache
+player_cache = PlayerCache()
@@ -0,0 +1,77 @@
+import asyncio
+from typing import Optional, Dict, List, Any
+
+from models.database import get_db
+from util import logger
+
+
+# Bucket sizes kept in price_rollups, and how many of each a chart shows.
+RESOLUTIONS = {
+    '6h': 28,
+    '1d': 30,
+}
+
+# Seconds each bucket size spans.
+RESOLUTION_SECONDS = {
+    '6h': 6 * 3600,
+    '1d': 24 * 3600,
+}
+
+
+class PriceHistory:
+    """Rolls raw price points up into OHLC buckets on a schedule.
+
+    Every market tick records one raw point per market (see the
+    ``market.apply_tick`` query). Every ``interval`` seconds those points are
+    folded into six-hour and daily buckets and anything past its retention is
+    dropped, all inside ``rollup_price_history()``. Reads only ever touch the
+    buckets. ``version`` goes up after every rollup, so rendered charts can be
+    cached until the buckets change.
+    """
+
+    def __init__(self, interval: float = 900.0):
+        self.interval = interval
+        self.version = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def rollup(self):
+        """Fold new raw points into buckets and apply retention."""
+        db = await get_db()
+        await db.execute_named_command("price_history.rollup")
+        self.version += 1
+
+    async def buckets(self, planet: str, commodity: str, resolution: str) -> List[Dict[str, Any]]:
+        """The most recent buckets of one market at a resolution, oldest first."""
+        db = await get_db()
+        rows = await db.execute_shared_query(
+            "price_rollups.recent", planet, commodity, resolution, RESOLUTIONS[resolution]
+        )
+        return rows[::-1]
+
+    def start(self):
+        """Start rolling up in the background on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await self.rollup()
+            except Exception as e:
+                logger.error(f"Price history rollup failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def close(self):
+        """Stop rolling up."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+# Global price history
+price_history = PriceHistory()
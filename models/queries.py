@@ -0,0 +1,402 @@
+import time
+from typing import Dict, List, Any
+
+import asyncpg
+from asyncpg.prepared_stmt import PreparedStatement
+from util import logger
+
+
+class Query:
+    """A statement declared once by name and prepared on every pool connection."""
+
+    __slots__ = ("name", "sql", "calls", "total_time", "max_time")
+
+    def __init__(self, name: str, sql: str):
+        self.name = name
+        self.sql = sql
+        self.calls = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def record(self, elapsed: float):
+        """Record the wall time of one execution."""
+        self.calls += 1
+        self.total_time += elapsed
+        if elapsed > self.max_time:
+            self.max_time = elapsed
+
+
+class QueryRegistry:
+    """Every named game statement, prepared up front so hot paths skip parse and plan."""
+
+    def __init__(self):
+        self._queries: Dict[str, Query] = {}
+
+    def register(self, name: str, sql: str) -> Query:
+        """Declare a statement under a unique name."""
+        if name in self._queries:
+            raise ValueError(f"Query {name} is already registered.")
+        query = Query(name, sql)
+        self._queries[name] = query
+        return query
+
+    def __getitem__(self, name: str) -> Query:
+        return self._queries[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._queries
+
+    def __iter__(self):
+        return iter(self._queries.values())
+
+    async def prepare_connection(self, conn: asyncpg.Connection):
+        """Prepare every registered statement on a newly created pool connection."""
+        conn.prepared_statements = {}
+        for query in self._queries.values():
+            try:
+                conn.prepared_statements[query.name] = await conn.prepare(query.sql)
+            except asyncpg.PostgresError as e:
+                # Leave it to be prepared (and fail loudly) on first use instead of
+                # refusing to open the connection.
+                logger.warning(f"Could not prepare query {query.name}: {e}")
+
+    async def _statement(self, conn: asyncpg.Connection, query: Query) -> PreparedStatement:
+        statement = conn.prepared_statements.get(query.name)
+        if statement is None:
+            statement = await conn.prepare(query.sql)
+            conn.prepared_statements[query.name] = statement
+        return statement
+
+    async def _run(self, conn: asyncpg.Connection, name: str, method: str, *args):
+        query = self._queries[name]
+        statement = await self._statement(conn, query)
+
+        start = time.perf_counter()
+        try:
+            return statement, await getattr(statement, method)(*args)
+        except asyncpg.exceptions.InvalidCachedStatementError:
+            # The schema changed under the statement, so prepare it again next time.
+            conn.prepared_statements.pop(name, None)
+            raise
+        finally:
+            query.record(time.perf_counter() - start)
+
+    async def fetch(self, conn: asyncpg.Connection, name: str, args: tuple) -> List[asyncpg.Record]:
+        """Run a named query on a connection and return its rows."""
+        _, rows = await self._run(conn, name, "fetch", *args)
+        return rows
+
+    async def execute(self, conn: asyncpg.Connection, name: str, args: tuple) -> str:
+        """Run a named command on a connection and return its status message."""
+        statement, _ = await self._run(conn, name, "fetch", *args)
+        return statement.get_statusmsg()
+
+    async def executemany(self, conn: asyncpg.Connection, name: str, args_list: List[tuple]):
+        """Run a named command once per argument tuple, pipelined in a single exchange."""
+        await self._run(conn, name, "executemany", args_list)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Call counts and timings for every query that has run, slowest in total first."""
+        stats = [
+            {
+                'name': query.name,
+                'calls': query.calls,
+                'total_ms': query.total_time * 1000,
+                'avg_ms': query.total_time * 1000 / query.calls,
+                'max_ms': query.max_time * 1000,
+            }
+            for query in self._queries.values() if query.calls
+        ]
+        return sorted(stats, key=lambda stat: stat['total_ms'], reverse=True)
+
+    def log_stats(self):
+        """Write the per-query timings to the log."""
+        for stat in self.stats():
+            logger.info(
+                f"Query {stat['name']}: {stat['calls']} calls, {stat['total_ms']:.1f}ms total, "
+                f"{stat['avg_ms']:.2f}ms avg, {stat['max_ms']:.2f}ms max"
+            )
+
+
+# Global query registry
+registry = QueryRegistry()
+
+
+# Players
+registry.register(
+    "players.load_full",
+    """SELECT to_jsonb(p) AS player, to_jsonb(s) AS ship,
+              COALESCE(
+                  (SELECT jsonb_agg(jsonb_build_object(
+                              'commodity', i.commodity,
+                              'quantity', i.quantity,
+                              'average_buy_price', i.average_buy_price))
+                   FROM player_inventory i
+                   WHERE i.user_id = p.user_id),
+                  '[]'::jsonb
+              ) AS inventory,
+              COALESCE(
+                  (SELECT jsonb_agg(pa.achievement_id)
+                   FROM player_achievements pa
+                   WHERE pa.user_id = p.user_id),
+                  '[]'::jsonb
+              ) AS achievements
+       FROM players p
+       LEFT JOIN ships s ON s.user_id = p.user_id
+       WHERE p.user_id = $1"""
+)
+registry.register(
+    "players.create",
+    """WITH player AS (
+           INSERT INTO players (user_id, username) VALUES ($1, $2)
+           ON CONFLICT (user_id) DO NOTHING
+           RETURNING *
+       ), ship AS (
+           INSERT INTO ships (user_id) SELECT user_id FROM player
+           RETURNING *
+       )
+       SELECT to_jsonb(player) AS player, to_jsonb(ship) AS ship,
+              '[]'::jsonb AS inventory, '[]'::jsonb AS achievements
+       FROM player, ship"""
+)
+
+# Ships
+registry.register("ships.load", "SELECT * FROM ships WHERE user_id = $1")
+registry.register(
+    "ships.save",
+    """UPDATE ships SET
+       name = $2, cargo_capacity = $3, fuel_efficiency = $4, jump_success_bonus = $5,
+       shield_strength = $6, engine_speed = $7, navigation_system = $8, paint_job = $9,
+       total_upgrade_cost = $10
+       WHERE user_id = $1"""
+)
+
+# Inventory
+registry.register("inventory.load", "SELECT * FROM player_inventory WHERE user_id = $1")
+registry.register(
+    "inventory.upsert",
+    """INSERT INTO player_inventory (user_id, commodity, quantity, average_buy_price)
+       VALUES ($1, $2, $3, $4)
+       ON CONFLICT (user_id, commodity)
+       DO UPDATE SET quantity = EXCLUDED.quantity, average_buy_price = EXCLUDED.average_buy_price"""
+)
+registry.register("inventory.delete", "DELETE FROM player_inventory WHERE user_id = $1 AND commodity = $2")
+
+# Market
+registry.register(
+    "market.state",
+    """SELECT mp.planet, mp.commodity, mp.current_price, mp.supply_level, mp.demand_level,
+              c.base_price, c.volatility, c.description, p.market_modifier, p.danger_level
+       FROM market_prices mp
+       JOIN commodities c ON mp.commodity = c.name
+       JOIN planets p ON mp.planet = p.name"""
+)
+registry.register(
+    "market.apply_tick",
+    """WITH updated AS (
+           UPDATE market_prices mp
+           SET current_price = t.current_price,
+               supply_level = t.supply_level,
+               demand_level = t.demand_level,
+               last_updated = now()
+           FROM unnest($1::text[], $2::text[], $3::integer[], $4::integer[], $5::integer[])
+                AS t(planet, commodity, current_price, supply_level, demand_level)
+           WHERE mp.planet = t.planet AND mp.commodity = t.commodity
+           RETURNING mp.planet, mp.commodity, mp.current_price, mp.last_updated
+       )
+       INSERT INTO price_history (planet, commodity, recorded_at, price)
+       SELECT planet, commodity, last_updated, current_price FROM updated"""
+)
+
+# Price history (rollup function in the price_history migration)
+registry.register("price_history.rollup", "SELECT rollup_price_history()")
+registry.register(
+    "price_rollups.recent",
+    """SELECT bucket_start, open, high, low, close
+       FROM price_rollups
+       WHERE planet = $1 AND commodity = $2 AND resolution = $3
+       ORDER BY bucket_start DESC
+       LIMIT $4"""
+)
+
+# Trades (stored functions in the in_transit_trades migration)
+registry.register("trades.buy", "SELECT * FROM trade_buy($1, $2, $3)")
+registry.register("trades.sell", "SELECT * FROM trade_sell($1, $2, $3)")
+
+# Jumps (stored function in the jump_caller_identity migration)
+registry.register(
+    "jumps.depart",
+    "SELECT * FROM depart_jump($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13)"
+)
+registry.register(
+    "jumps.replay",
+    """SELECT id, user_id, jump_number, danger_level, jump_bonus, rng_seed,
+              encounter_type, success, credits_gained
+       FROM jump_history
+       WHERE id > $1 AND rng_seed IS NOT NULL
+       ORDER BY id
+       LIMIT $2"""
+)
+
+# Ships in flight (see models/arrivals.py)
+registry.register(
+    "arrivals.pending",
+    """SELECT user_id, arrive_at
+       FROM pending_arrivals
+       WHERE arrive_at >= $1 AND arrive_at < $2
+       ORDER BY arrive_at"""
+)
+registry.register("arrivals.get", "SELECT arrive_at FROM pending_arrivals WHERE user_id = $1")
+
+# Security definer, as it lands several players at once (see the jump_caller_identity migration)
+registry.register("arrivals.resolve", "SELECT * FROM land_arrivals($1::bigint[])")
+
+# World catalog (static tables, see models/world.py)
+registry.register("world.planets", "SELECT * FROM planets")
+registry.register("world.commodities", "SELECT * FROM commodities")
+registry.register(
+    "world.factions",
+    "SELECT id, name, description, trade_bonus, jump_bonus, fuel_bonus, special_ability FROM factions"
+)
+registry.register("world.achievements", "SELECT * FROM achievements")
+
+# Factions
+registry.register("factions.list", "SELECT * FROM factions ORDER BY id")
+registry.register("factions.get", "SELECT * FROM factions WHERE id = $1")
+registry.register("factions.add_member", "UPDATE factions SET member_count = member_count + 1 WHERE id = $1")
+registry.register("factions.remove_member", "UPDATE factions SET member_count = member_count - 1 WHERE id = $1")
+registry.register(
+    "factions.top_contributors",
+    """SELECT p.username,
+              COALESCE(SUM(th.total_value), 0) as contribution
+       FROM players p
+       LEFT JOIN trade_history th ON p.user_id = th.user_id
+       WHERE p.faction_id = $1
+       GROUP BY p.user_id, p.username
+       ORDER BY contribution DESC
+       LIMIT 5"""
+)
+registry.register(
+    "faction_wars.current",
+    """SELECT * FROM faction_wars
+       WHERE is_active = true
+       ORDER BY week_start DESC
+       LIMIT 1"""
+)
+registry.register(
+    "faction_wars.standings",
+    """SELECT f.name, f.member_count,
+              COALESCE(SUM(th.total_value), 0) as war_contribution,
+              COUNT(DISTINCT th.user_id) as active_members
+       FROM factions f
+       LEFT JOIN players p ON f.id = p.faction_id
+       LEFT JOIN trade_history th ON p.user_id = th.user_id
+           AND th.timestamp >= $1
+           AND th.timestamp <= $2
+       GROUP BY f.id, f.name, f.member_count
+       ORDER BY war_contribution DESC"""
+)
+
+# Achievements
+registry.register(
+    "achievements.unlocked_ids",
+    "SELECT achievement_id FROM player_achievements WHERE user_id = $1"
+)
+registry.register(
+    "achievements.grant",
+    """WITH granted AS (
+           INSERT INTO player_achievements (user_id, achievement_id)
+           SELECT $1, unnest($2::integer[])
+           ON CONFLICT DO NOTHING
+           RETURNING achievement_id
+       ), reward AS (
+           SELECT COALESCE(SUM(a.reward_credits), 0) AS total
+           FROM achievements a
+           JOIN granted g ON a.id = g.achievement_id
+       ), credited AS (
+           UPDATE players SET credits = credits + (SELECT total FROM reward)
+           WHERE user_id = $1 AND (SELECT total FROM reward) > 0
+       )
+       SELECT COALESCE((SELECT array_agg(achievement_id) FROM granted), '{}') AS granted,
+              (SELECT total FROM reward) AS reward_credits"""
+)
+registry.register(
+    "achievements.recent",
+    """SELECT achievement_id
+       FROM player_achievements
+       WHERE user_id = $1
+       ORDER BY unlocked_at DESC
+       LIMIT $2"""
+)
+
+# History
+registry.register(
+    "trade_history.recent",
+    """SELECT planet, commodity, action, quantity, total_value, timestamp
+       FROM trade_history
+       WHERE user_id = $1
+       ORDER BY timestamp DESC
+       LIMIT 3"""
+)
+
+# Leaderboards
+registry.register(
+    "leaderboard.net_worth",
+    """SELECT username, net_worth, current_planet,
+              CASE WHEN faction_id IS NOT NULL THEN f.name ELSE 'Independent' END as faction_name
+       FROM players p
+       LEFT JOIN factions f ON p.faction_id = f.id
+       ORDER BY net_worth DESC
+       LIMIT 15"""
+)
+registry.register(
+    "leaderboard.trades",
+    """SELECT username, total_trades, net_worth,
+              CASE WHEN faction_id IS NOT NULL THEN f.name ELSE 'Independent' END as faction_name
+       FROM players p
+       LEFT JOIN factions f ON p.faction_id = f.id
+       WHERE total_trades > 0
+       ORDER BY total_trades DESC
+       LIMIT 15"""
+)
+registry.register(
+    "leaderboard.jumps",
+    """SELECT username, total_jumps, successful_jumps, net_worth,
+              CASE WHEN faction_id IS NOT NULL THEN f.name ELSE 'Independent' END as faction_name
+       FROM players p
+       LEFT JOIN factions f ON p.faction_id = f.id
+       WHERE total_jumps > 0
+       ORDER BY total_jumps DESC
+       LIMIT 15"""
+)
+registry.register(
+    "leaderboard.success_rate",
+    """SELECT username, total_jumps, successful_jumps, net_worth,
+              CASE WHEN faction_id IS NOT NULL THEN f.name ELSE 'Independent' END as faction_name,
+              (successful_jumps::float / GREATEST(total_jumps, 1)) * 100 as success_rate
+       FROM players p
+       LEFT JOIN factions f ON p.faction_id = f.id
+       WHERE total_jumps >= 10
+       ORDER BY success_rate DESC, total_jumps DESC
+       LIMIT 15"""
+)
+registry.register(
+    "leaderboard.factions",
+    """SELECT f.name, f.member_count, f.total_contribution,
+              COALESCE(AVG(p.net_worth), 0) as avg_member_wealth
+       FROM factions f
+       LEFT JOIN players p ON f.id = p.faction_id
+       GROUP BY f.id, f.name, f.member_count, f.total_contribution
+       ORDER BY f.total_contribution DESC"""
+)
+registry.register(
+    "leaderboard.contributors",
+    """SELECT p.username, f.name as faction_name,
+              COALESCE(SUM(th.total_value), 0) as total_contribution
+       FROM players p
+       JOIN factions f ON p.faction_id = f.id
+       LEFT JOIN trade_history th ON p.user_id = th.user_id
+       GROUP BY p.user_id, p.username, f.name
+       ORDER BY total_contribution DESC
+       LIMIT 10"""
+)
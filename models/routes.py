@@ -0,0 +1,138 @@
+from collections import OrderedDict
+from typing import Optional, Dict, List, Tuple, Any
+
+import numpy as np
+
+from models.encounters import encounter_chances
+from models.market import market_engine, MarketSnapshot
+from models.world import world, jump_fuel
+
+
+# Credits per unit of fuel, as sold by /buy fuel.
+FUEL_PRICE = 10
+
+
+class RouteOptimizer:
+    """Best buy-here, sell-there trades between planets, per market snapshot.
+
+    Every snapshot's prices are laid out once as a planet x commodity matrix.
+    The first lookup out of a planet takes the planets within jump range from
+    the world catalog's spatial grid and keeps every pair that sells for more
+    than it buys, with its unit margin, base fuel and encounter risk. Pairs
+    are kept until the next snapshot or world reload, so a lookup only sizes
+    those pairs to the player's budget, free cargo and fuel efficiency.
+    """
+
+    def __init__(self, risk_aversion: float = 0.25, max_entries: int = 1024):
+        self.risk_aversion = risk_aversion
+        self.max_entries = max_entries
+
+        self._version: Optional[Tuple[int, int]] = None
+        self._planets: List[str] = []
+        self._commodities: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._price: Optional[np.ndarray] = None
+        self._danger: Optional[np.ndarray] = None
+        self._pairs: "OrderedDict[str, Optional[Dict[str, np.ndarray]]]" = OrderedDict()
+
+    def _build(self, snapshot: MarketSnapshot):
+        """Rebuild the price matrix for a snapshot."""
+        self._planets = sorted({row['planet'] for row in snapshot.rows})
+        self._commodities = sorted({row['commodity'] for row in snapshot.rows})
+        self._index = {name: i for i, name in enumerate(self._planets)}
+        commodity_index = {name: i for i, name in enumerate(self._commodities)}
+
+        # Commodities a planet does not trade stay NaN and drop out of every comparison.
+        price = np.full((len(self._planets), len(self._commodities)), np.nan)
+        self._danger = np.zeros(len(self._planets))
+        for row in snapshot.rows:
+            p = self._index[row['planet']]
+            price[p, commodity_index[row['commodity']]] = row['current_price']
+            self._danger[p] = row['danger_level']
+
+        self._price = price
+        self._pairs = OrderedDict()
+        self._version = (snapshot.version, world.version)
+
+    async def best(self, planet: str, budget: int, free_cargo: int, fuel_efficiency: float,
+                   limit: int = 5) -> List[Dict[str, Any]]:
+        """The most profitable single-jump trades out of a planet, best first."""
+        snapshot = await market_engine.current()
+        await world.ensure_loaded()
+        if (snapshot.version, world.version) != self._version:
+            self._build(snapshot)
+
+        if planet in self._pairs:
+            self._pairs.move_to_end(planet)
+        else:
+            self._pairs[planet] = self._pairs_from(planet)
+            while len(self._pairs) > self.max_entries:
+                self._pairs.popitem(last=False)
+
+        pairs = self._pairs[planet]
+        if pairs is None or budget <= 0 or free_cargo <= 0:
+            return []
+        return self._rank(pairs, budget, free_cargo, fuel_efficiency, limit)
+
+    def _pairs_from(self, planet: str) -> Optional[Dict[str, np.ndarray]]:
+        """Every profitable (destination, commodity) pair out of a planet, with its unit margin."""
+        origin = self._index.get(planet)
+        if origin is None:
+            return None
+
+        # Destinations are the planets within one jump that have a market.
+        neighbours = [
+            (self._index[destination.name], jump_fuel(distance))
+            for destination, distance in world.in_range(planet) if destination.name in self._index
+        ]
+        if not neighbours:
+            return None
+        destinations = np.array([index for index, _ in neighbours])
+
+        buy = self._price[origin]
+        # margin[destination, commodity] = sell price there - buy price here
+        margin = self._price[destinations] - buy[None, :]
+        with np.errstate(invalid='ignore'):
+            rows, commodities = np.nonzero(margin > 0)
+
+        # Chance of an encounter on arrival, as rolled by /jump.
+        risk = encounter_chances(self._danger[destinations])
+        return {
+            'destination': destinations[rows],
+            'commodity': commodities,
+            'buy': buy[commodities],
+            'margin': margin[rows, commodities],
+            'fuel': np.array([base for _, base in neighbours])[rows],
+            'safety': (1 - self.risk_aversion * risk)[rows],
+        }
+
+    def _rank(self, pairs: Dict[str, np.ndarray], budget: int, free_cargo: int, fuel_efficiency: float,
+              limit: int) -> List[Dict[str, Any]]:
+        units = np.minimum(free_cargo, np.floor(budget / pairs['buy']))
+        # Same rounding as /jump.
+        fuel = np.floor(pairs['fuel'] * fuel_efficiency)
+        profit = units * pairs['margin'] - fuel * FUEL_PRICE
+        score = profit * pairs['safety']
+
+        viable = np.flatnonzero((units >= 1) & (score > 0))
+        ranked = viable[np.argsort(-score[viable], kind='stable')[:limit]]
+
+        routes = []
+        for i in ranked:
+            destination = pairs['destination'][i]
+            commodity = pairs['commodity'][i]
+            routes.append({
+                'destination': self._planets[destination],
+                'commodity': self._commodities[commodity],
+                'units': int(units[i]),
+                'buy_price': int(pairs['buy'][i]),
+                'sell_price': int(self._price[destination, commodity]),
+                'fuel': int(fuel[i]),
+                'danger_level': int(self._danger[destination]),
+                'profit': int(profit[i]),
+            })
+        return routes
+
+
+# Global route optimizer
+route_optimizer = RouteOptimizer()
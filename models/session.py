@@ -0,0 +1,308 @@
+from typing import Optional, Dict, List, Tuple, Any
+
+from models.arrivals import arrival_scheduler
+from models.database import get_db, DatabaseManager, UserScope
+from models.history import history
+from models.locks import user_locks
+from models.market import market_engine
+from models.player import Player, player_cache
+
+
+# Ship columns a command may change through GameSession.update_ship.
+SHIP_COLUMNS = (
+    'name', 'cargo_capacity', 'fuel_efficiency', 'jump_success_bonus', 'shield_strength',
+    'engine_speed', 'navigation_system', 'paint_job', 'total_upgrade_cost'
+)
+
+
+class GameSession:
+    """Unit of work for one interaction.
+
+    The session checks out a single connection through a user scope, loads the
+    player, ship and inventory at most once, and collects every change the
+    command makes. Nothing is written until the block exits, when all dirty
+    entities are flushed together and committed in one transaction, and history
+    rows are handed to the write-behind history buffer. If the block raises,
+    nothing is written at all.
+
+    Sessions for the same player run one at a time: a second command waits for
+    the first to commit before it reads anything, without holding a connection.
+
+        async with GameSession(inter.author.id, inter.author.display_name) as session:
+            player = await session.player()
+            ...
+    """
+
+    def __init__(self, user_id: int, username: str):
+        self.user_id = user_id
+        self.username = username
+        self.db: Optional[DatabaseManager] = None
+
+        self._scope: Optional[UserScope] = None
+        self._player: Optional[Player] = None
+
+        self._ship_dirty = False
+        self._dirty_cargo: Dict[str, Dict[str, Any]] = {}
+        self._trades: List[tuple] = []
+        self._arrive_at: Optional[float] = None
+
+    async def __aenter__(self) -> 'GameSession':
+        await user_locks.acquire(self.user_id)
+        try:
+            self.db = await get_db()
+            self._scope = self.db.user_scope(self.user_id)
+            await self._scope.__aenter__()
+        except BaseException:
+            user_locks.release(self.user_id)
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            await self._finish(exc_type, exc, tb)
+            if exc_type is None and self._arrive_at is not None:
+                # Tracked before the lock is released, so the player's next command sees the ship in flight.
+                arrival_scheduler.schedule(self.user_id, self._arrive_at)
+        finally:
+            user_locks.release(self.user_id)
+
+        if exc_type is None:
+            # History is only handed over once the command's changes have committed.
+            await history.add_many(self._trades)
+        self._trades, self._arrive_at = [], None
+
+    async def _finish(self, exc_type, exc, tb):
+        """Flush and commit, or roll back if the block raised."""
+        if self._player is not None and self._player.session is self:
+            self._player.session = None
+        try:
+            if exc_type is None:
+                await self.flush()
+        except BaseException as e:
+            player_cache.discard(self.user_id)
+            await self._scope.__aexit__(type(e), e, e.__traceback__)
+            raise
+        if exc_type is not None:
+            # The cached player holds changes that are being rolled back.
+            player_cache.discard(self.user_id)
+        try:
+            await self._scope.__aexit__(exc_type, exc, tb)
+        except BaseException:
+            player_cache.discard(self.user_id)
+            raise
+
+    async def player(self) -> Player:
+        """Get the session's player with their ship and cargo, creating them on first play."""
+        if self._player is None:
+            self._player = await Player.load_full(self.user_id, self.username)
+            self._player.session = self
+        return self._player
+
+    async def ship(self) -> Dict[str, Any]:
+        """Get the player's ship, loaded together with the player."""
+        player = await self.player()
+        return await player.get_ship()
+
+    async def inventory(self) -> Dict[str, Dict[str, Any]]:
+        """Get the player's cargo, loaded together with the player."""
+        player = await self.player()
+        return await player.get_inventory()
+
+    async def update_ship(self, **columns):
+        """Change ship columns; the row is written when the session flushes."""
+        ship = await self.ship()
+        for column, value in columns.items():
+            if column not in SHIP_COLUMNS:
+                raise ValueError(f"Ship column {column} cannot be updated.")
+            ship[column] = value
+        self._ship_dirty = True
+
+    async def set_cargo(self, commodity: str, quantity: int, average_buy_price: float, price: Optional[int] = None):
+        """Set how much of a commodity is held; zero removes it from the hold."""
+        await self.inventory()
+        self._player.apply_cargo(commodity, quantity, average_buy_price, price)
+        self._dirty_cargo[commodity] = {'quantity': quantity, 'average_buy_price': average_buy_price}
+
+    async def buy(self, commodity: str, amount: int) -> Dict[str, Any]:
+        """Buy cargo at the player's planet in one atomic statement.
+
+        ``commodity`` must be a canonical name (see models.names). The returned
+        row's ``status`` is ``'ok'`` or the reason the trade was refused.
+        """
+        result = await self.db.execute_named_query("trades.buy", self.user_id, commodity, amount, user_id=self.user_id)
+        return self._apply_trade(result[0])
+
+    async def sell(self, commodity: str, amount: int) -> Dict[str, Any]:
+        """Sell cargo at the player's planet in one atomic statement.
+
+        ``commodity`` must be a canonical name (see models.names). The returned
+        row's ``status`` is ``'ok'`` or the reason the trade was refused.
+        """
+        result = await self.db.execute_named_query("trades.sell", self.user_id, commodity, amount, user_id=self.user_id)
+        return self._apply_trade(result[0])
+
+    async def trade_batch(self, legs: List[Tuple[str, str, int]]) -> Dict[str, Any]:
+        """Settle several ``(action, commodity, amount)`` buys and sells at the player's planet.
+
+        Commodities must be canonical names. Legs are validated in order against
+        the loaded player, cargo and market snapshot, so a sale can pay for a
+        later purchase. Either every leg is settled or none is: a refused batch
+        has the reason as ``status`` and the refused leg's position as ``leg``,
+        or ``status`` ``'in_transit'`` if the ship is in flight. Settled legs are
+        written when the session flushes, with their history rows, as one batch.
+        """
+        # Departures take the player's lock too, so the ship cannot leave while this session holds it.
+        in_flight = await self.db.execute_named_query("arrivals.get", self.user_id, user_id=self.user_id)
+        if in_flight:
+            return {'status': 'in_transit', 'arrive_at': in_flight[0]['arrive_at']}
+
+        player = await self.player()
+        ship = await player.get_ship()
+        inventory = await player.get_inventory()
+        snapshot = await market_engine.current()
+        planet = player.current_planet
+
+        credits = player.credits
+        cargo = {commodity: dict(item) for commodity, item in inventory.items()}
+        cargo_used = sum(item['quantity'] for item in cargo.values())
+        fills = []
+
+        for index, (action, commodity, amount) in enumerate(legs):
+            refused = {'leg': index, 'action': action, 'commodity': commodity, 'amount': amount}
+
+            if action == 'buy':
+                market = snapshot.get(planet, commodity)
+                if market is None:
+                    return dict(refused, status='unknown_commodity')
+                price = market['current_price']
+                total_value = price * amount
+                if credits < total_value:
+                    return dict(refused, status='insufficient_credits', total_value=total_value, credits=credits)
+                if cargo_used + amount > ship['cargo_capacity']:
+                    return dict(refused, status='insufficient_cargo',
+                                cargo_used=cargo_used, cargo_capacity=ship['cargo_capacity'])
+
+                held = cargo.setdefault(commodity, {'quantity': 0, 'average_buy_price': 0.0})
+                held['average_buy_price'] = (
+                    (held['quantity'] * held['average_buy_price'] + amount * price) / (held['quantity'] + amount)
+                )
+                held['quantity'] += amount
+                credits -= total_value
+                cargo_used += amount
+                profit_loss = 0
+            else:
+                held = cargo.get(commodity)
+                if held is None or held['quantity'] < amount:
+                    return dict(refused, status='insufficient_quantity', quantity=held['quantity'] if held else 0)
+                price = snapshot.price(planet, commodity)
+                if price is None:
+                    return dict(refused, status='not_traded_here')
+
+                total_value = price * amount
+                profit_loss = int((price - held['average_buy_price']) * amount)
+                held['quantity'] -= amount
+                credits += total_value
+                cargo_used -= amount
+
+            fills.append({
+                'action': action, 'commodity': commodity, 'amount': amount, 'price_per_unit': price,
+                'total_value': total_value, 'profit_loss': profit_loss
+            })
+
+        player.credits = credits
+        player.total_trades += len(fills)
+        for fill in fills:
+            self.log_trade(planet, fill['commodity'], fill['action'], fill['amount'],
+                           fill['price_per_unit'], fill['total_value'], fill['profit_loss'])
+        for commodity in {fill['commodity'] for fill in fills}:
+            held = cargo[commodity]
+            await self.set_cargo(commodity, held['quantity'], held['average_buy_price'],
+                                 snapshot.price(planet, commodity))
+
+        return {
+            'status': 'ok', 'legs': fills, 'credits': credits,
+            'cargo_used': cargo_used, 'cargo_capacity': ship['cargo_capacity']
+        }
+
+    async def depart(self, destination: str, fuel_cost: int, credits_gained: int, success: bool,
+                     encounter_type: str, encounter_result: str, travel_seconds: float,
+                     jump_number: int, danger_level: int, jump_bonus: float, rng_seed: int) -> Dict[str, Any]:
+        """Put the player's ship in flight with a jump already resolved from cached data.
+
+        One statement debits the fuel and records the arrival with its outcome,
+        in the session's transaction and under its player's RLS identity.
+        Credits, location, counters and history change when the arrival
+        scheduler lands the ship. The jump's counter, danger level, bonus and
+        stream seed are kept with it so the outcome can be replayed. The
+        returned row's ``status`` is ``'ok'`` or the reason the jump was refused.
+        """
+        player = await self.player()
+        result = await self.db.execute_named_query(
+            "jumps.depart",
+            self.user_id, player.current_planet, destination, fuel_cost, credits_gained, success,
+            encounter_type, encounter_result, travel_seconds, jump_number, danger_level, jump_bonus, rng_seed,
+            user_id=self.user_id
+        )
+        result = result[0]
+        if result['status'] == 'ok':
+            player.apply_write(fuel=result['fuel'])
+            # Scheduled once the departure has committed.
+            self._arrive_at = result['arrive_at'].timestamp()
+        elif result['status'] != 'in_transit':
+            # The row disagrees with the cached player, so load it afresh next time.
+            player_cache.discard(self.user_id)
+        return result
+
+    def _apply_trade(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Bring loaded entities in line with a trade the database already applied."""
+        if result['status'] != 'ok':
+            return result
+
+        if self._player is not None:
+            self._player.sync(credits=result['credits'], total_trades=result['total_trades'])
+            self._player.apply_cargo(
+                result['commodity'], result['quantity'], result['average_buy_price'], result['price_per_unit']
+            )
+        else:
+            player_cache.discard(self.user_id)
+        return result
+
+    def log_trade(self, planet: str, commodity: str, action: str, quantity: int,
+                  price_per_unit: int, total_value: int, profit_loss: int = 0):
+        """Record a trade_history row, written behind once the session commits."""
+        self._trades.append(
+            (self.user_id, planet, commodity, action, quantity, price_per_unit, total_value, profit_loss)
+        )
+
+    async def flush(self):
+        """Write every pending change inside the session's transaction."""
+        db, user_id = self.db, self.user_id
+
+        if self._player is not None:
+            # Keep net worth current after trades and upgrades without revaluing cargo.
+            self._player.refresh_net_worth()
+            await self._player.persist()
+
+        if self._ship_dirty:
+            ship = await self._player.get_ship()
+            await db.execute_named_command(
+                "ships.save",
+                user_id, *(ship[column] for column in SHIP_COLUMNS),
+                user_id=user_id
+            )
+            self._ship_dirty = False
+
+        if self._dirty_cargo:
+            held = [
+                (user_id, commodity, item['quantity'], item['average_buy_price'])
+                for commodity, item in self._dirty_cargo.items() if item['quantity'] > 0
+            ]
+            emptied = [
+                (user_id, commodity)
+                for commodity, item in self._dirty_cargo.items() if item['quantity'] <= 0
+            ]
+            if held:
+                await db.execute_named_many("inventory.upsert", held, user_id=user_id)
+            if emptied:
+                await db.execute_named_many("inventory.delete", emptied, user_id=user_id)
+            self._dirty_cargo = {}
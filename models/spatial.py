@@ -0,0 +1,42 @@
+import math
+from typing import Dict, List, Tuple
+
+
+class SpatialGrid:
+    """Points on the galaxy map bucketed into square cells for radius queries.
+
+    A query only looks at the cells its circle overlaps, so with cells about
+    as wide as the radius searched for, its cost depends on how crowded that
+    part of the map is rather than on how many points there are in total.
+    """
+
+    def __init__(self, cell_size: float):
+        self.cell_size = cell_size
+        self._cells: Dict[Tuple[int, int], List[Tuple[str, float, float]]] = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def insert(self, name: str, x: float, y: float):
+        """Add a named point."""
+        self._cells.setdefault(self._cell(x, y), []).append((name, x, y))
+        self._count += 1
+
+    def within(self, x: float, y: float, radius: float) -> List[Tuple[str, float]]:
+        """Every point within ``radius`` of (x, y) with its distance, nearest first."""
+        reach = math.ceil(radius / self.cell_size)
+        cx, cy = self._cell(x, y)
+
+        found = []
+        for i in range(cx - reach, cx + reach + 1):
+            for j in range(cy - reach, cy + reach + 1):
+                for name, px, py in self._cells.get((i, j), ()):
+                    distance = math.hypot(px - x, py - y)
+                    if distance <= radius:
+                        found.append((distance, name))
+        found.sort()
+        return [(name, distance) for distance, name in found]
@@ -0,0 +1,185 @@
+import asyncio
+import math
+from typing import Optional, Dict, List, Tuple, Callable, Awaitable, Any
+
+import asyncpg
+
+from models.database import get_db
+from models.spatial import SpatialGrid
+from util import logger
+
+
+# Channel the world tables' triggers notify when an admin edits them.
+WORLD_CHANNEL = "world_catalog"
+
+# Farthest a ship can fly in one jump, in map units.
+JUMP_RANGE = 35.0
+
+# Fuel a jump burns per map unit flown, before the ship's fuel efficiency.
+FUEL_PER_UNIT = 1.0
+
+# Fuel the shortest jump still burns.
+MIN_JUMP_FUEL = 5
+
+
+def jump_fuel(distance: float) -> int:
+    """Fuel a jump of ``distance`` map units burns, before the ship's fuel efficiency."""
+    return max(MIN_JUMP_FUEL, math.ceil(distance * FUEL_PER_UNIT))
+
+
+class Record:
+    """Read-only row of a world table.
+
+    Fields read as attributes, or by key like query rows, so records can be
+    passed to code written against either.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, row: Dict[str, Any]):
+        for field in self.__slots__:
+            object.__setattr__(self, field, row[field])
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(f"{type(self).__name__} records are read-only")
+
+    def __getitem__(self, field: str) -> Any:
+        try:
+            return getattr(self, field)
+        except AttributeError:
+            raise KeyError(field)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class Planet(Record):
+    __slots__ = ('name', 'danger_level', 'description', 'market_modifier', 'special_bonus', 'x', 'y')
+
+
+class Commodity(Record):
+    __slots__ = ('name', 'base_price', 'volatility', 'description')
+
+
+class Faction(Record):
+    """A faction's fixed attributes; member counts and contributions change and are queried live."""
+
+    __slots__ = ('id', 'name', 'description', 'trade_bonus', 'jump_bonus', 'fuel_bonus', 'special_ability')
+
+
+class Achievement(Record):
+    __slots__ = (
+        'id', 'name', 'description', 'requirement_type', 'requirement_value', 'badge_emoji', 'reward_credits'
+    )
+
+
+class WorldCatalog:
+    """The static world tables, held in memory as read-only records.
+
+    Planets, commodities, factions and achievements are loaded once at
+    startup. Triggers on those tables ``NOTIFY world_catalog`` when they are
+    edited, and the catalog reloads itself in the background. ``version`` goes
+    up on every load so caches built from the catalog know to rebuild.
+    Planets are also indexed by map position in ``grid``, so the planets near
+    one are found without looking at the rest of the galaxy.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.planets: Dict[str, Planet] = {}
+        self.commodities: Dict[str, Commodity] = {}
+        self.factions: Dict[int, Faction] = {}
+        self.achievements: Dict[int, Achievement] = {}
+
+        # Planets by map position, cells one jump wide
+        self.grid = SpatialGrid(JUMP_RANGE)
+        self.factions_by_name: Dict[str, Faction] = {}
+
+        self._listener: Optional[asyncpg.Connection] = None
+        self._reload_listeners: List[Callable[[], Awaitable[None]]] = []
+        self._stale = False
+        self._reload: Optional[asyncio.Task] = None
+
+    async def load(self):
+        """Read every world table and swap in the new records together."""
+        db = await get_db()
+        planets = [Planet(row) for row in await db.execute_named_query("world.planets")]
+        commodities = [Commodity(row) for row in await db.execute_named_query("world.commodities")]
+        factions = [Faction(row) for row in await db.execute_named_query("world.factions")]
+        achievements = [Achievement(row) for row in await db.execute_named_query("world.achievements")]
+        self.replace(planets, commodities, factions, achievements)
+
+    def replace(self, planets: List[Planet], commodities: List[Commodity], factions: List[Faction],
+                achievements: List[Achievement]):
+        """Swap in a new set of records together."""
+        grid = SpatialGrid(JUMP_RANGE)
+        for planet in planets:
+            grid.insert(planet.name, planet.x, planet.y)
+
+        self.planets = {planet.name: planet for planet in planets}
+        self.commodities = {commodity.name: commodity for commodity in commodities}
+        self.factions = {faction.id: faction for faction in factions}
+        self.achievements = {achievement.id: achievement for achievement in achievements}
+        self.grid = grid
+        self.factions_by_name = {faction.name: faction for faction in factions}
+        self.version += 1
+
+    async def ensure_loaded(self):
+        """Load the catalog on first use."""
+        if not self.version:
+            await self.load()
+
+    def distance(self, origin: str, destination: str) -> float:
+        """Straight-line distance between two planets on the galaxy map."""
+        a, b = self.planets[origin], self.planets[destination]
+        return math.hypot(a.x - b.x, a.y - b.y)
+
+    def in_range(self, planet: str, max_distance: float = JUMP_RANGE) -> List[Tuple[Planet, float]]:
+        """Every other planet within ``max_distance`` of ``planet`` with its distance, nearest first."""
+        origin = self.planets[planet]
+        return [
+            (self.planets[name], distance) for name, distance in self.grid.within(origin.x, origin.y, max_distance)
+            if name != planet
+        ]
+
+    async def listen(self):
+        """Reload whenever the world tables are edited."""
+        if self._listener is None:
+            db = await get_db()
+            self._listener = await db.listen(WORLD_CHANNEL, self._on_notify)
+
+    def add_listener(self, listener: Callable[[], Awaitable[None]]):
+        """Call ``listener`` after every reload caused by an edit."""
+        self._reload_listeners.append(listener)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        # One reload covers a burst of edits; an edit landing mid-reload triggers another.
+        self._stale = True
+        if self._reload is None or self._reload.done():
+            self._reload = asyncio.create_task(self._reload_while_stale())
+
+    async def _reload_while_stale(self):
+        while self._stale:
+            self._stale = False
+            try:
+                await self.load()
+            except Exception as e:
+                logger.error(f"World catalog reload failed: {e}")
+                return
+            logger.info("World catalog reloaded after an edit")
+            for listener in self._reload_listeners:
+                try:
+                    await listener()
+                except Exception as e:
+                    logger.error(f"World catalog listener failed: {e}")
+
+    async def close(self):
+        """Stop listening for changes."""
+        if self._listener is not None:
+            await self._listener.close()
+            self._listener = None
+
+
+# Global world catalog
+world = WorldCatalog()
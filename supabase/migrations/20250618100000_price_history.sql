@@ -0,0 +1,97 @@
+/*
+  # Price history
+
+  1. New Tables
+    - `price_history` - Raw price of every market at every market tick
+    - `price_rollups` - Hourly (`1h`) and daily (`1d`) OHLC buckets built from it
+
+  2. New Functions
+    - `rollup_price_history(raw_retention, hourly_retention, daily_retention)` -
+      Rebuilds the hourly buckets from the newest one onwards, then the daily
+      buckets from the hourly ones, and drops rows past their retention
+
+  3. Behaviour
+    - Raw points are only kept long enough to be rolled up; charts read
+      `price_rollups` by primary key, so their cost does not grow with history
+    - The newest bucket of each size is rebuilt on every rollup, so a bucket
+      still being filled stays current
+*/
+
+CREATE TABLE IF NOT EXISTS price_history (
+  planet text REFERENCES planets(name),
+  commodity text REFERENCES commodities(name),
+  recorded_at timestamptz NOT NULL DEFAULT now(),
+  price integer NOT NULL,
+  PRIMARY KEY (planet, commodity, recorded_at)
+);
+
+CREATE TABLE IF NOT EXISTS price_rollups (
+  planet text REFERENCES planets(name),
+  commodity text REFERENCES commodities(name),
+  resolution text NOT NULL CHECK (resolution IN ('1h', '1d')),
+  bucket_start timestamptz NOT NULL,
+  open integer NOT NULL,
+  high integer NOT NULL,
+  low integer NOT NULL,
+  close integer NOT NULL,
+  PRIMARY KEY (planet, commodity, resolution, bucket_start)
+);
+
+ALTER TABLE price_history ENABLE ROW LEVEL SECURITY;
+ALTER TABLE price_rollups ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Public read price history"
+  ON price_history FOR SELECT TO authenticated USING (true);
+
+CREATE POLICY "Public read price rollups"
+  ON price_rollups FOR SELECT TO authenticated USING (true);
+
+CREATE INDEX IF NOT EXISTS idx_price_history_recorded_at ON price_history(recorded_at);
+CREATE INDEX IF NOT EXISTS idx_price_rollups_bucket ON price_rollups(resolution, bucket_start);
+
+CREATE OR REPLACE FUNCTION rollup_price_history(
+  raw_retention interval DEFAULT interval '2 days',
+  hourly_retention interval DEFAULT interval '30 days',
+  daily_retention interval DEFAULT interval '2 years'
+)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_hour timestamptz;
+  v_day timestamptz;
+BEGIN
+  SELECT COALESCE(MAX(bucket_start), '-infinity') INTO v_hour FROM price_rollups WHERE resolution = '1h';
+
+  INSERT INTO price_rollups AS r (planet, commodity, resolution, bucket_start, open, high, low, close)
+  SELECT ph.planet, ph.commodity, '1h', date_trunc('hour', ph.recorded_at),
+         (array_agg(ph.price ORDER BY ph.recorded_at))[1],
+         MAX(ph.price),
+         MIN(ph.price),
+         (array_agg(ph.price ORDER BY ph.recorded_at DESC))[1]
+  FROM price_history ph
+  WHERE ph.recorded_at >= v_hour
+  GROUP BY ph.planet, ph.commodity, date_trunc('hour', ph.recorded_at)
+  ON CONFLICT (planet, commodity, resolution, bucket_start) DO UPDATE
+  SET open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low, close = EXCLUDED.close;
+
+  SELECT COALESCE(date_trunc('day', MAX(bucket_start)), '-infinity') INTO v_day
+  FROM price_rollups WHERE resolution = '1d';
+
+  INSERT INTO price_rollups AS r (planet, commodity, resolution, bucket_start, open, high, low, close)
+  SELECT h.planet, h.commodity, '1d', date_trunc('day', h.bucket_start),
+         (array_agg(h.open ORDER BY h.bucket_start))[1],
+         MAX(h.high),
+         MIN(h.low),
+         (array_agg(h.close ORDER BY h.bucket_start DESC))[1]
+  FROM price_rollups h
+  WHERE h.resolution = '1h' AND h.bucket_start >= v_day
+  GROUP BY h.planet, h.commodity, date_trunc('day', h.bucket_start)
+  ON CONFLICT (planet, commodity, resolution, bucket_start) DO UPDATE
+  SET open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low, close = EXCLUDED.close;
+
+  DELETE FROM price_history WHERE recorded_at < now() - raw_retention;
+  DELETE FROM price_rollups WHERE resolution = '1h' AND bucket_start < now() - hourly_retention;
+  DELETE FROM price_rollups WHERE resolution = '1d' AND bucket_start < now() - daily_retention;
+END;
+$$;
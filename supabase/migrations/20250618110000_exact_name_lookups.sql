@@ -0,0 +1,169 @@
+/*
+  # Exact name lookups in trades
+
+  1. Changed Functions
+    - `trade_buy` and `trade_sell` - Match the commodity by primary key
+      instead of `LOWER(commodity) = LOWER(p_commodity)`
+
+  2. Behaviour
+    - The bot resolves every name to its canonical form before calling, so
+      the market and inventory lookups use `market_prices_pkey` and
+      `player_inventory_pkey`
+    - Otherwise unchanged from the atomic_trades migration
+*/
+
+CREATE OR REPLACE FUNCTION trade_buy(p_user_id bigint, p_commodity text, p_amount integer)
+RETURNS TABLE (
+  status text,
+  commodity text,
+  price_per_unit integer,
+  total_value bigint,
+  credits bigint,
+  total_trades integer,
+  quantity integer,
+  average_buy_price real,
+  cargo_used integer,
+  cargo_capacity integer
+)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_variable
+DECLARE
+  v_planet text;
+BEGIN
+  SELECT p.current_planet, p.credits, p.total_trades
+    INTO v_planet, credits, total_trades
+  FROM players p
+  WHERE p.user_id = p_user_id
+  FOR UPDATE;
+
+  SELECT mp.commodity, mp.current_price
+    INTO commodity, price_per_unit
+  FROM market_prices mp
+  WHERE mp.planet = v_planet AND mp.commodity = p_commodity;
+
+  IF commodity IS NULL THEN
+    status := 'unknown_commodity';
+    RETURN NEXT;
+    RETURN;
+  END IF;
+
+  total_value := price_per_unit::bigint * p_amount;
+
+  SELECT s.cargo_capacity INTO cargo_capacity FROM ships s WHERE s.user_id = p_user_id;
+  SELECT COALESCE(SUM(pi.quantity), 0) INTO cargo_used FROM player_inventory pi WHERE pi.user_id = p_user_id;
+
+  IF credits < total_value THEN
+    status := 'insufficient_credits';
+    RETURN NEXT;
+    RETURN;
+  END IF;
+
+  IF cargo_used + p_amount > cargo_capacity THEN
+    status := 'insufficient_cargo';
+    RETURN NEXT;
+    RETURN;
+  END IF;
+
+  UPDATE players p
+  SET credits = p.credits - total_value,
+      total_trades = p.total_trades + 1,
+      last_active = now()
+  WHERE p.user_id = p_user_id AND p.credits >= total_value
+  RETURNING p.credits, p.total_trades INTO credits, total_trades;
+
+  IF NOT FOUND THEN
+    status := 'insufficient_credits';
+    RETURN NEXT;
+    RETURN;
+  END IF;
+
+  INSERT INTO player_inventory AS pi (user_id, commodity, quantity, average_buy_price)
+  VALUES (p_user_id, commodity, p_amount, price_per_unit)
+  ON CONFLICT ON CONSTRAINT player_inventory_pkey DO UPDATE
+  SET quantity = pi.quantity + EXCLUDED.quantity,
+      average_buy_price = (pi.quantity * pi.average_buy_price + EXCLUDED.quantity * EXCLUDED.average_buy_price)
+                          / (pi.quantity + EXCLUDED.quantity)
+  RETURNING pi.quantity, pi.average_buy_price INTO quantity, average_buy_price;
+
+  INSERT INTO trade_history (user_id, planet, commodity, action, quantity, price_per_unit, total_value)
+  VALUES (p_user_id, v_planet, commodity, 'buy', p_amount, price_per_unit, total_value);
+
+  cargo_used := cargo_used + p_amount;
+  status := 'ok';
+  RETURN NEXT;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION trade_sell(p_user_id bigint, p_commodity text, p_amount integer)
+RETURNS TABLE (
+  status text,
+  commodity text,
+  price_per_unit integer,
+  total_value bigint,
+  profit_loss bigint,
+  credits bigint,
+  total_trades integer,
+  quantity integer,
+  average_buy_price real
+)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_variable
+DECLARE
+  v_planet text;
+BEGIN
+  SELECT p.current_planet, p.credits, p.total_trades
+    INTO v_planet, credits, total_trades
+  FROM players p
+  WHERE p.user_id = p_user_id
+  FOR UPDATE;
+
+  SELECT pi.commodity, pi.quantity, pi.average_buy_price
+    INTO commodity, quantity, average_buy_price
+  FROM player_inventory pi
+  WHERE pi.user_id = p_user_id AND pi.commodity = p_commodity
+  FOR UPDATE;
+
+  IF commodity IS NULL OR quantity < p_amount THEN
+    quantity := COALESCE(quantity, 0);
+    status := 'insufficient_quantity';
+    RETURN NEXT;
+    RETURN;
+  END IF;
+
+  SELECT mp.current_price INTO price_per_unit
+  FROM market_prices mp
+  WHERE mp.planet = v_planet AND mp.commodity = commodity;
+
+  IF price_per_unit IS NULL THEN
+    status := 'not_traded_here';
+    RETURN NEXT;
+    RETURN;
+  END IF;
+
+  total_value := price_per_unit::bigint * p_amount;
+  profit_loss := trunc((price_per_unit - average_buy_price) * p_amount)::bigint;
+
+  UPDATE players p
+  SET credits = p.credits + total_value,
+      total_trades = p.total_trades + 1,
+      last_active = now()
+  WHERE p.user_id = p_user_id
+  RETURNING p.credits, p.total_trades INTO credits, total_trades;
+
+  quantity := quantity - p_amount;
+  IF quantity > 0 THEN
+    UPDATE player_inventory pi SET quantity = quantity
+    WHERE pi.user_id = p_user_id AND pi.commodity = commodity;
+  ELSE
+    DELETE FROM player_inventory pi WHERE pi.user_id = p_user_id AND pi.commodity = commodity;
+  END IF;
+
+  INSERT INTO trade_history (user_id, planet, commodity, action, quantity, price_per_unit, total_value, profit_loss)
+  VALUES (p_user_id, v_planet, commodity, 'sell', p_amount, price_per_unit, total_value, profit_loss);
+
+  status := 'ok';
+  RETURN NEXT;
+END;
+$$;
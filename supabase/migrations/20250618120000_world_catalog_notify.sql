@@ -0,0 +1,46 @@
+/*
+  # World catalog change notifications
+
+  1. New Functions
+    - `notify_world_change()` - Sends `NOTIFY world_catalog` with the edited table's name
+
+  2. New Triggers
+    - On `planets`, `commodities` and `achievements` for every insert, update and delete
+    - On `factions` for inserts, deletes and updates of its fixed columns only, so
+      members joining and leaving (which update `member_count`) stay silent
+
+  3. Behaviour
+    - The bot keeps these tables in memory and reloads them when notified
+    - Triggers fire once per statement, so a bulk edit sends one notification
+*/
+
+CREATE OR REPLACE FUNCTION notify_world_change()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  PERFORM pg_notify('world_catalog', TG_TABLE_NAME);
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS planets_world_change ON planets;
+CREATE TRIGGER planets_world_change
+  AFTER INSERT OR UPDATE OR DELETE ON planets
+  FOR EACH STATEMENT EXECUTE FUNCTION notify_world_change();
+
+DROP TRIGGER IF EXISTS commodities_world_change ON commodities;
+CREATE TRIGGER commodities_world_change
+  AFTER INSERT OR UPDATE OR DELETE ON commodities
+  FOR EACH STATEMENT EXECUTE FUNCTION notify_world_change();
+
+DROP TRIGGER IF EXISTS achievements_world_change ON achievements;
+CREATE TRIGGER achievements_world_change
+  AFTER INSERT OR UPDATE OR DELETE ON achievements
+  FOR EACH STATEMENT EXECUTE FUNCTION notify_world_change();
+
+DROP TRIGGER IF EXISTS factions_world_change ON factions;
+CREATE TRIGGER factions_world_change
+  AFTER INSERT OR DELETE OR UPDATE OF name, description, trade_bonus, jump_bonus, fuel_bonus, special_ability
+  ON factions
+  FOR EACH STATEMENT EXECUTE FUNCTION notify_world_change();
@@ -0,0 +1,83 @@
+/*
+  # Atomic jumps
+
+  1. New Functions
+    - `resolve_jump(user_id, from_planet, to_planet, fuel_cost, credits_delta,
+      success, encounter_type, encounter_result, net_worth)` - Apply a jump the
+      bot has already resolved
+
+  2. Behaviour
+    - The bot draws the encounter and works out the outcome from its cached
+      planet, ship and faction data, then commits it with this one statement:
+      fuel is debited with `WHERE fuel >= cost`, credits change (never below
+      zero), the player moves and their jump counters go up, and the jump is
+      appended to `jump_history`
+    - The move only applies if the player is still at `from_planet`, so a
+      stale cached player cannot jump from the wrong place
+    - The function binds `app.current_user_id` for its own transaction, so it
+      can be sent on its own as a single autocommit statement and the existing
+      RLS policies still apply
+    - A `status` column reports why a jump was refused; the other columns
+      hold the player's values after the jump
+*/
+
+CREATE OR REPLACE FUNCTION resolve_jump(
+  p_user_id bigint,
+  p_from_planet text,
+  p_to_planet text,
+  p_fuel_cost integer,
+  p_credits_delta bigint,
+  p_success boolean,
+  p_encounter_type text,
+  p_encounter_result text,
+  p_net_worth bigint
+)
+RETURNS TABLE (
+  status text,
+  credits bigint,
+  fuel integer,
+  current_planet text,
+  total_jumps integer,
+  successful_jumps integer,
+  net_worth bigint
+)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_variable
+BEGIN
+  PERFORM set_config('app.current_user_id', p_user_id::text, true);
+
+  UPDATE players p
+  SET fuel = p.fuel - p_fuel_cost,
+      credits = GREATEST(p.credits + p_credits_delta, 0),
+      current_planet = p_to_planet,
+      total_jumps = p.total_jumps + 1,
+      successful_jumps = p.successful_jumps + p_success::integer,
+      net_worth = p_net_worth,
+      last_active = now()
+  WHERE p.user_id = p_user_id
+    AND p.current_planet = p_from_planet
+    AND p.fuel >= p_fuel_cost
+  RETURNING p.credits, p.fuel, p.current_planet, p.total_jumps, p.successful_jumps, p.net_worth
+  INTO credits, fuel, current_planet, total_jumps, successful_jumps, net_worth;
+
+  IF NOT FOUND THEN
+    SELECT p.credits, p.fuel, p.current_planet, p.total_jumps, p.successful_jumps, p.net_worth
+      INTO credits, fuel, current_planet, total_jumps, successful_jumps, net_worth
+    FROM players p
+    WHERE p.user_id = p_user_id;
+
+    status := CASE WHEN current_planet IS DISTINCT FROM p_from_planet THEN 'moved' ELSE 'insufficient_fuel' END;
+    RETURN NEXT;
+    RETURN;
+  END IF;
+
+  INSERT INTO jump_history (user_id, from_planet, to_planet, encounter_type, encounter_result,
+                            credits_gained, fuel_cost, success)
+  VALUES (p_user_id, p_from_planet, p_to_planet, p_encounter_type, p_encounter_result,
+          p_credits_delta, p_fuel_cost, p_success);
+
+  status := 'ok';
+  RETURN NEXT;
+END;
+$$;
@@ -0,0 +1,128 @@
+/*
+  # Timed travel
+
+  1. Changed Tables
+    - `planets` - `x` and `y` map coordinates; travel time grows with the
+      distance between two planets
+
+  2. New Tables
+    - `pending_arrivals` - One row per ship in flight, holding the jump's
+      already drawn outcome until the ship arrives
+
+  3. New Functions
+    - `depart_jump(user_id, from_planet, to_planet, fuel_cost, credits_delta,
+      success, encounter_type, encounter_result, travel_seconds)` - Debit the
+      fuel and put the ship in flight
+
+  4. Removed Functions
+    - `resolve_jump` - A jump now departs with `depart_jump` and lands when the
+      bot's arrival scheduler resolves its `pending_arrivals` row
+
+  5. Behaviour
+    - Departing is one statement, which binds `app.current_user_id` itself like
+      `resolve_jump` did: fuel is debited with `WHERE fuel >= cost` while the
+      player is still at `from_planet` and not already in flight
+    - The player stays at `from_planet` until arrival; credits, location, jump
+      counters, net worth and the `jump_history` row are all applied then
+    - `idx_pending_arrivals_arrive_at` lets the bot reload every ship in flight
+      after a restart with one index scan, soonest arrival first
+*/
+
+ALTER TABLE planets ADD COLUMN IF NOT EXISTS x real NOT NULL DEFAULT 0;
+ALTER TABLE planets ADD COLUMN IF NOT EXISTS y real NOT NULL DEFAULT 0;
+
+UPDATE planets p
+SET x = c.x, y = c.y
+FROM (VALUES
+  ('Terra Prime', 0, 0),
+  ('New Shanghai', 12, 5),
+  ('Kepler Station', -9, 11),
+  ('Spice Gardens', 18, -14),
+  ('Luxury Resort', -20, -8),
+  ('Frontier Post', 30, 22),
+  ('Pirate Haven', -28, 26),
+  ('Unknown Space', 45, -35)
+) AS c(name, x, y)
+WHERE p.name = c.name;
+
+CREATE TABLE IF NOT EXISTS pending_arrivals (
+  user_id bigint PRIMARY KEY REFERENCES players(user_id) ON DELETE CASCADE,
+  from_planet text REFERENCES planets(name),
+  to_planet text REFERENCES planets(name),
+  encounter_type text NOT NULL,
+  encounter_result text NOT NULL,
+  credits_gained bigint NOT NULL,
+  fuel_cost integer NOT NULL,
+  success boolean NOT NULL,
+  departed_at timestamptz NOT NULL DEFAULT now(),
+  arrive_at timestamptz NOT NULL
+);
+
+ALTER TABLE pending_arrivals ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Pending arrivals can manage own data"
+  ON pending_arrivals
+  FOR ALL
+  TO authenticated
+  USING (user_id = (current_setting('app.current_user_id'))::bigint);
+
+CREATE INDEX IF NOT EXISTS idx_pending_arrivals_arrive_at ON pending_arrivals(arrive_at);
+
+DROP FUNCTION IF EXISTS resolve_jump(bigint, text, text, integer, bigint, boolean, text, text, bigint);
+
+CREATE OR REPLACE FUNCTION depart_jump(
+  p_user_id bigint,
+  p_from_planet text,
+  p_to_planet text,
+  p_fuel_cost integer,
+  p_credits_delta bigint,
+  p_success boolean,
+  p_encounter_type text,
+  p_encounter_result text,
+  p_travel_seconds real
+)
+RETURNS TABLE (
+  status text,
+  fuel integer,
+  current_planet text,
+  arrive_at timestamptz
+)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_variable
+BEGIN
+  PERFORM set_config('app.current_user_id', p_user_id::text, true);
+
+  SELECT pa.arrive_at INTO arrive_at FROM pending_arrivals pa WHERE pa.user_id = p_user_id;
+  IF FOUND THEN
+    status := 'in_transit';
+    RETURN NEXT;
+    RETURN;
+  END IF;
+
+  UPDATE players p
+  SET fuel = p.fuel - p_fuel_cost,
+      last_active = now()
+  WHERE p.user_id = p_user_id
+    AND p.current_planet = p_from_planet
+    AND p.fuel >= p_fuel_cost
+  RETURNING p.fuel, p.current_planet INTO fuel, current_planet;
+
+  IF NOT FOUND THEN
+    SELECT p.fuel, p.current_planet INTO fuel, current_planet FROM players p WHERE p.user_id = p_user_id;
+    status := CASE WHEN current_planet IS DISTINCT FROM p_from_planet THEN 'moved' ELSE 'insufficient_fuel' END;
+    RETURN NEXT;
+    RETURN;
+  END IF;
+
+  -- The primary key still stops a second flight if two departures race.
+  INSERT INTO pending_arrivals (user_id, from_planet, to_planet, encounter_type, encounter_result,
+                                credits_gained, fuel_cost, success, arrive_at)
+  VALUES (p_user_id, p_from_planet, p_to_planet, p_encounter_type, p_encounter_result,
+          p_credits_delta, p_fuel_cost, p_success, now() + make_interval(secs => p_travel_seconds))
+  RETURNING pending_arrivals.arrive_at INTO arrive_at;
+
+  status := 'ok';
+  RETURN NEXT;
+END;
+$$;
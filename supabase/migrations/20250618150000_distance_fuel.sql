@@ -0,0 +1,16 @@
+/*
+  # Distance-based jump fuel
+
+  1. Changed Tables
+    - `planets` - `fuel_cost` dropped; a jump now burns fuel for the distance
+      flown between the two planets' `x`/`y` coordinates, which the bot works
+      out from its in-memory world catalog
+
+  2. Behaviour
+    - `pending_arrivals.fuel_cost` and `jump_history.fuel_cost` keep recording
+      the fuel each jump actually burned
+    - Generated galaxies (`python -m tools.seed_galaxy`) add planets with
+      coordinates only, so nothing else needs a per-planet fuel figure
+*/
+
+ALTER TABLE planets DROP COLUMN IF EXISTS fuel_cost;
@@ -0,0 +1,95 @@
+/*
+  # Replayable jump outcomes
+
+  1. Changed Tables
+    - `pending_arrivals` and `jump_history` - `jump_number`, `danger_level`,
+      `jump_bonus` and `rng_seed`: everything needed to draw a jump's outcome
+      again. `rng_seed` is derived from the game seed, the player and
+      `jump_number`, and seeds the one stream every draw of the jump comes from
+    - Rows from before this migration leave them NULL and are not replayed
+
+  2. Changed Functions
+    - `depart_jump(...)` - Takes the four new values and keeps them with the
+      ship in flight; landing copies them into `jump_history`
+
+  3. Behaviour
+    - `jump_bonus` is double precision so a replay compares against exactly
+      the success rate the bot rolled against
+    - `python -m tools.replay_jumps` redraws every recorded jump and reports
+      rows whose stored outcome differs
+*/
+
+ALTER TABLE pending_arrivals ADD COLUMN IF NOT EXISTS jump_number integer;
+ALTER TABLE pending_arrivals ADD COLUMN IF NOT EXISTS danger_level integer;
+ALTER TABLE pending_arrivals ADD COLUMN IF NOT EXISTS jump_bonus double precision;
+ALTER TABLE pending_arrivals ADD COLUMN IF NOT EXISTS rng_seed bigint;
+
+ALTER TABLE jump_history ADD COLUMN IF NOT EXISTS jump_number integer;
+ALTER TABLE jump_history ADD COLUMN IF NOT EXISTS danger_level integer;
+ALTER TABLE jump_history ADD COLUMN IF NOT EXISTS jump_bonus double precision;
+ALTER TABLE jump_history ADD COLUMN IF NOT EXISTS rng_seed bigint;
+
+DROP FUNCTION IF EXISTS depart_jump(bigint, text, text, integer, bigint, boolean, text, text, real);
+
+CREATE OR REPLACE FUNCTION depart_jump(
+  p_user_id bigint,
+  p_from_planet text,
+  p_to_planet text,
+  p_fuel_cost integer,
+  p_credits_delta bigint,
+  p_success boolean,
+  p_encounter_type text,
+  p_encounter_result text,
+  p_travel_seconds real,
+  p_jump_number integer,
+  p_danger_level integer,
+  p_jump_bonus double precision,
+  p_rng_seed bigint
+)
+RETURNS TABLE (
+  status text,
+  fuel integer,
+  current_planet text,
+  arrive_at timestamptz
+)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_variable
+BEGIN
+  PERFORM set_config('app.current_user_id', p_user_id::text, true);
+
+  SELECT pa.arrive_at INTO arrive_at FROM pending_arrivals pa WHERE pa.user_id = p_user_id;
+  IF FOUND THEN
+    status := 'in_transit';
+    RETURN NEXT;
+    RETURN;
+  END IF;
+
+  UPDATE players p
+  SET fuel = p.fuel - p_fuel_cost,
+      last_active = now()
+  WHERE p.user_id = p_user_id
+    AND p.current_planet = p_from_planet
+    AND p.fuel >= p_fuel_cost
+  RETURNING p.fuel, p.current_planet INTO fuel, current_planet;
+
+  IF NOT FOUND THEN
+    SELECT p.fuel, p.current_planet INTO fuel, current_planet FROM players p WHERE p.user_id = p_user_id;
+    status := CASE WHEN current_planet IS DISTINCT FROM p_from_planet THEN 'moved' ELSE 'insufficient_fuel' END;
+    RETURN NEXT;
+    RETURN;
+  END IF;
+
+  -- The primary key still stops a second flight if two departures race.
+  INSERT INTO pending_arrivals (user_id, from_planet, to_planet, encounter_type, encounter_result,
+                                credits_gained, fuel_cost, success, arrive_at,
+                                jump_number, danger_level, jump_bonus, rng_seed)
+  VALUES (p_user_id, p_from_planet, p_to_planet, p_encounter_type, p_encounter_result,
+          p_credits_delta, p_fuel_cost, p_success, now() + make_interval(secs => p_travel_seconds),
+          p_jump_number, p_danger_level, p_jump_bonus, p_rng_seed)
+  RETURNING pending_arrivals.arrive_at INTO arrive_at;
+
+  status := 'ok';
+  RETURN NEXT;
+END;
+$$;
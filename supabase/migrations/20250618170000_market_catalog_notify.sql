@@ -0,0 +1,17 @@
+/*
+  # Market catalog change notifications
+
+  1. New Triggers
+    - On `market_prices` for inserts and deletes, sending `NOTIFY world_catalog`
+      through `notify_world_change()`
+
+  2. Behaviour
+    - The bot reloads its markets whenever the world catalog reloads, so new
+      planets' markets start ticking without a restart
+    - Price updates stay silent; the market engine writes those itself
+*/
+
+DROP TRIGGER IF EXISTS market_prices_world_change ON market_prices;
+CREATE TRIGGER market_prices_world_change
+  AFTER INSERT OR DELETE ON market_prices
+  FOR EACH STATEMENT EXECUTE FUNCTION notify_world_change();
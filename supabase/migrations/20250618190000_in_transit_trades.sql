@@ -0,0 +1,176 @@
+/*
+  # No trading in flight
+
+  1. Changed Functions
+    - `trade_buy` and `trade_sell` - Refuse with status `in_transit` while the
+      player has a `pending_arrivals` row
+
+  2. Behaviour
+    - The guarded update only matches with `NOT EXISTS (SELECT 1 FROM
+      pending_arrivals ...)`, so a trade can never land between a departure
+      and its arrival, whatever the bot's in-memory schedule says
+    - Otherwise unchanged from the guarded_trades migration
+*/
+
+CREATE OR REPLACE FUNCTION trade_buy(p_user_id bigint, p_commodity text, p_amount integer)
+RETURNS TABLE (
+  status text,
+  commodity text,
+  price_per_unit integer,
+  total_value bigint,
+  credits bigint,
+  total_trades integer,
+  quantity integer,
+  average_buy_price real,
+  cargo_used integer,
+  cargo_capacity integer
+)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_variable
+DECLARE
+  v_planet text;
+BEGIN
+  UPDATE players p
+  SET credits = p.credits - mp.current_price::bigint * p_amount,
+      total_trades = p.total_trades + 1,
+      last_active = now()
+  FROM market_prices mp,
+       ships s,
+       (SELECT COALESCE(SUM(pi.quantity), 0)::integer AS used
+        FROM player_inventory pi WHERE pi.user_id = p_user_id) c
+  WHERE p.user_id = p_user_id
+    AND mp.planet = p.current_planet AND mp.commodity = p_commodity
+    AND s.user_id = p.user_id
+    AND p.credits >= mp.current_price::bigint * p_amount
+    AND c.used + p_amount <= s.cargo_capacity
+    AND NOT EXISTS (SELECT 1 FROM pending_arrivals pa WHERE pa.user_id = p_user_id)
+  RETURNING p.current_planet, mp.commodity, mp.current_price, mp.current_price::bigint * p_amount,
+            p.credits, p.total_trades, c.used, s.cargo_capacity
+    INTO v_planet, commodity, price_per_unit, total_value, credits, total_trades, cargo_used, cargo_capacity;
+
+  IF NOT FOUND THEN
+    -- Refused; find out why without taking any locks.
+    IF EXISTS (SELECT 1 FROM pending_arrivals pa WHERE pa.user_id = p_user_id) THEN
+      status := 'in_transit';
+      RETURN NEXT;
+      RETURN;
+    END IF;
+
+    SELECT p.current_planet, p.credits, p.total_trades
+      INTO v_planet, credits, total_trades
+    FROM players p
+    WHERE p.user_id = p_user_id;
+
+    SELECT mp.commodity, mp.current_price
+      INTO commodity, price_per_unit
+    FROM market_prices mp
+    WHERE mp.planet = v_planet AND mp.commodity = p_commodity;
+
+    IF commodity IS NULL THEN
+      status := 'unknown_commodity';
+      RETURN NEXT;
+      RETURN;
+    END IF;
+
+    total_value := price_per_unit::bigint * p_amount;
+    SELECT s.cargo_capacity INTO cargo_capacity FROM ships s WHERE s.user_id = p_user_id;
+    SELECT COALESCE(SUM(pi.quantity), 0) INTO cargo_used FROM player_inventory pi WHERE pi.user_id = p_user_id;
+
+    status := CASE WHEN credits < total_value THEN 'insufficient_credits' ELSE 'insufficient_cargo' END;
+    RETURN NEXT;
+    RETURN;
+  END IF;
+
+  INSERT INTO player_inventory AS pi (user_id, commodity, quantity, average_buy_price)
+  VALUES (p_user_id, commodity, p_amount, price_per_unit)
+  ON CONFLICT ON CONSTRAINT player_inventory_pkey DO UPDATE
+  SET quantity = pi.quantity + EXCLUDED.quantity,
+      average_buy_price = (pi.quantity * pi.average_buy_price + EXCLUDED.quantity * EXCLUDED.average_buy_price)
+                          / (pi.quantity + EXCLUDED.quantity)
+  RETURNING pi.quantity, pi.average_buy_price INTO quantity, average_buy_price;
+
+  INSERT INTO trade_history (user_id, planet, commodity, action, quantity, price_per_unit, total_value)
+  VALUES (p_user_id, v_planet, commodity, 'buy', p_amount, price_per_unit, total_value);
+
+  cargo_used := cargo_used + p_amount;
+  status := 'ok';
+  RETURN NEXT;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION trade_sell(p_user_id bigint, p_commodity text, p_amount integer)
+RETURNS TABLE (
+  status text,
+  commodity text,
+  price_per_unit integer,
+  total_value bigint,
+  profit_loss bigint,
+  credits bigint,
+  total_trades integer,
+  quantity integer,
+  average_buy_price real
+)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_variable
+DECLARE
+  v_planet text;
+BEGIN
+  UPDATE player_inventory pi
+  SET quantity = pi.quantity - p_amount
+  FROM players p, market_prices mp
+  WHERE pi.user_id = p_user_id AND pi.commodity = p_commodity
+    AND pi.quantity >= p_amount
+    AND p.user_id = pi.user_id
+    AND mp.planet = p.current_planet AND mp.commodity = pi.commodity
+    AND NOT EXISTS (SELECT 1 FROM pending_arrivals pa WHERE pa.user_id = p_user_id)
+  RETURNING p.current_planet, pi.commodity, pi.quantity, pi.average_buy_price, mp.current_price
+    INTO v_planet, commodity, quantity, average_buy_price, price_per_unit;
+
+  IF NOT FOUND THEN
+    -- Refused; find out why without taking any locks.
+    IF EXISTS (SELECT 1 FROM pending_arrivals pa WHERE pa.user_id = p_user_id) THEN
+      status := 'in_transit';
+      RETURN NEXT;
+      RETURN;
+    END IF;
+
+    SELECT pi.commodity, pi.quantity, pi.average_buy_price
+      INTO commodity, quantity, average_buy_price
+    FROM player_inventory pi
+    WHERE pi.user_id = p_user_id AND pi.commodity = p_commodity;
+
+    SELECT p.credits, p.total_trades INTO credits, total_trades FROM players p WHERE p.user_id = p_user_id;
+
+    IF commodity IS NULL OR quantity < p_amount THEN
+      quantity := COALESCE(quantity, 0);
+      status := 'insufficient_quantity';
+    ELSE
+      status := 'not_traded_here';
+    END IF;
+    RETURN NEXT;
+    RETURN;
+  END IF;
+
+  total_value := price_per_unit::bigint * p_amount;
+  profit_loss := trunc((price_per_unit - average_buy_price) * p_amount)::bigint;
+
+  UPDATE players p
+  SET credits = p.credits + total_value,
+      total_trades = p.total_trades + 1,
+      last_active = now()
+  WHERE p.user_id = p_user_id
+  RETURNING p.credits, p.total_trades INTO credits, total_trades;
+
+  IF quantity = 0 THEN
+    DELETE FROM player_inventory pi WHERE pi.user_id = p_user_id AND pi.commodity = commodity;
+  END IF;
+
+  INSERT INTO trade_history (user_id, planet, commodity, action, quantity, price_per_unit, total_value, profit_loss)
+  VALUES (p_user_id, v_planet, commodity, 'sell', p_amount, price_per_unit, total_value, profit_loss);
+
+  status := 'ok';
+  RETURN NEXT;
+END;
+$$;
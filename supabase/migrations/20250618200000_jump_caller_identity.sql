@@ -0,0 +1,148 @@
+/*
+  # Jump functions under the caller's identity
+
+  1. Changed Functions
+    - `depart_jump(...)` - No longer binds `app.current_user_id` from its own
+      `p_user_id` argument, which let any caller act as any player. It runs as
+      the caller, so RLS checks it against the identity the bot's transaction
+      bound for the player
+
+  2. New Functions
+    - `land_arrivals(user_ids)` - Lands every listed ship in flight: applies the
+      outcome stored at departure to `players`, appends `jump_history` and
+      deletes the `pending_arrivals` row. Replaces the bot's `arrivals.resolve` query
+
+  3. Security
+    - Landing changes many players at once, so no single player's identity
+      covers it. `land_arrivals` is `SECURITY DEFINER`, owned by `postgres`,
+      with a fixed `search_path`
+    - Trust boundary: whoever can execute it can land any ship early, though
+      only with the outcome the player's own departure stored. EXECUTE is
+      revoked from `PUBLIC`, `anon` and `authenticated`, so only the owner,
+      the role the bot connects as, may call it
+    - The history buffer's COPY into `trade_history` also needs that role:
+      COPY is refused for roles subject to RLS
+*/
+
+CREATE OR REPLACE FUNCTION depart_jump(
+  p_user_id bigint,
+  p_from_planet text,
+  p_to_planet text,
+  p_fuel_cost integer,
+  p_credits_delta bigint,
+  p_success boolean,
+  p_encounter_type text,
+  p_encounter_result text,
+  p_travel_seconds real,
+  p_jump_number integer,
+  p_danger_level integer,
+  p_jump_bonus double precision,
+  p_rng_seed bigint
+)
+RETURNS TABLE (
+  status text,
+  fuel integer,
+  current_planet text,
+  arrive_at timestamptz
+)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_variable
+BEGIN
+  SELECT pa.arrive_at INTO arrive_at FROM pending_arrivals pa WHERE pa.user_id = p_user_id;
+  IF FOUND THEN
+    status := 'in_transit';
+    RETURN NEXT;
+    RETURN;
+  END IF;
+
+  UPDATE players p
+  SET fuel = p.fuel - p_fuel_cost,
+      last_active = now()
+  WHERE p.user_id = p_user_id
+    AND p.current_planet = p_from_planet
+    AND p.fuel >= p_fuel_cost
+  RETURNING p.fuel, p.current_planet INTO fuel, current_planet;
+
+  IF NOT FOUND THEN
+    SELECT p.fuel, p.current_planet INTO fuel, current_planet FROM players p WHERE p.user_id = p_user_id;
+    status := CASE WHEN current_planet IS DISTINCT FROM p_from_planet THEN 'moved' ELSE 'insufficient_fuel' END;
+    RETURN NEXT;
+    RETURN;
+  END IF;
+
+  -- The primary key still stops a second flight if two departures race.
+  INSERT INTO pending_arrivals (user_id, from_planet, to_planet, encounter_type, encounter_result,
+                                credits_gained, fuel_cost, success, arrive_at,
+                                jump_number, danger_level, jump_bonus, rng_seed)
+  VALUES (p_user_id, p_from_planet, p_to_planet, p_encounter_type, p_encounter_result,
+          p_credits_delta, p_fuel_cost, p_success, now() + make_interval(secs => p_travel_seconds),
+          p_jump_number, p_danger_level, p_jump_bonus, p_rng_seed)
+  RETURNING pending_arrivals.arrive_at INTO arrive_at;
+
+  status := 'ok';
+  RETURN NEXT;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION land_arrivals(p_user_ids bigint[])
+RETURNS TABLE (
+  user_id bigint,
+  from_planet text,
+  to_planet text,
+  encounter_type text,
+  encounter_result text,
+  credits_gained bigint,
+  fuel_cost integer,
+  success boolean,
+  jump_bonus double precision,
+  credits bigint,
+  current_planet text,
+  total_jumps integer,
+  successful_jumps integer,
+  net_worth bigint
+)
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  WITH due AS (
+    DELETE FROM pending_arrivals
+    WHERE pending_arrivals.user_id = ANY(p_user_ids)
+    RETURNING *
+  ),
+  landed AS (
+    UPDATE players p
+    SET credits = GREATEST(p.credits + d.credits_gained, 0),
+        current_planet = d.to_planet,
+        total_jumps = p.total_jumps + 1,
+        successful_jumps = p.successful_jumps + d.success::integer,
+        net_worth = GREATEST(p.credits + d.credits_gained, 0)
+            + COALESCE((SELECT SUM(i.quantity * mp.current_price)
+                        FROM player_inventory i
+                        JOIN market_prices mp ON mp.planet = d.to_planet AND mp.commodity = i.commodity
+                        WHERE i.user_id = p.user_id), 0)
+            + COALESCE((SELECT s.total_upgrade_cost FROM ships s WHERE s.user_id = p.user_id), 0),
+        last_active = now()
+    FROM due d
+    WHERE p.user_id = d.user_id
+    RETURNING p.user_id, p.credits, p.current_planet, p.total_jumps, p.successful_jumps, p.net_worth
+  ),
+  logged AS (
+    INSERT INTO jump_history (user_id, from_planet, to_planet, encounter_type, encounter_result,
+                              credits_gained, fuel_cost, success,
+                              jump_number, danger_level, jump_bonus, rng_seed)
+    SELECT d.user_id, d.from_planet, d.to_planet, d.encounter_type, d.encounter_result,
+           d.credits_gained, d.fuel_cost, d.success,
+           d.jump_number, d.danger_level, d.jump_bonus, d.rng_seed
+    FROM due d
+  )
+  SELECT d.user_id, d.from_planet, d.to_planet, d.encounter_type, d.encounter_result,
+         d.credits_gained, d.fuel_cost, d.success, d.jump_bonus,
+         l.credits, l.current_planet, l.total_jumps, l.successful_jumps, l.net_worth
+  FROM due d
+  JOIN landed l ON l.user_id = d.user_id;
+$$;
+
+ALTER FUNCTION land_arrivals(bigint[]) OWNER TO postgres;
+REVOKE ALL ON FUNCTION land_arrivals(bigint[]) FROM PUBLIC, anon, authenticated;
@@ -0,0 +1,85 @@
+/*
+  # Six-hour price candles
+
+  1. Changed Tables
+    - `price_rollups` - Holds six-hour (`6h`) and daily (`1d`) buckets; the hourly
+      (`1h`) buckets are folded into six-hour ones and dropped
+
+  2. Changed Functions
+    - `rollup_price_history(raw_retention, six_hour_retention, daily_retention)` -
+      Rebuilds the six-hour buckets from the newest one onwards, then the daily
+      buckets from the six-hour ones, and drops rows past their retention
+
+  3. Behaviour
+    - The market ticks once an hour, so an hourly bucket held a single price and
+      its open, high, low and close were always equal. A six-hour bucket spans
+      six ticks and a daily one twenty-four
+    - Buckets start on six-hour boundaries in UTC
+*/
+
+ALTER TABLE price_rollups DROP CONSTRAINT IF EXISTS price_rollups_resolution_check;
+
+INSERT INTO price_rollups AS r (planet, commodity, resolution, bucket_start, open, high, low, close)
+SELECT h.planet, h.commodity, '6h', date_bin('6 hours', h.bucket_start, timestamptz '2000-01-01 00:00+00'),
+       (array_agg(h.open ORDER BY h.bucket_start))[1],
+       MAX(h.high),
+       MIN(h.low),
+       (array_agg(h.close ORDER BY h.bucket_start DESC))[1]
+FROM price_rollups h
+WHERE h.resolution = '1h'
+GROUP BY h.planet, h.commodity, date_bin('6 hours', h.bucket_start, timestamptz '2000-01-01 00:00+00')
+ON CONFLICT (planet, commodity, resolution, bucket_start) DO NOTHING;
+
+DELETE FROM price_rollups WHERE resolution = '1h';
+
+ALTER TABLE price_rollups
+  ADD CONSTRAINT price_rollups_resolution_check CHECK (resolution IN ('6h', '1d'));
+
+DROP FUNCTION IF EXISTS rollup_price_history(interval, interval, interval);
+
+CREATE FUNCTION rollup_price_history(
+  raw_retention interval DEFAULT interval '2 days',
+  six_hour_retention interval DEFAULT interval '60 days',
+  daily_retention interval DEFAULT interval '2 years'
+)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_six_hours timestamptz;
+  v_day timestamptz;
+BEGIN
+  SELECT COALESCE(MAX(bucket_start), '-infinity') INTO v_six_hours FROM price_rollups WHERE resolution = '6h';
+
+  INSERT INTO price_rollups AS r (planet, commodity, resolution, bucket_start, open, high, low, close)
+  SELECT ph.planet, ph.commodity, '6h', date_bin('6 hours', ph.recorded_at, timestamptz '2000-01-01 00:00+00'),
+         (array_agg(ph.price ORDER BY ph.recorded_at))[1],
+         MAX(ph.price),
+         MIN(ph.price),
+         (array_agg(ph.price ORDER BY ph.recorded_at DESC))[1]
+  FROM price_history ph
+  WHERE ph.recorded_at >= v_six_hours
+  GROUP BY ph.planet, ph.commodity, date_bin('6 hours', ph.recorded_at, timestamptz '2000-01-01 00:00+00')
+  ON CONFLICT (planet, commodity, resolution, bucket_start) DO UPDATE
+  SET open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low, close = EXCLUDED.close;
+
+  SELECT COALESCE(date_trunc('day', MAX(bucket_start)), '-infinity') INTO v_day
+  FROM price_rollups WHERE resolution = '1d';
+
+  INSERT INTO price_rollups AS r (planet, commodity, resolution, bucket_start, open, high, low, close)
+  SELECT s.planet, s.commodity, '1d', date_trunc('day', s.bucket_start),
+         (array_agg(s.open ORDER BY s.bucket_start))[1],
+         MAX(s.high),
+         MIN(s.low),
+         (array_agg(s.close ORDER BY s.bucket_start DESC))[1]
+  FROM price_rollups s
+  WHERE s.resolution = '6h' AND s.bucket_start >= v_day
+  GROUP BY s.planet, s.commodity, date_trunc('day', s.bucket_start)
+  ON CONFLICT (planet, commodity, resolution, bucket_start) DO UPDATE
+  SET open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low, close = EXCLUDED.close;
+
+  DELETE FROM price_history WHERE recorded_at < now() - raw_retention;
+  DELETE FROM price_rollups WHERE resolution = '6h' AND bucket_start < now() - six_hour_retention;
+  DELETE FROM price_rollups WHERE resolution = '1d' AND bucket_start < now() - daily_retention;
+END;
+$$;
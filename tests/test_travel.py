@@ -0,0 +1,95 @@
+import unittest
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from cogs import travel
+from cogs.travel import Travel
+
+
+ARRIVE_AT = datetime(2025, 6, 18, 12, 0, tzinfo=timezone.utc)
+
+PLANETS = {
+    'Terra Prime': {'name': 'Terra Prime', 'danger_level': 1, 'description': 'The safe capital world'},
+    'Nova Station': {'name': 'Nova Station', 'danger_level': 2, 'description': 'A busy trading hub'},
+}
+
+
+class FakePlayer:
+    user_id = 4242
+    current_planet = 'Terra Prime'
+    fuel = 100
+    total_jumps = 0
+    faction_id = None
+
+    async def get_ship(self):
+        return {'fuel_efficiency': 1.0, 'jump_success_bonus': 0.0, 'engine_speed': 1}
+
+
+class FakeSession:
+    """Stands in for GameSession, recording the departure it is asked to make."""
+
+    def __init__(self, user_id, username):
+        self.departures = []
+
+    async def __aenter__(self):
+        FakeSession.opened = self
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def player(self):
+        return FakePlayer()
+
+    async def depart(self, destination, *args):
+        self.departures.append(destination)
+        return {'status': 'ok', 'arrive_at': ARRIVE_AT}
+
+
+class JumpTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        fake_world = SimpleNamespace(planets=PLANETS, factions={}, distance=lambda origin, destination: self.distance)
+        outcome = {'encounter_type': 'Clear Skies', 'success': True, 'credits_gained': 100}
+        self.distance = 10.0
+        self.replies = []
+
+        async def record_reply(inter, reply):
+            self.replies.append(reply)
+
+        patches = [
+            mock.patch.object(travel, 'GameSession', FakeSession),
+            mock.patch.object(travel, 'world', fake_world),
+            mock.patch.object(travel.name_index, 'canonical', mock.AsyncMock(side_effect=lambda kind, name: name)),
+            mock.patch.object(travel, 'refuse_in_flight', mock.AsyncMock(return_value=False)),
+            mock.patch.object(travel, 'send_reply', record_reply),
+            mock.patch.object(travel.encounter_engine, 'resolve', mock.Mock(return_value=outcome)),
+            mock.patch.object(travel, 'travel_time', mock.Mock(return_value=60.0)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        self.cog = Travel(SimpleNamespace(keys=SimpleNamespace(game_seed=1)))
+        self.inter = SimpleNamespace(author=SimpleNamespace(id=FakePlayer.user_id, display_name='Pilot'))
+
+    async def test_jump_departs_and_waits_for_arrival(self):
+        await self.cog.jump.callback(self.cog, self.inter, planet='Nova Station')
+
+        self.assertEqual(FakeSession.opened.departures, ['Nova Station'])
+        self.assertIs(self.cog._awaiting[FakePlayer.user_id], self.inter)
+        self.assertEqual(len(self.replies), 1)
+        self.assertNotIsInstance(self.replies[0], str)
+
+    async def test_jump_out_of_range_is_refused(self):
+        self.distance = 10_000.0
+
+        await self.cog.jump.callback(self.cog, self.inter, planet='Nova Station')
+
+        self.assertEqual(FakeSession.opened.departures, [])
+        self.assertNotIn(FakePlayer.user_id, self.cog._awaiting)
+        self.assertIn("out of jump range", self.replies[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+"""Replay recorded jumps from their seeded streams and report any that differ.
+
+Every jump stores the seed of the stream its outcome was drawn from, with the
+danger level and bonus it was drawn against. This reads ``jump_history`` in id
+order, ``--chunk`` rows at a time, and redraws each chunk with the current
+``EncounterEngine`` in a pool of worker processes. A row is reported when
+
+- its ``rng_seed`` is not the one ``GAME_SEED`` derives for its player and
+  jump number, so the seed itself was altered, or
+- the redrawn encounter, success or credits differ from what was stored, so
+  the row was edited or the encounter tables have changed since.
+
+Recorded and replayed success rates and mean credits are printed per danger
+level, so a change to the encounter tables shows up as drift between the two.
+
+Run from the repository root with ``python -m tools.replay_jumps``.
+"""
+import argparse
+import asyncio
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, List, Tuple, Any
+
+from keys import get_keys
+from models.database import db_manager
+from models.encounters import encounter_engine, jump_seed
+
+
+# Altered rows listed in the report, at most, for each kind of difference.
+MAX_REPORTED = 20
+
+# (id, user_id, jump_number, danger_level, jump_bonus, rng_seed, encounter_type, success, credits_gained)
+Row = Tuple[int, int, int, int, float, int, str, bool, int]
+
+
+def replay_chunk(rows: List[Row], seed: Optional[int]) -> Dict[str, Any]:
+    """Redraw a chunk of jumps. Runs in a worker process."""
+    altered_seeds = []
+    altered_outcomes = []
+    # danger level -> [jumps, recorded successes, recorded credits, replayed successes, replayed credits]
+    by_danger: Dict[int, List[int]] = {}
+    for row_id, user_id, jump_number, danger_level, jump_bonus, rng_seed, encounter_type, success, credits in rows:
+        if seed is not None and jump_seed(seed, user_id, jump_number) != rng_seed:
+            altered_seeds.append(row_id)
+
+        outcome = encounter_engine.resolve(danger_level, jump_bonus, random.Random(rng_seed))
+        if (outcome['encounter_type'], outcome['success'], outcome['credits_gained']) != (encounter_type, success, credits):
+            altered_outcomes.append(row_id)
+
+        totals = by_danger.setdefault(danger_level, [0, 0, 0, 0, 0])
+        totals[0] += 1
+        totals[1] += success
+        totals[2] += credits
+        totals[3] += outcome['success']
+        totals[4] += outcome['credits_gained']
+    return {'rows': len(rows), 'altered_seeds': altered_seeds, 'altered_outcomes': altered_outcomes,
+            'by_danger': by_danger}
+
+
+def merge(report: Dict[str, Any], result: Dict[str, Any]):
+    report['rows'] += result['rows']
+    report['altered_seeds'] += result['altered_seeds']
+    report['altered_outcomes'] += result['altered_outcomes']
+    for danger_level, totals in result['by_danger'].items():
+        merged = report['by_danger'].setdefault(danger_level, [0] * len(totals))
+        for i, value in enumerate(totals):
+            merged[i] += value
+
+
+async def replay(chunk: int, workers: int, seed: Optional[int]) -> Dict[str, Any]:
+    """Replay every recorded jump, keeping at most two chunks per worker in flight."""
+    report = {'rows': 0, 'altered_seeds': [], 'altered_outcomes': [], 'by_danger': {}}
+    loop = asyncio.get_running_loop()
+
+    await db_manager.initialize()
+    try:
+        with ProcessPoolExecutor(workers) as pool:
+            pending = set()
+            last_id = 0
+            while True:
+                rows = await db_manager.execute_named_query("jumps.replay", last_id, chunk)
+                if not rows:
+                    break
+                last_id = rows[-1]['id']
+                pending.add(loop.run_in_executor(pool, replay_chunk, [tuple(row.values()) for row in rows], seed))
+
+                if len(pending) >= workers * 2:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for future in done:
+                        merge(report, future.result())
+
+            for result in await asyncio.gather(*pending):
+                merge(report, result)
+    finally:
+        await db_manager.close()
+
+    report['altered_seeds'].sort()
+    report['altered_outcomes'].sort()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk", type=int, default=50_000, help="jumps read and replayed at a time")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="replay processes")
+    parser.add_argument("--no-seed-check", action="store_true",
+                        help="skip checking rng_seed against GAME_SEED, for auditors without the secret")
+    args = parser.parse_args()
+
+    seed = None if args.no_seed_check else get_keys().game_seed
+    if seed is None and not args.no_seed_check:
+        parser.error("GAME_SEED is not set; set it or pass --no-seed-check")
+    report = asyncio.run(replay(args.chunk, args.workers, seed))
+
+    print(f"Replayed {report['rows']:,} jumps with {args.workers} workers")
+    for kind in ('altered_seeds', 'altered_outcomes'):
+        ids = report[kind]
+        listed = ", ".join(str(row_id) for row_id in ids[:MAX_REPORTED]) + (", ..." if len(ids) > MAX_REPORTED else "")
+        print(f"  {kind.replace('_', ' ')}: {len(ids):,}" + (f" (ids {listed})" if ids else ""))
+
+    print("\n  danger     jumps   success (recorded/replayed)   mean cr (recorded/replayed)")
+    for danger_level, (jumps, successes, credits, replayed_successes, replayed_credits) in sorted(report['by_danger'].items()):
+        print(f"  {danger_level:6d}  {jumps:8,}   {successes / jumps:8.2%} / {replayed_successes / jumps:8.2%}"
+              f"        {credits / jumps:9.1f} / {replayed_credits / jumps:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Seed the database with a procedural galaxy.
+
+Generates ``--count`` planets with ``GalaxyGenerator`` around the planets that
+already exist, and a market for each of them in every commodity it trades,
+then loads both with COPY in one transaction. A running bot picks them up on
+its own: the world catalog and the market engine reload when notified.
+
+Run from the repository root with ``python -m tools.seed_galaxy --count 5000``.
+"""
+import argparse
+import asyncio
+
+from models.database import db_manager
+from models.galaxy import GalaxyGenerator, NEIGHBOURS
+from models.world import world
+
+
+PLANET_COLUMNS = ('name', 'danger_level', 'description', 'market_modifier', 'special_bonus', 'x', 'y')
+MARKET_COLUMNS = ('planet', 'commodity', 'current_price', 'supply_level', 'demand_level')
+
+
+async def seed(count: int, seed: int, neighbours: int, dry_run: bool):
+    await db_manager.initialize()
+    try:
+        await world.load()
+        generator = GalaxyGenerator(seed, neighbours)
+        planets = generator.planets(count, taken=world.planets)
+        commodities = [(commodity.name, commodity.base_price) for commodity in world.commodities.values()]
+        markets = generator.markets(planets, commodities)
+
+        print(f"{len(planets):,} planets and {len(markets):,} markets over a radius of "
+              f"{generator.radius(count):,.0f} units, seed {seed}")
+        if dry_run:
+            return
+
+        # Planets first; markets reference them.
+        await db_manager.copy_tables([
+            ("planets", [tuple(row[column] for column in PLANET_COLUMNS) for row in planets], PLANET_COLUMNS),
+            ("market_prices", [tuple(row[column] for column in MARKET_COLUMNS) for row in markets], MARKET_COLUMNS),
+        ])
+        print("Seeded")
+    finally:
+        await db_manager.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=5000, help="planets to generate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--neighbours", type=int, default=NEIGHBOURS, help="planets within jump range, on average")
+    parser.add_argument("--dry-run", action="store_true", help="generate and report without writing")
+    args = parser.parse_args()
+
+    asyncio.run(seed(args.count, args.seed, args.neighbours, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+from collections import OrderedDict
+from typing import Optional, Dict, Tuple, Hashable, Callable, Awaitable
+
+import disnake
+
+
+class EmbedCache:
+    """Prebuilt embeds for read-only views, keyed by view, arguments and data version.
+
+    Each view remembers the data version its embeds were rendered from. The
+    first request that brings a different version drops every embed of that
+    view, so nothing outlives the data it shows. Cached embeds are shared
+    between requests and must not be modified once returned.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._views: Dict[str, Tuple[Hashable, "OrderedDict[Hashable, disnake.Embed]"]] = {}
+
+    async def get(
+        self,
+        view: str,
+        args: Hashable,
+        version: Hashable,
+        render: Callable[[], Awaitable[Optional[disnake.Embed]]],
+    ) -> Optional[disnake.Embed]:
+        """Get the embed for a view, rendering it if this version has not been rendered yet.
+
+        ``render`` may return None (e.g. for an unknown planet); that is passed
+        through and not cached.
+        """
+        cached_version, embeds = self._views.get(view, (None, None))
+        if embeds is None or cached_version != version:
+            embeds = OrderedDict()
+            self._views[view] = (version, embeds)
+
+        embed = embeds.get(args)
+        if embed is not None:
+            embeds.move_to_end(args)
+            return embed
+
+        embed = await render()
+        # Only keep it if no newer version replaced the view while rendering.
+        if embed is not None and self._views[view][1] is embeds:
+            embeds[args] = embed
+            while len(embeds) > self.max_entries:
+                embeds.popitem(last=False)
+        return embed
+
+    def invalidate(self, view: str):
+        """Drop every cached embed of a view."""
+        self._views.pop(view, None)
+
+
+# Global embed cache
+embed_cache = EmbedCache()